@@ -0,0 +1,345 @@
+"""
+Agent Action Log
+Append-only per-patient JSONL files with cross-process locking and tail-first cursor pagination
+"""
+
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import threading
+
+from file_lock import locked
+
+
+class ActionLog:
+    """Agent actions stored as one JSON line per action in {patient_id}_actions.jsonl
+
+    Each append is a single locked write of one complete line, so concurrent
+    writers (threads or worker processes) never lose entries and a write costs
+    O(1) regardless of history length. A crash mid-write can only leave a
+    partial last line, which readers ignore and the next append truncates.
+
+    Pages are read backwards from the end of the file; a cursor is the byte
+    offset where the previous page started.
+
+    Every append also adds a {patient_id, timestamp, count} line to a shared
+    activity journal, holding the journal lock across both writes so the
+    journal never misses (or double-counts) an action. Dashboard aggregates
+    fold in only the journal bytes written since the last read, so they stay
+    current across processes while an unchanged journal costs one stat().
+    Once the journal holds more than COMPACT_MIN_LINES lines and twice as
+    many lines as patients, it is rewritten as one line per patient.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    ACTIVITY_FILE = "_activity.jsonl"
+    COMPACT_MIN_LINES = 10000
+    COMPACT_CHECK_EVERY = 1000
+
+    def __init__(self, storage_dir: str = ".agent_actions"):
+        self.storage_dir = Path(storage_dir)
+        self.storage_dir.mkdir(exist_ok=True)
+        self._counts: Dict[str, Tuple[int, int]] = {}
+        self._counts_lock = threading.Lock()
+
+        # Running aggregates folded from the activity journal
+        self._stats_lock = threading.Lock()
+        self._activity_handle = None
+        self._activity_ino: Optional[int] = None
+        self._activity_offset = 0
+        self._journal_lines = 0
+        self._appends = 0
+        self._total_actions = 0
+        self._patient_actions: Dict[str, int] = {}
+        self._recent: "OrderedDict[str, str]" = OrderedDict()
+        self._summary: Optional[Dict] = None
+        self._activity_seeded = False
+
+    def get_log_file(self, patient_id: str) -> Path:
+        return self.storage_dir / f"{patient_id}_actions.jsonl"
+
+    def get_legacy_file(self, patient_id: str) -> Path:
+        return self.storage_dir / f"{patient_id}_actions.json"
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, patient_id: str, action: Dict) -> None:
+        """Append one action to a patient's log"""
+        line = (json.dumps(action) + "\n").encode("utf-8")
+        entry = {"patient_id": patient_id, "timestamp": action.get("timestamp"), "count": 1}
+        with self._locked_journal() as journal:
+            self._seed_activity(journal)
+            with open(self.get_log_file(patient_id), "ab+") as f:
+                with locked(f):
+                    self._import_legacy(patient_id, f)
+                    end = f.seek(0, os.SEEK_END)
+                    if end:
+                        f.seek(end - 1)
+                        if f.read(1) != b"\n":
+                            # Drop a line torn by a crashed writer (writers only ever hold the lock for whole lines)
+                            f.truncate(self._complete_end(f, end))
+                    f.write(line)
+                    f.flush()
+            journal.write((json.dumps(entry) + "\n").encode("utf-8"))
+            journal.flush()
+            self._appends += 1
+            check_compaction = self._appends % self.COMPACT_CHECK_EVERY == 0
+        if check_compaction:
+            with self._stats_lock:
+                self._refresh_stats()
+
+    def _import_legacy(self, patient_id: str, f) -> None:
+        """Move a {patient_id}_actions.json array into the JSONL log (caller holds the lock)"""
+        legacy_file = self.get_legacy_file(patient_id)
+        if not legacy_file.exists():
+            return
+
+        with open(legacy_file, "r") as legacy:
+            actions = json.load(legacy)
+        f.seek(0, os.SEEK_END)
+        f.write(b"".join((json.dumps(action) + "\n").encode("utf-8") for action in actions))
+        f.flush()
+        legacy_file.rename(legacy_file.with_suffix(".json.migrated"))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _ensure_imported(self, patient_id: str) -> bool:
+        """Import a legacy file if present; report whether the patient has a log"""
+        if self.get_legacy_file(patient_id).exists():
+            with open(self.get_log_file(patient_id), "ab+") as f:
+                with locked(f):
+                    self._import_legacy(patient_id, f)
+        return self.get_log_file(patient_id).exists()
+
+    def _complete_end(self, f, size: int) -> int:
+        """Offset just past the last complete line (drops a torn trailing write)"""
+        position = size
+        while position > 0:
+            start = max(0, position - self.BLOCK_SIZE)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            position = start
+        return 0
+
+    @staticmethod
+    def _at_line_start(f, offset: int) -> bool:
+        """Whether offset starts a line (cursors handed out by read_page always do)"""
+        if offset == 0:
+            return True
+        f.seek(offset - 1)
+        return f.read(1) == b"\n"
+
+    def read_page(self, patient_id: str, limit: int = 50, cursor: Optional[int] = None) -> Dict:
+        """
+        Read up to `limit` actions ending before `cursor` (default: the end of the log)
+        Returns {"actions": [oldest..newest], "next_cursor": offset of older actions or None}
+        Raises ValueError for a cursor that is not a line boundary within the log.
+        """
+        if limit <= 0 or not self._ensure_imported(patient_id):
+            return {"actions": [], "next_cursor": None}
+
+        with open(self.get_log_file(patient_id), "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            if cursor is None:
+                end = self._complete_end(f, size)
+            elif 0 <= cursor <= size and self._at_line_start(f, cursor):
+                end = cursor
+            else:
+                raise ValueError(f"Invalid cursor: {cursor}")
+
+            # Read backwards until the buffer holds `limit` complete lines
+            position = end
+            buffer = b""
+            while position > 0 and buffer.count(b"\n") <= limit:
+                start = max(0, position - self.BLOCK_SIZE)
+                f.seek(start)
+                buffer = f.read(position - start) + buffer
+                position = start
+
+        lines = buffer.split(b"\n")[:-1]
+        if position > 0:
+            lines = lines[1:]  # partial line cut by the block boundary
+        page = lines[-limit:]
+        first_offset = end - sum(len(line) + 1 for line in page)
+
+        return {
+            "actions": [json.loads(line) for line in page if line.strip()],
+            "next_cursor": first_offset if first_offset > 0 else None
+        }
+
+    def count(self, patient_id: str) -> int:
+        """Count a patient's actions, scanning only bytes appended since the last count"""
+        if not self._ensure_imported(patient_id):
+            return 0
+
+        with self._counts_lock:
+            counted_to, count = self._counts.get(patient_id, (0, 0))
+            with open(self.get_log_file(patient_id), "rb") as f:
+                f.seek(counted_to)
+                position = counted_to
+                while True:
+                    block = f.read(self.BLOCK_SIZE)
+                    if not block:
+                        break
+                    count += block.count(b"\n")
+                    position += len(block)
+                    newline = block.rfind(b"\n")
+                    if newline != -1:
+                        # Only complete lines are counted, so a torn tail is rescanned once repaired
+                        counted_to = position - len(block) + newline + 1
+            self._counts[patient_id] = (counted_to, count)
+            return count
+
+    def list_patients(self) -> List[str]:
+        """Patient IDs with logged actions, sorted"""
+        patients = {p.name[:-len("_actions.jsonl")] for p in self.storage_dir.glob("*_actions.jsonl")}
+        patients.update(p.name[:-len("_actions.json")] for p in self.storage_dir.glob("*_actions.json"))
+        return sorted(patients)
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+
+    def get_activity_file(self) -> Path:
+        return self.storage_dir / self.ACTIVITY_FILE
+
+    @contextmanager
+    def _locked_journal(self):
+        """Open the activity journal under its exclusive lock (reopened if it was compacted meanwhile)"""
+        path = self.get_activity_file()
+        while True:
+            with open(path, "ab+") as journal:
+                with locked(journal):
+                    if os.fstat(journal.fileno()).st_ino == os.stat(path).st_ino:
+                        yield journal
+                        return
+
+    def _seed_activity(self, journal) -> None:
+        """Start the journal from existing logs if it is empty (caller holds the journal lock)"""
+        if self._activity_seeded:
+            return
+        if not journal.seek(0, os.SEEK_END):
+            entries = []
+            for patient_id in self.list_patients():
+                last = self.read_page(patient_id, limit=1)["actions"]
+                entries.append({
+                    "patient_id": patient_id,
+                    "timestamp": last[0].get("timestamp") if last else None,
+                    "count": self.count(patient_id)
+                })
+            entries.sort(key=lambda entry: entry["timestamp"] or "")
+            journal.write(b"".join((json.dumps(entry) + "\n").encode("utf-8") for entry in entries))
+            journal.flush()
+        # Every later action is journaled by its own append
+        self._activity_seeded = True
+
+    def _refresh_stats(self) -> None:
+        """Fold journal lines written since the last refresh, by any process (caller holds _stats_lock)"""
+        if not self._activity_seeded:
+            with self._locked_journal() as journal:
+                self._seed_activity(journal)
+
+        stat = self.get_activity_file().stat()
+        if stat.st_ino == self._activity_ino and stat.st_size == self._activity_offset:
+            return
+
+        if stat.st_ino != self._activity_ino:
+            self._reopen_journal()
+        self._fold()
+        if self._journal_lines > max(self.COMPACT_MIN_LINES, 2 * len(self._patient_actions)):
+            self._compact()
+
+    def _reopen_journal(self) -> None:
+        """Fold the current journal from the start: first read, or it was compacted by any process
+
+        The handle stays open, pinning the journal's inode so a newer journal
+        can never reuse its number and pass for it.
+        """
+        if self._activity_handle is not None:
+            self._activity_handle.close()
+        self._activity_handle = open(self.get_activity_file(), "rb")
+        self._activity_ino = os.fstat(self._activity_handle.fileno()).st_ino
+        self._activity_offset = 0
+        self._journal_lines = 0
+        self._total_actions = 0
+        self._patient_actions = {}
+        self._recent = OrderedDict()
+
+    def _fold(self) -> None:
+        """Fold the open journal from the last folded offset (caller holds _stats_lock)"""
+        f = self._activity_handle
+        f.seek(self._activity_offset)
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            entry = json.loads(line)
+            patient_id = entry["patient_id"]
+            self._total_actions += entry["count"]
+            self._patient_actions[patient_id] = self._patient_actions.get(patient_id, 0) + entry["count"]
+            self._recent[patient_id] = entry["timestamp"]
+            self._recent.move_to_end(patient_id)
+            self._journal_lines += 1
+        self._activity_offset += complete
+        self._summary = None
+
+    def _compact(self) -> None:
+        """Rewrite the journal as one line per patient, oldest activity first (caller holds _stats_lock)"""
+        path = self.get_activity_file()
+        with self._locked_journal() as journal:
+            if os.fstat(journal.fileno()).st_ino != self._activity_ino:
+                self._reopen_journal()
+            self._fold()
+            data = b"".join(
+                (json.dumps({"patient_id": patient_id, "timestamp": timestamp, "count": self._patient_actions[patient_id]}) + "\n").encode("utf-8")
+                for patient_id, timestamp in self._recent.items()
+            )
+            temp = path.with_name(path.name + ".compact")
+            compacted = open(temp, "w+b")
+            compacted.write(data)
+            compacted.flush()
+            os.fsync(compacted.fileno())
+            os.replace(temp, path)
+
+        # Later appends go to the new file, after the lines folded here
+        self._activity_handle.close()
+        self._activity_handle = compacted
+        self._activity_ino = os.fstat(compacted.fileno()).st_ino
+        self._activity_offset = len(data)
+        self._journal_lines = len(self._recent)
+
+    def summary(self, recent_limit: int = 10) -> Dict:
+        """
+        Action totals and the most recently active patients (newest first)
+        Served from cache until the activity journal grows
+        """
+        with self._stats_lock:
+            self._refresh_stats()
+            if self._summary is None or self._summary["recent_limit"] != recent_limit:
+                recent = []
+                for patient_id in reversed(self._recent):
+                    if len(recent) == recent_limit:
+                        break
+                    recent.append(patient_id)
+                self._summary = {
+                    "total_patients": len(self._patient_actions),
+                    "total_actions": self._total_actions,
+                    "recent_patients": recent,
+                    "recent_limit": recent_limit
+                }
+            return {key: value for key, value in self._summary.items() if key != "recent_limit"}
+
+    def patient_action_count(self, patient_id: str) -> int:
+        """A patient's action total from the running aggregates"""
+        with self._stats_lock:
+            self._refresh_stats()
+            return self._patient_actions.get(patient_id, 0)
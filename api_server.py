@@ -3,22 +3,30 @@ FastAPI Backend for Clinical AI Agent
 Connects the Next.js frontend with the Python LangChain agent
 """
 
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from datetime import datetime
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import threading
 import os
 import json
-import re
-from pathlib import Path
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage, AIMessage
 
-from clinical_tools import ClinicalTools
+from clinical_tools import ClinicalTools, get_shared_clinical_tools, shutdown_shared_clinical_tools
+from conversation_store import create_conversation_store
+from action_log import ActionLog
+from llm_cache import LLMResponseCache
+from query_router import QueryRouter
 
 load_dotenv()
 
@@ -26,10 +34,20 @@ load_dotenv()
 # FASTAPI APP SETUP
 # ============================================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services in the background (so /health answers at once), release them at shutdown"""
+    threading.Thread(target=initialize_services, name="api-startup", daemon=True).start()
+    yield
+    agent_runner.shutdown()
+    close_services()
+    shutdown_shared_clinical_tools()
+
 app = FastAPI(
     title="Clinical AI Agent API",
     description="Backend API for clinical agent dashboard",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for Next.js frontend
@@ -48,6 +66,7 @@ app.add_middleware(
 class PatientQuery(BaseModel):
     patient_id: str
     question: str
+    use_cache: bool = True
 
 class DoctorSearch(BaseModel):
     specialty: Optional[str] = None
@@ -59,10 +78,19 @@ class AppointmentRequest(BaseModel):
     appointment_time: str
     reason: str
     appointment_type: str = "checkup"
+    duration_minutes: int = 30
+
+class BatchAppointmentRequest(BaseModel):
+    appointments: List[AppointmentRequest]
+    atomic: bool = True
 
 class MedicationCheck(BaseModel):
-    medication1: str
-    medication2: str
+    medication1: Optional[str] = None
+    medication2: Optional[str] = None
+    medications: List[str] = []
+
+class PrescriptionCheck(BaseModel):
+    medication: str
 
 class AgentAction(BaseModel):
     patient_id: str
@@ -72,153 +100,425 @@ class AgentAction(BaseModel):
 class PatientHistory(BaseModel):
     patient_id: str
 
-# ============================================================================
-# LANGCHAIN TOOLS
-# ============================================================================
-
-@tool
-def search_patients(patient_id: str = None, last_name: str = None) -> str:
-    """Search for patients by ID or last name"""
-    try:
-        clinical = ClinicalTools()
-        results = clinical.search_patients(patient_id=patient_id, last_name=last_name)
-        return json.dumps(results, indent=2)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
-
-@tool
-def search_doctors(specialty: str = None, available_day: str = None) -> str:
-    """Search for doctors by specialty or availability"""
-    try:
-        clinical = ClinicalTools()
-        results = clinical.search_doctors(specialty=specialty, available_day=available_day)
-        return json.dumps(results, indent=2)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
-
-@tool
-def schedule_appointment(patient_id: str, doctor_id: str, appointment_time: str, 
-                         reason: str, appointment_type: str = "checkup") -> str:
-    """Schedule an appointment for a patient"""
-    try:
-        clinical = ClinicalTools()
-        result = clinical.schedule_appointment(
-            patient_id=patient_id,
-            doctor_id=doctor_id,
-            appointment_time=appointment_time,
-            reason=reason,
-            appointment_type=appointment_type
-        )
-        return json.dumps(result)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
-
-@tool
-def get_medical_history(patient_id: str) -> str:
-    """Get medical history for a patient"""
-    try:
-        clinical = ClinicalTools()
-        result = clinical.get_medical_history(patient_id=patient_id)
-        return json.dumps(result, indent=2)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
-
-@tool
-def check_drug_interactions(medication1: str, medication2: str) -> str:
-    """Check for drug interactions between two medications"""
-    try:
-        clinical = ClinicalTools()
-        result = clinical.check_drug_interactions(medication1=medication1, medication2=medication2)
-        return json.dumps(result)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
-
 # ============================================================================
 # AGENT INITIALIZATION
 # ============================================================================
 
-def init_agent():
+def get_clinical() -> ClinicalTools:
+    """FastAPI dependency: the shared clinical repository (override via app.dependency_overrides)"""
+    clinical = get_shared_clinical_tools()
+    watch_clinical_writes(clinical)
+    return clinical
+
+def init_agent(clinical: Optional[ClinicalTools] = None, cache: Optional[LLMResponseCache] = None):
     """Initialize LangChain agent that DIRECTLY uses clinical tools"""
-    llm = ChatOpenAI(
-        model="gpt-4",
-        temperature=0.3,
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
+    from llm_client import create_chat_model
+    
+    model = "gpt-4"
+    temperature = 0.3
+    llm = create_chat_model(model, temperature)
     
     # Create a simple agent that uses tools directly
     class DirectToolAgent:
-        def __init__(self, llm):
+        def __init__(self, llm, clinical: ClinicalTools, cache: Optional[LLMResponseCache]):
             self.llm = llm
-            self.clinical = ClinicalTools()
+            self.clinical = clinical
+            self.cache = cache
+            self.router = QueryRouter(clinical)
             
         def invoke(self, input_data):
+            """Run the query to completion and return the full answer"""
+            output = ""
+            for event, data in self.stream(input_data):
+                if event == "output":
+                    output = data["output"]
+            return {"output": output}
+        
+        def _run_tool(self, name: str, func, *args, **kwargs):
+            """Run one clinical tool, yielding progress events around it"""
+            yield "tool", {"name": name, "status": "started"}
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                yield "tool", {"name": name, "status": "finished"}
+            return result
+        
+        def stream(self, input_data):
+            """
+            Answer a query as a stream of (event, data) pairs:
+            ("tool", {...}) around each tool call, ("token", {"text": ...}) as
+            answer text is produced and a final ("output", {"output": ...}).
+            Pass "use_cache": False to skip the response cache for LLM answers.
+            """
             user_input = input_data.get("input", "").lower()
             
             # ALWAYS try to get patient data first when patient ID or name is mentioned
             print(f"\n🔍 Processing query: {user_input}")
             
-            # Try to extract patient identifier
-            patient_id = None
-            patient_name = None
-            
-            # Check for patient IDs (PT000001, P-1024, etc.)
-            id_match = re.search(r'\b(P[T-]?\d+|PT\d{6})\b', user_input, re.IGNORECASE)
-            if id_match:
-                patient_id = id_match.group(1).upper()
-                print(f"✅ Found patient ID: {patient_id}")
+            # Intents and entities in one pass over the query
+            route = self.router.route(user_input)
+            patient_id = route["patient_id"]
+            if patient_id:
+                print(f"✅ Found patient: {patient_id}")
             
-            # Check for common names
-            if "john" in user_input and "doe" in user_input:
-                patient_id = "PT000001"
-                print(f"✅ Identified John Doe as PT000001")
-            elif "maria" in user_input or "garcia" in user_input:
-                patient_id = "PT000002"
-                print(f"✅ Identified Maria Garcia as PT000002")
-            elif "robert" in user_input or "johnson" in user_input:
-                patient_id = "PT000003"
-                print(f"✅ Identified Robert Johnson as PT000003")
+            output = None
             
             # Get medical history if patient ID found
             if patient_id:
                 try:
-                    history = self.clinical.get_medical_history(patient_id=patient_id)
+                    history = yield from self._run_tool("get_medical_history", self.clinical.get_medical_history, patient_id=patient_id)
                     print(f"✅ Retrieved medical history for {patient_id}")
-                    return {"output": f"Medical History for Patient {patient_id}:\\n{json.dumps(history, indent=2)}"}
+                    output = f"Medical History for Patient {patient_id}:\\n{json.dumps(history, indent=2)}"
                 except Exception as e:
                     print(f"❌ Error getting history: {e}")
-                    return {"output": f"Error retrieving patient history: {str(e)}"}
+                    output = f"Error retrieving patient history: {str(e)}"
             
             # Check for drug interactions
-            if "interaction" in user_input or "drug" in user_input:
-                # Extract medication names
-                meds = re.findall(r'\b(aspirin|ibuprofen|acetaminophen|warfarin|metformin|lisinopril|potassium|alcohol)\b', user_input, re.IGNORECASE)
+            if output is None and "interactions" in route["intents"]:
+                meds = route["medications"]
                 if len(meds) >= 2:
                     try:
-                        interaction = self.clinical.check_drug_interactions(meds[:2])
-                        print(f"✅ Checked interactions between {meds[0]} and {meds[1]}")
-                        return {"output": f"Drug Interaction Check:\\n{json.dumps(interaction, indent=2)}"}
+                        interaction = yield from self._run_tool("check_drug_interactions", self.clinical.check_drug_interactions, meds)
+                        print(f"✅ Checked interactions between {', '.join(meds)}")
+                        output = f"Drug Interaction Check:\\n{json.dumps(interaction, indent=2)}"
                     except Exception as e:
                         print(f"❌ Error checking interactions: {e}")
-                        return {"output": f"Error checking interactions: {str(e)}"}
+                        output = f"Error checking interactions: {str(e)}"
             
             # Search for patients
-            if "search" in user_input or "find" in user_input or "list" in user_input or "show" in user_input:
+            if output is None and "search" in route["intents"]:
                 try:
-                    patients = self.clinical.search_patients()
+                    patients = yield from self._run_tool("search_patients", self.clinical.search_patients)
                     print(f"✅ Retrieved patient list")
-                    return {"output": f"Available Patients:\\n{json.dumps(patients, indent=2)}"}
+                    output = f"Available Patients:\\n{json.dumps(patients, indent=2)}"
                 except Exception as e:
                     print(f"❌ Error searching patients: {e}")
-                    return {"output": f"Error retrieving patients: {str(e)}"}
+                    output = f"Error retrieving patients: {str(e)}"
             
-            # Default: use LLM to answer
+            if output is not None:
+                yield "token", {"text": output}
+                yield "output", {"output": output}
+                return
+            
+            # Default: use LLM to answer, served from the cache when possible
+            use_cache = self.cache is not None and input_data.get("use_cache", True)
+            if use_cache:
+                cached = self.cache.get(model, temperature, user_input)
+                if cached is not None:
+                    print("⚡ Answered from LLM cache")
+                    yield "token", {"text": cached}
+                    yield "output", {"output": cached}
+                    return
+            elif self.cache is not None:
+                self.cache.record_bypass()
+            
+            # Forward tokens as they arrive
+            from langchain_core.messages import HumanMessage
             print("📝 Using LLM to answer query")
-            response = self.llm.invoke([HumanMessage(content=user_input)])
-            return {"output": response.content}
+            parts = []
+            for chunk in self.llm.stream([HumanMessage(content=user_input)]):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield "token", {"text": chunk.content}
+            output = "".join(parts)
+            if use_cache and output:
+                self.cache.put(model, temperature, user_input, output)
+            yield "output", {"output": output}
+    
+    return DirectToolAgent(llm, clinical or get_clinical(), get_llm_cache() if cache is None else cache)
+
+# ============================================================================
+# DEFERRED SERVICES
+# ============================================================================
+
+# Built on first use (or by initialize_services at startup), never at import
+_services_lock = threading.RLock()
+_agent = None
+_llm_cache: Optional[LLMResponseCache] = None
+_conversation_store = None
+_analytics = None
+
+startup_timings: Dict[str, float] = {}
+_ready = threading.Event()
+_startup_error: Optional[str] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+    with _services_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", ".llm_cache/responses.db"),
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL", "86400")),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+            )
+        return _llm_cache
+
+
+def get_conversation_store():
+    global _conversation_store
+    with _services_lock:
+        if _conversation_store is None:
+            _conversation_store = create_conversation_store(os.getenv("PATIENT_MEMORY_FORMAT", "json"))
+        return _conversation_store
+
+
+def get_analytics(clinical: Optional[ClinicalTools] = None):
+    """
+    Scheduling analytics over a columnar mirror of the appointment book (imports numpy on first call)
+    Mirrors `clinical` (default: the shared repository); rebuilt if handed a different repository
+    """
+    global _analytics
+    clinical = clinical or get_clinical()
+    with _services_lock:
+        if _analytics is None or _analytics.clinical is not clinical:
+            from scheduling_analytics import SchedulingAnalytics
+            _analytics = SchedulingAnalytics(
+                clinical,
+                max_range_days=int(os.getenv("SCHEDULING_ANALYTICS_MAX_DAYS", "366"))
+            )
+        return _analytics
+
+
+def get_agent():
+    """The process-wide DirectToolAgent (imports langchain and builds the LLM client on first call)"""
+    global _agent
+    with _services_lock:
+        if _agent is None:
+            _agent = init_agent()
+        return _agent
+
+
+def initialize_services() -> None:
+    """Build every deferred service, timing each step; readiness flips when done"""
+    global _startup_error
+    steps = [
+        ("clinical_repository", lambda: get_shared_clinical_tools().warm_up()),
+        ("conversation_store", get_conversation_store),
+        ("llm_cache", get_llm_cache),
+        ("analytics", get_analytics),
+        ("agent", get_agent)
+    ]
+    started = time.perf_counter()
+    try:
+        for name, step in steps:
+            step_started = time.perf_counter()
+            step()
+            startup_timings[f"{name}_seconds"] = round(time.perf_counter() - step_started, 3)
+    except Exception as e:
+        _startup_error = f"{name}: {e}"
+        print(f"❌ Startup failed at {_startup_error}")
+        return
+    startup_timings["initialize_seconds"] = round(time.perf_counter() - started, 3)
+    _ready.set()
+    print(f"✅ API ready: {startup_timings}")
+
+
+def close_services() -> None:
+    with _services_lock:
+        if _conversation_store is not None:
+            _conversation_store.close()
+        if _llm_cache is not None:
+            _llm_cache.close()
+        if _agent is not None:
+            from llm_client import close_http_client
+            close_http_client()
+
+# ============================================================================
+# AGENT EXECUTION
+# ============================================================================
+
+class AgentBusyError(Exception):
+    """Raised when the agent queue is full or a request waited too long for a slot"""
+
+
+class AgentRunner:
+    """
+    Runs blocking agent calls off the event loop with bounded concurrency
+    At most `max_concurrency` calls run at once on a dedicated thread pool;
+    up to `queue_limit` more wait (each for at most `queue_timeout` seconds).
+    Beyond that requests are rejected so clients can back off.
+    """
+    
+    def __init__(self, max_concurrency: int = 4, queue_limit: int = 16, queue_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+    
+    async def acquire(self) -> None:
+        """Wait for a free agent slot, raising AgentBusyError under backpressure"""
+        if not self._slots.locked():
+            # A free slot (and nobody queued for it) is taken without waiting
+            await self._slots.acquire()
+            self.in_flight += 1
+            return
+        
+        if self.queue_full():
+            self.rejected += 1
+            raise AgentBusyError("Agent queue is full")
+        
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AgentBusyError(f"No agent slot free after {self.queue_timeout:.0f}s")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+    
+    def queue_full(self) -> bool:
+        """Whether a new caller would be turned away: every slot busy and the queue at its limit"""
+        return self._slots.locked() and self.waiting >= self.queue_limit
+    
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+    
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the agent pool once a slot is free"""
+        await self.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.release()
+    
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "queue_limit": self.queue_limit,
+            "rejected": self.rejected
+        }
+    
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+agent_runner = AgentRunner(
+    max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENCY", "4")),
+    queue_limit=int(os.getenv("AGENT_QUEUE_LIMIT", "16")),
+    queue_timeout=float(os.getenv("AGENT_QUEUE_TIMEOUT", "30"))
+)
+
+# ============================================================================
+# REQUEST COALESCING
+# ============================================================================
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent reads: the first caller for a key starts
+    the computation and every caller arriving while it runs awaits the same
+    result (or exception). Nothing is kept once it finishes.
+    
+    Keys are tuples starting with (operation, patient_id, ...). invalidate()
+    detaches in-flight calls matching a key prefix, so callers arriving after
+    a write start a fresh computation instead of joining one that may have
+    read the old state.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()  # invalidate() is called from tool threads
+        self.started = 0
+        self.coalesced = 0
+        self.invalidated = 0
+    
+    async def run(self, key: Tuple, func: Callable, *args) -> Any:
+        """Await func(*args) for this key; sync functions run on the default thread pool"""
+        with self._lock:
+            task = self._calls.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._call(func, *args))
+                self._calls[key] = task
+                task.add_done_callback(functools.partial(self._forget, key))
+                self.started += 1
+            else:
+                self.coalesced += 1
+        # A disconnecting caller must not cancel the call for everyone else
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    async def _call(func: Callable, *args) -> Any:
+        if asyncio.iscoroutinefunction(func):
+            return await func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+    
+    def _forget(self, key: Tuple, task: asyncio.Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is task:
+                del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
     
-    return DirectToolAgent(llm)
+    def invalidate(self, *prefix) -> None:
+        """Detach in-flight calls whose key starts with prefix"""
+        with self._lock:
+            stale = [key for key in self._calls if key[:len(prefix)] == prefix]
+            for key in stale:
+                del self._calls[key]
+            self.invalidated += len(stale)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "started": self.started,
+                "coalesced": self.coalesced,
+                "invalidated": self.invalidated
+            }
+
+
+flights = SingleFlight()
+
+# Patient-scoped operations coalesced by `flights`
+PATIENT_READS = ("history", "agent_query")
+_watched_clinical: Optional[ClinicalTools] = None
+
+
+def watch_clinical_writes(clinical: ClinicalTools) -> None:
+    """Invalidate a patient's in-flight reads whenever the repository writes for that patient"""
+    global _watched_clinical
+    with _services_lock:
+        if _watched_clinical is clinical:
+            return
+        _watched_clinical = clinical
+    
+    def on_change(event: str, entity: Dict) -> None:
+        patient_id = entity.get("patient_id")
+        if patient_id:
+            for operation in PATIENT_READS:
+                flights.invalidate(operation, patient_id)
+    
+    clinical.subscribe(on_change)
+
+# ============================================================================
+# CONVERSATION AND ACTION PERSISTENCE
+# ============================================================================
+
+def persist_turn(patient_id: str, question: str, answer: str) -> Dict:
+    """Append one question/answer turn to the patient's history, return the AI message"""
+    now = datetime.now().isoformat()
+    human = {"type": "human", "content": question, "timestamp": now}
+    ai = {"type": "ai", "content": answer, "timestamp": now}
+    get_conversation_store().append_messages(patient_id, [human, ai])
+    return ai
 
-agent = init_agent()
+
+action_store = ActionLog(".agent_actions")
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 # ============================================================================
 # API ENDPOINTS
@@ -226,86 +526,267 @@ agent = init_agent()
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness: answers as soon as the process is up, without touching deferred services"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "service": "Clinical AI Agent API"
+        "service": "Clinical AI Agent API",
+        "ready": _ready.is_set(),
+        "agent": agent_runner.stats(),
+        "coalescing": flights.stats()
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the repository, stores and agent are built, 503 until then"""
+    from llm_client import client_stats
+    
+    if not _ready.is_set():
+        return JSONResponse(status_code=503, content={
+            "status": "failed" if _startup_error else "initializing",
+            "error": _startup_error,
+            "startup": startup_timings
+        })
+    return {
+        "status": "ready",
+        "startup": startup_timings,
+        "llm_cache": get_llm_cache().stats(),
+        "llm_client": client_stats(),
+        "analytics": get_analytics().stats(),
+        "safety_audit": get_shared_clinical_tools().safety_log.stats()
     }
 
+def run_agent(input_data: Dict) -> Dict:
+    """Invoke the agent (on the agent pool; the first call may build it)"""
+    return get_agent().invoke(input_data)
+
 @app.post("/api/agent/query")
 async def agent_query(query: PatientQuery):
-    """Send a query to the agent"""
-    try:
+    """
+    Send a query to the agent (runs on the agent pool, never on the event loop)
+    Identical concurrent queries share one agent run and one persisted turn
+    """
+    async def answer() -> str:
         prompt = f"Patient {query.patient_id}: {query.question}"
-        response = agent.invoke({"input": prompt})
+        response = await agent_runner.run(run_agent, {"input": prompt, "use_cache": query.use_cache})
+        output = response.get("output", "No response")
+        await asyncio.get_running_loop().run_in_executor(None, persist_turn, query.patient_id, query.question, output)
+        return output
+    
+    try:
+        key = ("agent_query", query.patient_id, query.question, query.use_cache)
+        output = await flights.run(key, answer)
         
         return {
             "status": "success",
             "patient_id": query.patient_id,
             "query": query.question,
-            "response": response.get("output", "No response"),
+            "response": output,
             "timestamp": datetime.now().isoformat()
         }
+    except AgentBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/agent/query/stream")
+async def agent_query_stream(query: PatientQuery, request: Request):
+    """
+    Stream a query's answer as server-sent events: `start`, `tool` progress,
+    `token` text as it is generated, then `done` with the persisted message
+    (or `error`). The agent slot is taken once the stream starts and held
+    until it ends, so a response that is never sent never holds one.
+    """
+    if agent_runner.queue_full():
+        agent_runner.rejected += 1
+        raise HTTPException(status_code=503, detail="Agent queue is full", headers={"Retry-After": "5"})
+    
+    prompt = f"Patient {query.patient_id}: {query.question}"
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+    
+    def pump():
+        """Run the agent on the pool, handing each event to the event loop"""
+        try:
+            for event in get_agent().stream({"input": prompt, "use_cache": query.use_cache}):
+                if cancelled.is_set():
+                    return
+                loop.call_soon_threadsafe(events.put_nowait, event)
+        except Exception as e:
+            loop.call_soon_threadsafe(events.put_nowait, ("error", {"error": str(e)}))
+        finally:
+            loop.call_soon_threadsafe(events.put_nowait, None)
+    
+    async def event_stream():
+        try:
+            await agent_runner.acquire()
+        except AgentBusyError as e:
+            yield sse_event("error", {"error": str(e), "retry_after": 5})
+            return
+        task = loop.run_in_executor(agent_runner.executor, pump)
+        try:
+            yield sse_event("start", {"patient_id": query.patient_id, "query": query.question})
+            while True:
+                item = await events.get()
+                if item is None:
+                    break
+                event, data = item
+                if event == "output":
+                    message = await loop.run_in_executor(
+                        None, persist_turn, query.patient_id, query.question, data["output"] or "No response"
+                    )
+                    yield sse_event("done", {"patient_id": query.patient_id, "message": message})
+                else:
+                    yield sse_event(event, data)
+                if await request.is_disconnected():
+                    break
+        finally:
+            # On disconnect the pump stops at its next event; keep the slot until it does
+            cancelled.set()
+            if task.done():
+                agent_runner.release()
+            else:
+                task.add_done_callback(lambda _: agent_runner.release())
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/patients/search")
-async def search_patients_endpoint(patient_id: Optional[str] = None, last_name: Optional[str] = None):
+async def search_patients_endpoint(
+    patient_id: Optional[str] = None,
+    last_name: Optional[str] = None,
+    clinical: ClinicalTools = Depends(get_clinical)
+):
     """Search for patients"""
     try:
-        result = await search_patients(patient_id=patient_id, last_name=last_name)
-        return json.loads(result)
+        return clinical.search_patients(patient_id=patient_id, last_name=last_name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/patients/{patient_id}/history")
-async def get_patient_history(patient_id: str):
-    """Get patient's medical history"""
+async def get_patient_history(patient_id: str, clinical: ClinicalTools = Depends(get_clinical)):
+    """Get patient's medical history (identical concurrent requests share one lookup)"""
     try:
-        result = await get_medical_history(patient_id=patient_id)
-        return json.loads(result)
+        return await flights.run(("history", patient_id), clinical.get_medical_history, patient_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/doctors/search")
-async def search_doctors_endpoint(search: DoctorSearch):
+async def search_doctors_endpoint(search: DoctorSearch, clinical: ClinicalTools = Depends(get_clinical)):
     """Search for doctors"""
     try:
-        result = await search_doctors(specialty=search.specialty, available_day=search.available_day)
-        return json.loads(result)
+        return clinical.search_doctors(specialty=search.specialty, available_on=search.available_day)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/appointments/schedule")
-async def schedule_appointment_endpoint(appointment: AppointmentRequest):
+async def schedule_appointment_endpoint(appointment: AppointmentRequest, clinical: ClinicalTools = Depends(get_clinical)):
     """Schedule an appointment"""
     try:
-        result = await schedule_appointment(
+        appointment_datetime = datetime.fromisoformat(appointment.appointment_time)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="appointment_time must be an ISO datetime (YYYY-MM-DDTHH:MM)")
+    
+    try:
+        return clinical.schedule_appointment(
             patient_id=appointment.patient_id,
             doctor_id=appointment.doctor_id,
-            appointment_time=appointment.appointment_time,
+            appointment_date=appointment_datetime.date().isoformat(),
+            appointment_time=appointment_datetime.strftime("%H:%M"),
             reason=appointment.reason,
-            appointment_type=appointment.appointment_type
+            appointment_type=appointment.appointment_type,
+            duration_minutes=appointment.duration_minutes
         )
-        return json.loads(result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/appointments/schedule-batch")
+async def schedule_appointments_batch_endpoint(batch: BatchAppointmentRequest, clinical: ClinicalTools = Depends(get_clinical)):
+    """Schedule many appointments in one validation pass (atomic by default)"""
+    requests = []
+    for index, appointment in enumerate(batch.appointments):
+        try:
+            appointment_datetime = datetime.fromisoformat(appointment.appointment_time)
+        except ValueError:
+            raise HTTPException(
+                status_code=422,
+                detail=f"appointments[{index}].appointment_time must be an ISO datetime (YYYY-MM-DDTHH:MM)"
+            )
+        requests.append({
+            "patient_id": appointment.patient_id,
+            "doctor_id": appointment.doctor_id,
+            "appointment_date": appointment_datetime.date().isoformat(),
+            "appointment_time": appointment_datetime.strftime("%H:%M"),
+            "reason": appointment.reason,
+            "appointment_type": appointment.appointment_type,
+            "duration_minutes": appointment.duration_minutes
+        })
+    
+    try:
+        return clinical.schedule_appointments_batch(requests, atomic=batch.atomic)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/medications/check-interactions")
-async def check_interactions(check: MedicationCheck):
-    """Check drug interactions"""
+async def check_interactions(check: MedicationCheck, clinical: ClinicalTools = Depends(get_clinical)):
+    """Check drug interactions among medication1/medication2 and/or a `medications` list"""
+    medications = [m for m in [check.medication1, check.medication2] if m] + check.medications
     try:
-        result = await check_drug_interactions(
-            medication1=check.medication1,
-            medication2=check.medication2
-        )
-        return json.loads(result)
+        return clinical.check_drug_interactions(medications)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/medications/panel-screening")
+async def panel_screening(
+    severity: Optional[List[str]] = Query(None),
+    clinical: ClinicalTools = Depends(get_clinical)
+):
+    """
+    Screen every patient's active medications for interactions
+    Streams NDJSON: a `summary` line, then one `interaction` line per flagged
+    patient/drug pair, grouped by severity (filter with ?severity=High)
+    """
+    def report():
+        for event, data in clinical.iter_panel_interactions(severity):
+            yield json.dumps({"type": event, **data}) + "\n"
+    
+    # Sync iterator: Starlette runs it on the threadpool, off the event loop
+    return StreamingResponse(report(), media_type="application/x-ndjson")
+
+@app.post("/api/patients/{patient_id}/check-prescription")
+async def check_prescription(patient_id: str, check: PrescriptionCheck, clinical: ClinicalTools = Depends(get_clinical)):
+    """Check a new prescription against the patient's active medications"""
+    try:
+        return clinical.check_prescription_interactions(patient_id, check.medication)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics/scheduling")
+def scheduling_analytics(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    clinical: ClinicalTools = Depends(get_clinical)
+):
+    """
+    Doctor utilization, cancellation rates and booked revenue by day, week and specialty
+    for appointments between start_date and end_date (YYYY-MM-DD, default: today ± 30 days).
+    Computed in vectorized passes and cached until the next booking or cancellation.
+    Plain def: the numpy work runs on the threadpool.
+    """
+    try:
+        return get_analytics(clinical).report(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Action endpoints are plain def: their file locks and reads run on the threadpool
 @app.post("/api/agent/actions")
-async def agent_action(action: AgentAction):
+def agent_action(action: AgentAction):
     """Log or execute agent action (SMS, Call, Escalation, etc.)"""
     try:
         action_log = {
@@ -316,19 +797,8 @@ async def agent_action(action: AgentAction):
             "status": "completed"
         }
         
-        # Save action to log
-        log_file = Path(".agent_actions") / f"{action.patient_id}_actions.json"
-        log_file.parent.mkdir(exist_ok=True)
-        
-        existing = []
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                existing = json.load(f)
-        
-        existing.append(action_log)
-        
-        with open(log_file, 'w') as f:
-            json.dump(existing, f, indent=2)
+        # Append-only, locked write: O(1) and safe under concurrent writers
+        action_store.append(action.patient_id, action_log)
         
         return {
             "status": "success",
@@ -339,53 +809,49 @@ async def agent_action(action: AgentAction):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/agent/actions/{patient_id}")
-async def get_agent_actions(patient_id: str):
-    """Get agent actions for a patient"""
+def get_agent_actions(
+    patient_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = Query(None, ge=0)
+):
+    """
+    Get a patient's agent actions, newest page first
+    Pass the returned `next_cursor` back as `cursor` to fetch older actions
+    """
+    try:
+        page = action_store.read_page(patient_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        log_file = Path(".agent_actions") / f"{patient_id}_actions.json"
-        
-        if not log_file.exists():
-            return {"patient_id": patient_id, "actions": []}
-        
-        with open(log_file, 'r') as f:
-            actions = json.load(f)
-        
         return {
             "patient_id": patient_id,
-            "actions": actions,
-            "total": len(actions)
+            "actions": page["actions"],
+            "next_cursor": page["next_cursor"],
+            "total": action_store.patient_action_count(patient_id)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/dashboard/summary")
-async def get_dashboard_summary():
-    """Get dashboard summary data"""
+def get_dashboard_summary():
+    """Get dashboard summary data (recent_patients: most recently active first)"""
     try:
-        # Count total patients and recent actions
-        actions_dir = Path(".agent_actions")
-        total_actions = 0
-        total_patients = set()
-        
-        if actions_dir.exists():
-            for file in actions_dir.glob("*_actions.json"):
-                patient_id = file.stem.replace('_actions', '')
-                total_patients.add(patient_id)
-                
-                with open(file, 'r') as f:
-                    actions = json.load(f)
-                    total_actions += len(actions)
+        # Running aggregates, cached until the next action is logged
+        summary = action_store.summary(recent_limit=10)
         
         return {
-            "total_patients": len(total_patients),
-            "total_actions": total_actions,
+            "total_patients": summary["total_patients"],
+            "total_actions": summary["total_actions"],
             "timestamp": datetime.now().isoformat(),
             "status": "operational",
-            "recent_patients": list(total_patients)[-10:]
+            "recent_patients": summary["recent_patients"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+startup_timings["import_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
+
 # ============================================================================
 # MAIN
 # ============================================================================
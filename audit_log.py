@@ -0,0 +1,191 @@
+"""
+Safety Audit Log
+Fixed-capacity in-memory ring buffer with a background writer to rotating, gzip-compressed audit files
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+import atexit
+import gzip
+import json
+import shutil
+import threading
+
+from file_lock import locked
+
+
+class SafetyAuditLog:
+    """Recent audit entries in memory, every entry on disk
+
+    record() appends to a bounded deque and a pending batch, then returns; a
+    daemon thread writes batches to {audit_dir}/audit.jsonl every
+    `flush_interval` seconds (or sooner once `batch_size` entries are
+    pending). When the active file passes `max_file_bytes` it is gzipped to
+    audit-<timestamp>.jsonl.gz and a new file is started. Appends and
+    rotation hold an exclusive lock on {audit_dir}/.audit.lock, so several
+    logs (or processes) can share one directory.
+
+    If the writer falls behind by `max_pending` entries, the recording thread
+    writes the backlog itself, so memory stays bounded and nothing is dropped.
+    While the disk is failing the backlog is capped at `max_pending` instead:
+    the oldest entries are dropped (and counted) until a write succeeds.
+    """
+
+    ACTIVE_FILE = "audit.jsonl"
+    LOCK_FILE = ".audit.lock"
+
+    def __init__(
+        self,
+        audit_dir: Optional[str] = ".audit_logs",
+        capacity: int = 10000,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        max_file_bytes: int = 10 * 1024 * 1024,
+        max_pending: int = 50000
+    ):
+        self.audit_dir = Path(audit_dir) if audit_dir else None
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_file_bytes = max_file_bytes
+        self.max_pending = max_pending
+
+        self._recent: deque = deque(maxlen=capacity)
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._failing = False
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Add an entry (only touches disk when the writer has fallen max_pending behind)"""
+        with self._lock:
+            self._recent.append(entry)
+            self.recorded += 1
+            if self.audit_dir is None or self._closed.is_set():
+                return
+            self._pending.append(entry)
+            if self._failing:
+                self._trim_pending()
+            backlog = len(self._pending)
+            failing = self._failing
+            if self._writer is None:
+                self._start_writer()
+        if backlog >= self.max_pending and not failing:
+            self.flush()
+        elif backlog >= self.batch_size:
+            self._wake.set()
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The last `limit` entries, oldest first, in O(limit)"""
+        with self._lock:
+            newest_first = list(islice(reversed(self._recent), max(limit, 0)))
+        newest_first.reverse()
+        return newest_first
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_memory": len(self._recent),
+                "capacity": self.capacity,
+                "recorded": self.recorded,
+                "written": self.written,
+                "dropped": self.dropped,
+                "pending": len(self._pending)
+            }
+
+    # ------------------------------------------------------------------
+    # Background writer
+    # ------------------------------------------------------------------
+
+    def _start_writer(self) -> None:
+        """Start the writer thread on first use (caller holds the lock)"""
+        self._writer = threading.Thread(target=self._write_loop, name="safety-audit-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _write_loop(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending entries to the active audit file"""
+        with self._write_lock:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+        if not batch or self.audit_dir is None:
+            return
+
+        data = "".join(json.dumps(entry, default=str) + "\n" for entry in batch)
+        active = self.audit_dir / self.ACTIVE_FILE
+        try:
+            self.audit_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.audit_dir / self.LOCK_FILE, "a+b") as lock, locked(lock):
+                with open(active, "a", encoding="utf-8") as f:
+                    f.write(data)
+                with self._lock:
+                    self.written += len(batch)
+                    self._failing = False
+                try:
+                    # Checked under the lock: another writer may have just rotated
+                    if active.stat().st_size >= self.max_file_bytes:
+                        self._rotate(active)
+                except OSError as e:
+                    print(f"❌ Failed to rotate safety audit log: {e}")
+        except OSError as e:
+            # Keep the batch for the next attempt, up to max_pending entries
+            print(f"❌ Failed to write safety audit log: {e}")
+            with self._lock:
+                self._pending.extendleft(reversed(batch))
+                self._failing = True
+                self._trim_pending()
+
+    def _trim_pending(self) -> None:
+        """Drop the oldest pending entries beyond max_pending (caller holds the lock)"""
+        excess = len(self._pending) - self.max_pending
+        for _ in range(max(excess, 0)):
+            self._pending.popleft()
+        self.dropped += max(excess, 0)
+
+    def _rotate(self, active: Path) -> None:
+        """Compress the active file into a timestamped archive (caller holds the directory lock)"""
+        archive = self.audit_dir / f"audit-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.jsonl.gz"
+        with open(active, "rb") as source, gzip.open(archive, "wb") as target:
+            shutil.copyfileobj(source, target)
+        active.unlink()
+
+    def reopen(self) -> None:
+        """Write to disk again after close(); the writer restarts with the next entry"""
+        with self._lock:
+            if not self._closed.is_set():
+                return
+            self._closed.clear()
+            self._writer = None
+
+    def close(self) -> None:
+        """Stop the writer and flush what is left"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            atexit.unregister(self.close)
+        self.flush()
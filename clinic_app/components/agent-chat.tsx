@@ -38,20 +38,35 @@ export function AgentChat({ patientId, patientName }: AgentChatProps) {
     setInput("")
     setLoading(true)
 
+    const question = input
+    let streamed = false
+
     try {
-      const response = await ClinicalAgentAPI.queryAgent({
-        patient_id: patientId,
-        question: input,
+      // Show tokens as they arrive in a placeholder agent message
+      await ClinicalAgentAPI.streamAgentQuery({ patient_id: patientId, question }, (event) => {
+        if (event.event === "token" || event.event === "done" || event.event === "error") {
+          if (!streamed) {
+            streamed = true
+            setMessages((prev) => [...prev, { role: "agent", content: "", timestamp: new Date().toISOString() }])
+          }
+        }
+        setMessages((prev) => {
+          const last = prev[prev.length - 1]
+          if (!streamed || last?.role !== "agent") return prev
+          const updated =
+            event.event === "token"
+              ? { ...last, content: last.content + event.data.text }
+              : event.event === "done"
+                ? { ...last, content: event.data.message.content, timestamp: event.data.message.timestamp }
+                : event.event === "error"
+                  ? { ...last, content: `Error: ${event.data.error}` }
+                  : last
+          return [...prev.slice(0, -1), updated]
+        })
       })
-
-      const agentMessage: Message = {
-        role: "agent",
-        content: response.response || "No response from agent",
-        timestamp: response.timestamp || new Date().toISOString(),
-      }
-
-      setMessages((prev) => [...prev, agentMessage])
+      if (!streamed) throw new Error("Empty agent stream")
     } catch (error) {
+      if (streamed) return
       const errorMessage: Message = {
         role: "agent",
         content: "Error: Failed to get response from agent. Make sure the backend is running.",
@@ -126,7 +141,7 @@ export function AgentChat({ patientId, patientName }: AgentChatProps) {
                 )}
               </div>
             ))}
-            {loading && (
+            {loading && messages[messages.length - 1]?.role !== "agent" && (
               <div className="flex gap-3 justify-start">
                 <Avatar className="w-8 h-8 bg-primary/10">
                   <AvatarFallback>
@@ -6,6 +6,7 @@ const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 export interface PatientQuery {
   patient_id: string;
   question: string;
+  use_cache?: boolean;
 }
 
 export interface DoctorSearch {
@@ -19,13 +20,27 @@ export interface AppointmentRequest {
   appointment_time: string;
   reason: string;
   appointment_type?: string;
+  duration_minutes?: number;
+}
+
+export interface BatchAppointmentRequest {
+  appointments: AppointmentRequest[];
+  atomic?: boolean;
 }
 
 export interface MedicationCheck {
-  medication1: string;
-  medication2: string;
+  medication1?: string;
+  medication2?: string;
+  medications?: string[];
 }
 
+export type AgentStreamEvent =
+  | { event: "start"; data: { patient_id: string; query: string } }
+  | { event: "tool"; data: { name: string; status: "started" | "finished" } }
+  | { event: "token"; data: { text: string } }
+  | { event: "done"; data: { patient_id: string; message: { type: string; content: string; timestamp: string } } }
+  | { event: "error"; data: { error: string } };
+
 export interface AgentAction {
   patient_id: string;
   action_type: string;
@@ -38,6 +53,10 @@ export class ClinicalAgentAPI {
     return fetch(`${API_BASE_URL}/health`).then((r) => r.json());
   }
 
+  static async readinessCheck() {
+    return fetch(`${API_BASE_URL}/ready`).then((r) => r.json());
+  }
+
   // Agent Query
   static async queryAgent(query: PatientQuery) {
     const response = await fetch(`${API_BASE_URL}/api/agent/query`, {
@@ -49,6 +68,39 @@ export class ClinicalAgentAPI {
     return response.json();
   }
 
+  // Agent Query, streamed as server-sent events
+  static async streamAgentQuery(query: PatientQuery, onEvent: (event: AgentStreamEvent) => void) {
+    const response = await fetch(`${API_BASE_URL}/api/agent/query/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+      body: JSON.stringify(query),
+    });
+    if (!response.ok || !response.body) throw new Error("Agent query failed");
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        let data = "";
+        for (const line of block.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        if (data) onEvent({ event, data: JSON.parse(data) } as AgentStreamEvent);
+      }
+    }
+  }
+
   // Patient Search
   static async searchPatients(patientId?: string, lastName?: string) {
     const params = new URLSearchParams();
@@ -95,6 +147,20 @@ export class ClinicalAgentAPI {
     return response.json();
   }
 
+  // Schedule Appointments in Bulk
+  static async scheduleAppointmentsBatch(batch: BatchAppointmentRequest) {
+    const response = await fetch(
+      `${API_BASE_URL}/api/appointments/schedule-batch`,
+      {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(batch),
+      }
+    );
+    if (!response.ok) throw new Error("Failed to schedule appointments");
+    return response.json();
+  }
+
   // Check Drug Interactions
   static async checkDrugInteractions(check: MedicationCheck) {
     const response = await fetch(
@@ -109,6 +175,40 @@ export class ClinicalAgentAPI {
     return response.json();
   }
 
+  // Panel-wide interaction screening (NDJSON: summary line, then one line per flagged pair)
+  static async screenPanelInteractions(onLine: (line: Record<string, any>) => void, severity?: string[]) {
+    const params = new URLSearchParams();
+    severity?.forEach((s) => params.append("severity", s));
+    const response = await fetch(`${API_BASE_URL}/api/medications/panel-screening?${params}`);
+    if (!response.ok || !response.body) throw new Error("Panel screening failed");
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split("\n");
+      buffer = lines.pop() ?? "";
+      for (const line of lines) if (line.trim()) onLine(JSON.parse(line));
+    }
+  }
+
+  // Check a new prescription against the patient's active medications
+  static async checkPrescription(patientId: string, medication: string) {
+    const response = await fetch(
+      `${API_BASE_URL}/api/patients/${patientId}/check-prescription`,
+      {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ medication }),
+      }
+    );
+    if (!response.ok) throw new Error("Prescription check failed");
+    return response.json();
+  }
+
   // Log Agent Action
   static async logAgentAction(action: AgentAction) {
     const response = await fetch(`${API_BASE_URL}/api/agent/actions`, {
@@ -120,15 +220,28 @@ export class ClinicalAgentAPI {
     return response.json();
   }
 
-  // Get Agent Actions for Patient
-  static async getAgentActions(patientId: string) {
+  // Get Agent Actions for Patient (newest page first; pass next_cursor back for older actions)
+  static async getAgentActions(patientId: string, limit = 50, cursor?: number) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor !== undefined) params.append("cursor", String(cursor));
+
     const response = await fetch(
-      `${API_BASE_URL}/api/agent/actions/${patientId}`
+      `${API_BASE_URL}/api/agent/actions/${patientId}?${params}`
     );
     if (!response.ok) throw new Error("Failed to fetch actions");
     return response.json();
   }
 
+  // Scheduling analytics (utilization, cancellations, revenue)
+  static async getSchedulingAnalytics(startDate?: string, endDate?: string) {
+    const params = new URLSearchParams();
+    if (startDate) params.append("start_date", startDate);
+    if (endDate) params.append("end_date", endDate);
+    const response = await fetch(`${API_BASE_URL}/api/analytics/scheduling?${params}`);
+    if (!response.ok) throw new Error("Failed to fetch scheduling analytics");
+    return response.json();
+  }
+
   // Get Dashboard Summary
   static async getDashboardSummary() {
     const response = await fetch(`${API_BASE_URL}/api/dashboard/summary`);
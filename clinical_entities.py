@@ -0,0 +1,403 @@
+"""
+Compact Clinical Entities
+Slotted appointment and medical record objects with interned strings and integer epoch timestamps
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from datetime import datetime, timedelta
+import argparse
+import sys
+import time
+import tracemalloc
+
+
+# ============================================================================
+# TIMESTAMPS AND SHARED STRINGS
+# ============================================================================
+
+# Naive (wall-clock) datetimes are stored as integer microseconds since this instant
+# (full datetime precision, so same-second events keep their order)
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(value: Union[datetime, str, None]) -> Optional[int]:
+    """Microseconds since EPOCH for a datetime or ISO string (None passes through)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_epoch(microseconds: int) -> datetime:
+    return EPOCH + timedelta(microseconds=microseconds)
+
+
+def shared(value: Optional[str]) -> Optional[str]:
+    """Intern a repeated string (IDs, statuses, types, reasons) so every entity shares one copy"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# ============================================================================
+# ENTITIES
+# ============================================================================
+
+class CompactEntity:
+    """
+    Base for slotted entities that still read like the dicts they replace
+    entity['field'], .get(), `in`, .keys() and .items() see FIELDS (derived
+    ones through properties); to_dict() builds the plain dict handed out at
+    the API boundary.
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    WRITABLE: Tuple[str, ...] = ()
+
+    def _has(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def __getitem__(self, key: str) -> Any:
+        if not self._has(key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.WRITABLE:
+            raise KeyError(f"{type(self).__name__}.{key} is read-only")
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._has(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if self._has(key) else default
+
+    def keys(self) -> List[str]:
+        return [key for key in self.FIELDS if self._has(key)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Appointment(CompactEntity):
+    """
+    A booked appointment: ~14 pointer slots instead of a 14-key dict
+    Patient and doctor are references to their records (names are derived,
+    not copied), times are epoch microseconds and repeated strings are interned.
+    """
+
+    __slots__ = (
+        "appointment_id", "patient", "doctor", "start", "duration", "reason", "type",
+        "status", "consultation_fee", "created", "cancellation_reason", "cancelled"
+    )
+    FIELDS = (
+        "appointment_id", "patient_id", "patient_name", "doctor_id", "doctor_name",
+        "appointment_time", "duration", "reason", "type", "status", "consultation_fee",
+        "created_at", "cancellation_reason", "cancelled_at"
+    )
+    WRITABLE = ("status", "cancellation_reason", "cancelled_at")
+    CANCELLATION_FIELDS = ("cancellation_reason", "cancelled_at")
+
+    def __init__(
+        self,
+        appointment_id: str,
+        patient: Dict[str, Any],
+        doctor: Dict[str, Any],
+        start: datetime,
+        duration: int,
+        reason: str,
+        type: str,
+        status: str = "scheduled",
+        created: Optional[datetime] = None
+    ):
+        self.appointment_id = appointment_id
+        self.patient = patient
+        self.doctor = doctor
+        self.start = to_epoch(start)
+        self.duration = duration
+        self.reason = shared(reason)
+        self.type = shared(type)
+        self.status = shared(status)
+        self.consultation_fee = doctor.get('consultation_fee')
+        self.created = to_epoch(created or datetime.now())
+        self.cancellation_reason = None
+        self.cancelled = None
+
+    @classmethod
+    def from_dict(
+        cls,
+        data: Dict[str, Any],
+        patient: Optional[Dict[str, Any]] = None,
+        doctor: Optional[Dict[str, Any]] = None
+    ) -> "Appointment":
+        """Compact a legacy appointment dict (unknown patient/doctor keep the stored names)"""
+        if patient is None:
+            patient = {"patient_id": data['patient_id'], "first_name": data.get('patient_name', ""), "last_name": ""}
+        if doctor is None:
+            doctor = {"doctor_id": data['doctor_id'], "name": data.get('doctor_name')}
+        appointment = cls(
+            data['appointment_id'], patient, doctor,
+            datetime.fromisoformat(data['appointment_time']),
+            data.get('duration', 30), data.get('reason'), data.get('type'),
+            data.get('status', "scheduled"),
+            datetime.fromisoformat(data['created_at']) if data.get('created_at') else None
+        )
+        if 'consultation_fee' in data:
+            appointment.consultation_fee = data['consultation_fee']
+        if data.get('cancelled_at'):
+            appointment.cancelled_at = data['cancelled_at']
+            appointment.cancellation_reason = data.get('cancellation_reason')
+        return appointment
+
+    def _has(self, key: str) -> bool:
+        if key in self.CANCELLATION_FIELDS:
+            return self.cancelled is not None
+        return key in self.FIELDS
+
+    def starts_at(self) -> datetime:
+        return from_epoch(self.start)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, shared(value) if key == "status" else value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        view = {
+            "appointment_id": self.appointment_id,
+            "patient_id": self.patient['patient_id'],
+            "patient_name": self.patient_name,
+            "doctor_id": self.doctor['doctor_id'],
+            "doctor_name": self.doctor.get('name'),
+            "appointment_time": from_epoch(self.start).isoformat(),
+            "duration": self.duration,
+            "reason": self.reason,
+            "type": self.type,
+            "status": self.status,
+            "consultation_fee": self.consultation_fee,
+            "created_at": from_epoch(self.created).isoformat()
+        }
+        if self.cancelled is not None:
+            view["cancellation_reason"] = self.cancellation_reason
+            view["cancelled_at"] = from_epoch(self.cancelled).isoformat()
+        return view
+
+    @property
+    def patient_id(self) -> str:
+        return self.patient['patient_id']
+
+    @property
+    def patient_name(self) -> str:
+        return " ".join(name for name in (self.patient.get('first_name'), self.patient.get('last_name')) if name)
+
+    @property
+    def doctor_id(self) -> str:
+        return self.doctor['doctor_id']
+
+    @property
+    def doctor_name(self) -> Optional[str]:
+        return self.doctor.get('name')
+
+    @property
+    def appointment_time(self) -> str:
+        return from_epoch(self.start).isoformat()
+
+    @property
+    def created_at(self) -> str:
+        return from_epoch(self.created).isoformat()
+
+    @property
+    def cancelled_at(self) -> Optional[str]:
+        return from_epoch(self.cancelled).isoformat() if self.cancelled is not None else None
+
+    @cancelled_at.setter
+    def cancelled_at(self, value: Union[datetime, str, None]) -> None:
+        self.cancelled = to_epoch(value)
+
+
+class MedicalRecord(CompactEntity):
+    """A consultation record with an interned patient ID and epoch timestamps"""
+
+    __slots__ = (
+        "record_id", "patient_id", "appointment_id", "recorded", "diagnosis", "symptoms",
+        "prescribed_medications", "notes", "follow_up_required", "follow_up_date",
+        "created_by", "created"
+    )
+    FIELDS = (
+        "record_id", "patient_id", "appointment_id", "date", "diagnosis", "symptoms",
+        "prescribed_medications", "notes", "follow_up_required", "follow_up_date",
+        "created_by", "created_at"
+    )
+
+    def __init__(
+        self,
+        record_id: str,
+        patient_id: str,
+        appointment_id: Optional[str],
+        diagnosis: str,
+        symptoms: List[str],
+        prescribed_medications: List[Dict[str, str]],
+        notes: str,
+        follow_up_required: bool = False,
+        follow_up_date: Optional[str] = None,
+        created_by: str = "system",
+        recorded: Optional[datetime] = None,
+        created: Optional[datetime] = None
+    ):
+        now = datetime.now()
+        self.record_id = record_id
+        self.patient_id = shared(patient_id)
+        self.appointment_id = appointment_id
+        self.recorded = to_epoch(recorded or now)
+        self.diagnosis = shared(diagnosis)
+        self.symptoms = symptoms
+        self.prescribed_medications = prescribed_medications
+        self.notes = notes
+        self.follow_up_required = follow_up_required
+        self.follow_up_date = follow_up_date
+        self.created_by = shared(created_by)
+        self.created = to_epoch(created or now)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MedicalRecord":
+        """Compact a legacy medical record dict"""
+        return cls(
+            data['record_id'], data['patient_id'], data.get('appointment_id'),
+            data.get('diagnosis'), data.get('symptoms') or [], data.get('prescribed_medications') or [],
+            data.get('notes'), data.get('follow_up_required', False), data.get('follow_up_date'),
+            data.get('created_by', "system"),
+            datetime.fromisoformat(data['date']) if data.get('date') else None,
+            datetime.fromisoformat(data['created_at']) if data.get('created_at') else None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "record_id": self.record_id,
+            "patient_id": self.patient_id,
+            "appointment_id": self.appointment_id,
+            "date": from_epoch(self.recorded).isoformat(),
+            "diagnosis": self.diagnosis,
+            "symptoms": self.symptoms,
+            "prescribed_medications": self.prescribed_medications,
+            "notes": self.notes,
+            "follow_up_required": self.follow_up_required,
+            "follow_up_date": self.follow_up_date,
+            "created_by": self.created_by,
+            "created_at": from_epoch(self.created).isoformat()
+        }
+
+    @property
+    def date(self) -> str:
+        return from_epoch(self.recorded).isoformat()
+
+    @property
+    def created_at(self) -> str:
+        return from_epoch(self.created).isoformat()
+
+
+# ============================================================================
+# MEMORY BENCHMARK
+# ============================================================================
+
+def _measure(build) -> Tuple[int, float]:
+    """Bytes held by what build() returns, and seconds to build it"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size, elapsed
+
+
+def benchmark(count: int) -> Dict[str, Any]:
+    """Memory of `count` appointments as dicts (as previously stored) vs Appointment objects"""
+    patients = [
+        {"patient_id": f"PT{i:06d}", "first_name": f"First{i}", "last_name": f"Last{i}"}
+        for i in range(5000)
+    ]
+    doctors = [
+        {"doctor_id": f"DR{i:03d}", "name": f"Dr. Doctor {i}", "consultation_fee": 150 + i}
+        for i in range(50)
+    ]
+    reasons = ["Annual checkup", "Follow-up", "Medication review", "Lab results", "Consultation"]
+    types = ["checkup", "follow-up", "consultation"]
+    first_day = datetime(2030, 1, 7, 9)
+
+    def request(i: int):
+        # Strings arrive fresh from each request body, as they would from the API
+        return (
+            patients[i % len(patients)],
+            doctors[i % len(doctors)],
+            first_day + timedelta(minutes=30 * i),
+            (" " + reasons[i % len(reasons)])[1:],
+            (" " + types[i % len(types)])[1:]
+        )
+
+    def as_dicts():
+        appointments = []
+        for i in range(count):
+            patient, doctor, start, reason, kind = request(i)
+            appointments.append({
+                "appointment_id": f"APT{i + 1:06d}",
+                "patient_id": patient['patient_id'],
+                "patient_name": f"{patient['first_name']} {patient['last_name']}",
+                "doctor_id": doctor['doctor_id'],
+                "doctor_name": doctor['name'],
+                "appointment_time": start.isoformat(),
+                "duration": 30,
+                "reason": reason,
+                "type": kind,
+                "status": "scheduled",
+                "consultation_fee": doctor['consultation_fee'],
+                "created_at": (start - timedelta(days=7, microseconds=i)).isoformat()
+            })
+        return appointments
+
+    def as_entities():
+        appointments = []
+        for i in range(count):
+            patient, doctor, start, reason, kind = request(i)
+            appointments.append(Appointment(
+                f"APT{i + 1:06d}", patient, doctor, start, 30, reason, kind,
+                created=start - timedelta(days=7, microseconds=i)
+            ))
+        return appointments
+
+    dict_bytes, dict_seconds = _measure(as_dicts)
+    entity_bytes, entity_seconds = _measure(as_entities)
+    return {
+        "appointments": count,
+        "dict_bytes_per_appointment": round(dict_bytes / count),
+        "compact_bytes_per_appointment": round(entity_bytes / count),
+        "dict_total_mb": round(dict_bytes / 2**20, 1),
+        "compact_total_mb": round(entity_bytes / 2**20, 1),
+        "reduction": f"{1 - entity_bytes / dict_bytes:.0%}",
+        "dict_build_seconds": round(dict_seconds, 2),
+        "compact_build_seconds": round(entity_seconds, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare appointment memory: plain dicts vs compact entities")
+    parser.add_argument("--count", type=int, default=1_000_000, help="Appointments to build")
+    args = parser.parse_args()
+
+    for key, value in benchmark(args.count).items():
+        print(f"📊 {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
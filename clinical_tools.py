@@ -4,10 +4,28 @@ Implements healthcare operations: patient management, appointments, medical reco
 SAFETY-FIRST: All operations include validation, audit logging, and error checking
 """
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Set, Tuple, Union, Callable
+from datetime import datetime, timedelta, date
+from collections import defaultdict, Counter
+from bisect import bisect_left, bisect_right
+import functools
+import os
 import random
 import re
+import threading
+
+from clinical_entities import Appointment, MedicalRecord
+from drug_interactions import DrugInteractionIndex
+from audit_log import SafetyAuditLog
+
+
+def synchronized(method):
+    """Run a ClinicalTools method under the instance lock (shared across threads)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class SafetyValidator:
@@ -41,12 +59,15 @@ class SafetyValidator:
     
     @staticmethod
     def check_appointment_conflict(
-        appointments: List[Dict],
+        appointments: Union[List[Dict], "AppointmentCalendar"],
         doctor_id: str,
         appointment_time: datetime,
         duration_minutes: int = 30
     ) -> Optional[Dict]:
-        """Check for scheduling conflicts"""
+        """Check for scheduling conflicts (O(log n) when given an AppointmentCalendar)"""
+        if isinstance(appointments, AppointmentCalendar):
+            return appointments.find_conflict(doctor_id, appointment_time, duration_minutes)
+        
         end_time = appointment_time + timedelta(minutes=duration_minutes)
         
         for appt in appointments:
@@ -61,20 +82,416 @@ class SafetyValidator:
         return None
 
 
+class DoctorSchedule:
+    """
+    One doctor's non-cancelled appointments as pre-parsed intervals sorted by start
+    Overlap queries bisect on start time and only walk back over entries that
+    could still be running (bounded by the longest duration seen).
+    """
+    
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        self._appointments: List[Dict] = []
+        self._max_duration = timedelta(0)
+    
+    def __len__(self) -> int:
+        return len(self._starts)
+    
+    def add(self, start: datetime, end: datetime, appointment: Dict) -> None:
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._appointments.insert(i, appointment)
+        self._max_duration = max(self._max_duration, end - start)
+    
+    def remove(self, start: datetime, appointment_id: str) -> bool:
+        i = bisect_left(self._starts, start)
+        while i < len(self._starts) and self._starts[i] == start:
+            if self._appointments[i]['appointment_id'] == appointment_id:
+                del self._starts[i]
+                del self._ends[i]
+                del self._appointments[i]
+                return True
+            i += 1
+        return False
+    
+    def find_overlap(self, start: datetime, end: datetime) -> Optional[Dict]:
+        """First booked interval overlapping [start, end), if any"""
+        i = bisect_left(self._starts, end)
+        earliest = start - self._max_duration
+        while i > 0:
+            i -= 1
+            if self._starts[i] <= earliest:
+                break
+            if self._ends[i] > start:
+                return self._appointments[i]
+        return None
+    
+    def intervals_between(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Booked (start, end) intervals overlapping [start, end), sorted by start"""
+        i = bisect_left(self._starts, start - self._max_duration)
+        j = bisect_left(self._starts, end)
+        return [(s, e) for s, e in zip(self._starts[i:j], self._ends[i:j]) if e > start]
+
+
+class AppointmentCalendar:
+    """
+    Per-doctor interval index over booked (non-cancelled) appointments
+    Also keeps a per-(doctor, day) occupancy bitmap: bit i is set when any
+    appointment touches the i-th SLOT_MINUTES slot of that day.
+    """
+    
+    SLOT_MINUTES = 15
+    
+    def __init__(self, appointments: Optional[List[Dict]] = None):
+        self._schedules: Dict[str, DoctorSchedule] = defaultdict(DoctorSchedule)
+        self._occupancy: Dict[Tuple[str, date], int] = {}
+        for appointment in appointments or []:
+            self.add(appointment)
+    
+    def _slot_range(self, day: date, start: datetime, end: datetime) -> Tuple[int, int]:
+        """Slots of `day` touched by [start, end) as a half-open index range"""
+        midnight = datetime.combine(day, datetime.min.time())
+        first = max(start, midnight)
+        last = min(end, midnight + timedelta(days=1))
+        first_slot = int((first - midnight).total_seconds() // 60) // self.SLOT_MINUTES
+        end_minutes = (last - midnight).total_seconds() / 60
+        end_slot = -int(-end_minutes // self.SLOT_MINUTES)
+        return first_slot, end_slot
+    
+    def _mark(self, doctor_id: str, start: datetime, end: datetime) -> None:
+        day = start.date()
+        while datetime.combine(day, datetime.min.time()) < end:
+            first_slot, end_slot = self._slot_range(day, start, end)
+            if end_slot > first_slot:
+                bits = ((1 << (end_slot - first_slot)) - 1) << first_slot
+                key = (doctor_id, day)
+                self._occupancy[key] = self._occupancy.get(key, 0) | bits
+            day += timedelta(days=1)
+    
+    def _rebuild_day(self, doctor_id: str, day: date) -> None:
+        """Recompute one day's bitmap from the schedule (after a removal)"""
+        self._occupancy.pop((doctor_id, day), None)
+        schedule = self._schedules.get(doctor_id)
+        if not schedule:
+            return
+        midnight = datetime.combine(day, datetime.min.time())
+        for start, end in schedule.intervals_between(midnight, midnight + timedelta(days=1)):
+            first_slot, end_slot = self._slot_range(day, start, end)
+            if end_slot > first_slot:
+                bits = ((1 << (end_slot - first_slot)) - 1) << first_slot
+                self._occupancy[(doctor_id, day)] = self._occupancy.get((doctor_id, day), 0) | bits
+    
+    def occupancy(self, doctor_id: str, day: date) -> int:
+        """Occupancy bitmap of one doctor's day (0 when nothing is booked)"""
+        return self._occupancy.get((doctor_id, day), 0)
+    
+    def free_starts(
+        self,
+        doctor_id: str,
+        day: date,
+        open_slot: int,
+        close_slot: int,
+        duration_minutes: int
+    ) -> List[int]:
+        """Slot indexes in [open_slot, close_slot) where `duration_minutes` fits without overlap"""
+        needed = -(-duration_minutes // self.SLOT_MINUTES)
+        mask = (1 << needed) - 1
+        bitmap = self.occupancy(doctor_id, day)
+        return [
+            slot for slot in range(open_slot, close_slot - needed + 1)
+            if not (bitmap >> slot) & mask
+        ]
+    
+    @staticmethod
+    def interval(appointment: Dict) -> Tuple[datetime, datetime]:
+        if isinstance(appointment, Appointment):
+            start = appointment.starts_at()
+        else:
+            start = datetime.fromisoformat(appointment['appointment_time'])
+        return start, start + timedelta(minutes=appointment.get('duration', 30))
+    
+    def add(self, appointment: Dict) -> None:
+        if appointment['status'] == 'cancelled':
+            return
+        start, end = self.interval(appointment)
+        self._schedules[appointment['doctor_id']].add(start, end, appointment)
+        self._mark(appointment['doctor_id'], start, end)
+    
+    def remove(self, appointment: Dict) -> None:
+        schedule = self._schedules.get(appointment['doctor_id'])
+        if schedule:
+            start, end = self.interval(appointment)
+            if schedule.remove(start, appointment['appointment_id']):
+                day = start.date()
+                while datetime.combine(day, datetime.min.time()) < end:
+                    self._rebuild_day(appointment['doctor_id'], day)
+                    day += timedelta(days=1)
+    
+    def schedule_for(self, doctor_id: str) -> Optional[DoctorSchedule]:
+        return self._schedules.get(doctor_id)
+    
+    def find_conflict(self, doctor_id: str, start: datetime, duration_minutes: int = 30) -> Optional[Dict]:
+        schedule = self._schedules.get(doctor_id)
+        if not schedule:
+            return None
+        return schedule.find_overlap(start, start + timedelta(minutes=duration_minutes))
+
+
+class SubstringIndex:
+    """
+    N-gram inverted index answering substring queries over normalized values
+    Every substring up to GRAM characters is indexed, so short queries are a
+    single posting lookup and longer ones intersect their trigram postings
+    (smallest first) and verify the survivors.
+    """
+    
+    GRAM = 3
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._values: Dict[str, str] = {}
+    
+    def _grams(self, value: str) -> Set[str]:
+        return {
+            value[i:i + n]
+            for n in range(1, self.GRAM + 1)
+            for i in range(len(value) - n + 1)
+        }
+    
+    def add(self, key: str, value: str) -> None:
+        """Index `value` (already normalized) under `key`, replacing any previous value"""
+        self.remove(key)
+        self._values[key] = value
+        for gram in self._grams(value):
+            self._postings[gram].add(key)
+    
+    def remove(self, key: str) -> None:
+        value = self._values.pop(key, None)
+        if value is None:
+            return
+        for gram in self._grams(value):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+    
+    def search(self, query: str) -> Set[str]:
+        """Keys whose value contains `query` (already normalized)"""
+        if not query:
+            return set(self._values)
+        if len(query) <= self.GRAM:
+            return set(self._postings.get(query, ()))
+        
+        postings = []
+        for i in range(len(query) - self.GRAM + 1):
+            keys = self._postings.get(query[i:i + self.GRAM])
+            if not keys:
+                return set()
+            postings.append(keys)
+        postings.sort(key=len)
+        
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates &= keys
+            if not candidates:
+                return candidates
+        return {key for key in candidates if query in self._values[key]}
+
+
+class PatientHistory:
+    """
+    Materialized view of one patient's medical records and appointments
+    Records are kept newest first and appointments earliest first (ties in
+    insertion order, as a stable sort would leave them), with appointment
+    counts per status, so reading a history costs O(size of the result).
+    """
+    
+    def __init__(self):
+        # Sorted ascending by (recorded epoch, -seq) and (start epoch, seq)
+        self._record_keys: List[Tuple[int, int]] = []
+        self._records: List[MedicalRecord] = []
+        self._appointment_keys: List[Tuple[int, int]] = []
+        self._appointments: List[Appointment] = []
+        self._seq = 0
+        self.status_counts: Counter = Counter()
+    
+    def add_record(self, record: MedicalRecord) -> None:
+        self._seq += 1
+        key = (record.recorded, -self._seq)
+        i = bisect_right(self._record_keys, key)
+        self._record_keys.insert(i, key)
+        self._records.insert(i, record)
+    
+    def add_appointment(self, appointment: Appointment) -> None:
+        self._seq += 1
+        key = (appointment.start, self._seq)
+        i = bisect_right(self._appointment_keys, key)
+        self._appointment_keys.insert(i, key)
+        self._appointments.insert(i, appointment)
+        self.status_counts[appointment['status']] += 1
+    
+    def status_changed(self, old_status: str, new_status: str) -> None:
+        self.status_counts[old_status] -= 1
+        self.status_counts[new_status] += 1
+    
+    def records(self) -> List[MedicalRecord]:
+        """Medical records, newest first"""
+        return self._records[::-1]
+    
+    def appointments(self, limit: Optional[int] = None) -> List[Appointment]:
+        """Appointments by time, earliest first"""
+        return self._appointments[:limit]
+
+
+def medication_name(medication: Union[Dict[str, Any], str]) -> Optional[str]:
+    """Name of one prescribed medication ({"name": ...} dicts or plain strings)"""
+    if isinstance(medication, dict):
+        return medication.get('name') or medication.get('medication')
+    return medication or None
+
+
+def is_active_prescription(medication: Union[Dict[str, Any], str], today: str) -> bool:
+    """A prescription is active unless discontinued/completed/stopped or past its end_date"""
+    if not isinstance(medication, dict):
+        return True
+    if str(medication.get('status', '')).lower() in ("discontinued", "completed", "stopped"):
+        return False
+    return not (medication.get('end_date') and medication['end_date'] < today)
+
+
+def medication_names(record: Dict[str, Any]) -> List[str]:
+    """Names of the medications prescribed in a medical record"""
+    names = [medication_name(m) for m in record.get('prescribed_medications') or []]
+    return [name for name in names if name]
+
+
 class ClinicalTools:
     """Collection of tools for clinical operations with safety protocols"""
     
+    # Bookable hours used by the free-slot search
+    OPENING_HOUR = 9
+    CLOSING_HOUR = 17
+    
+    # Patients per block when screening the panel for interactions
+    PANEL_CHUNK_ROWS = 4096
+    
     def __init__(self):
         self.patients = self._initialize_mock_patients()
         self.appointments = []
         self.medical_records = []
         self.doctors = self._initialize_mock_doctors()
-        self.safety_log = []
+        self.safety_log = SafetyAuditLog(
+            audit_dir=os.getenv("SAFETY_AUDIT_DIR", ".audit_logs") or None,
+            capacity=int(os.getenv("SAFETY_LOG_CAPACITY", "10000"))
+        )
         self.validator = SafetyValidator()
+        self.interactions = DrugInteractionIndex.load(os.getenv("DRUG_INTERACTIONS_PATH") or None)
+        self.ready = False
+        self._lock = threading.RLock()
+        self._subscribers: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._build_indexes()
+        
+        # Every write keeps the indexes current from here on
+        self.ready = True
+    
+    def _build_indexes(self) -> None:
+        """Build primary-key indexes (ID -> entity) over all entity lists"""
+        self._patients_by_id = {p['patient_id']: p for p in self.patients}
+        self._doctors_by_id = {d['doctor_id']: d for d in self.doctors}
+        
+        # Appointments and records are held compact; compact any loaded as plain dicts
+        self.appointments = [
+            Appointment.from_dict(a, self._patients_by_id.get(a['patient_id']), self._doctors_by_id.get(a['doctor_id']))
+            if isinstance(a, dict) else a
+            for a in self.appointments
+        ]
+        self.medical_records = [
+            MedicalRecord.from_dict(r) if isinstance(r, dict) else r
+            for r in self.medical_records
+        ]
+        self._appointments_by_id = {a['appointment_id']: a for a in self.appointments}
+        self._records_by_id = {r['record_id']: r for r in self.medical_records}
+        self._calendar = AppointmentCalendar(self.appointments)
+        
+        # Per-patient history views, updated on every write
+        self._histories: Dict[str, PatientHistory] = defaultdict(PatientHistory)
+        for appointment in self.appointments:
+            self._histories[appointment['patient_id']].add_appointment(appointment)
+        for record in self.medical_records:
+            self._histories[record['patient_id']].add_record(record)
+        
+        # Secondary patient search indexes
+        self._patient_positions: Dict[str, int] = {}
+        self._first_name_index = SubstringIndex()
+        self._last_name_index = SubstringIndex()
+        self._phone_index = SubstringIndex()
+        self._dob_index: Dict[str, Set[str]] = defaultdict(set)
+        for patient in self.patients:
+            self._index_patient(patient)
+    
+    def _index_patient(self, patient: Dict[str, Any]) -> None:
+        """Add a patient to the secondary search indexes"""
+        patient_id = patient['patient_id']
+        self._patient_positions.setdefault(patient_id, len(self._patient_positions))
+        self._first_name_index.add(patient_id, patient['first_name'].lower())
+        self._last_name_index.add(patient_id, patient['last_name'].lower())
+        self._phone_index.add(patient_id, re.sub(r'[^\d]', '', patient['phone']))
+        self._dob_index[patient['date_of_birth']].add(patient_id)
+    
+    @synchronized
+    def warm_up(self) -> Dict[str, int]:
+        """
+        Prepare the repository before serving requests (idempotent)
+        Indexes are built in __init__, so this only rebuilds them (and reopens
+        the audit log) after close(); it holds the lock so a rebuild never
+        races a concurrent write
+        """
+        if not self.ready:
+            self.safety_log.reopen()
+            self._build_indexes()
+            self.ready = True
+        self._log_operation("warm_up", {
+            "patients": len(self.patients),
+            "doctors": len(self.doctors)
+        }, True)
+        
+        return {
+            "patients": len(self.patients),
+            "doctors": len(self.doctors),
+            "appointments": len(self.appointments),
+            "medical_records": len(self.medical_records)
+        }
+    
+    def close(self) -> None:
+        """Release the repository at process shutdown (stops the audit writer)"""
+        self.ready = False
+        self.safety_log.close()
+    
+    def subscribe(self, callback: Callable[[str, Dict[str, Any]], None]) -> None:
+        """
+        Register callback(event, entity) for repository writes
+        Events: "patient_registered", "medical_record_added",
+        "appointment_scheduled", "appointment_cancelled"
+        """
+        self._subscribers.append(callback)
+    
+    def _notify(self, event: str, entity: Dict[str, Any]) -> None:
+        for callback in self._subscribers:
+            callback(event, entity)
+    
+    def known_medications(self) -> List[str]:
+        """Medication names (and synonyms) in the interaction table and in prescriptions, sorted"""
+        names = set(self.interactions.names())
+        for record in self.medical_records:
+            names.update(medication_names(record))
+        return sorted(names)
     
     def _log_operation(self, operation: str, details: Dict[str, Any], success: bool):
         """Log all operations for audit trail"""
-        self.safety_log.append({
+        self.safety_log.record({
             "timestamp": datetime.now().isoformat(),
             "operation": operation,
             "details": details,
@@ -180,24 +597,42 @@ class ClinicalTools:
         """
         Search for patients by various criteria
         SAFETY: Implements access control and audit logging
-        """
-        results = list(self.patients)
-        
-        if patient_id:
-            results = [p for p in results if p['patient_id'] == patient_id]
-        
-        if first_name:
-            results = [p for p in results if first_name.lower() in p['first_name'].lower()]
-        
-        if last_name:
-            results = [p for p in results if last_name.lower() in p['last_name'].lower()]
-        
-        if date_of_birth:
-            results = [p for p in results if p['date_of_birth'] == date_of_birth]
         
-        if phone:
-            cleaned_phone = re.sub(r'[^\d]', '', phone)
-            results = [p for p in results if cleaned_phone in re.sub(r'[^\d]', '', p['phone'])]
+        Names match case-insensitive substrings, phone matches a substring of
+        the digits. Each criterion yields a candidate set from its index and
+        the sets are intersected smallest first.
+        """
+        # The index sets are mutated by register_new_patient, so read them under the lock
+        with self._lock:
+            candidate_sets = []
+            
+            if patient_id:
+                candidate_sets.append({patient_id} if patient_id in self._patients_by_id else set())
+            
+            if first_name:
+                candidate_sets.append(self._first_name_index.search(first_name.lower()))
+            
+            if last_name:
+                candidate_sets.append(self._last_name_index.search(last_name.lower()))
+            
+            if date_of_birth:
+                candidate_sets.append(self._dob_index.get(date_of_birth, set()))
+            
+            if phone:
+                cleaned_phone = re.sub(r'[^\d]', '', phone)
+                candidate_sets.append(self._phone_index.search(cleaned_phone))
+            
+            if candidate_sets:
+                candidate_sets.sort(key=len)
+                matches = set(candidate_sets[0])
+                for candidates in candidate_sets[1:]:
+                    if not matches:
+                        break
+                    matches &= candidates
+                # Keep registration order, as a linear scan would
+                results = [self._patients_by_id[pid] for pid in sorted(matches, key=self._patient_positions.__getitem__)]
+            else:
+                results = list(self.patients)
         
         self._log_operation("search_patients", {
             "criteria": {"patient_id": patient_id, "name": f"{first_name} {last_name}"},
@@ -215,13 +650,13 @@ class ClinicalTools:
             self._log_operation("get_patient_details", {"patient_id": patient_id}, False)
             return {"error": "Invalid patient ID format. Expected: PT######"}
         
-        for patient in self.patients:
-            if patient['patient_id'] == patient_id:
-                self._log_operation("get_patient_details", {"patient_id": patient_id}, True)
-                return patient
+        patient = self._patients_by_id.get(patient_id)
+        if patient:
+            self._log_operation("get_patient_details", {"patient_id": patient_id}, True)
         
-        return None
+        return patient
     
+    @synchronized
     def register_new_patient(
         self,
         first_name: str,
@@ -276,7 +711,10 @@ class ClinicalTools:
         }
         
         self.patients.append(new_patient)
+        self._patients_by_id[patient_id] = new_patient
+        self._index_patient(new_patient)
         self._log_operation("register_new_patient", {"patient_id": patient_id, "name": f"{first_name} {last_name}"}, True)
+        self._notify("patient_registered", new_patient)
         
         return {
             "success": True,
@@ -291,19 +729,21 @@ class ClinicalTools:
         available_on: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Search for doctors by specialty or availability"""
-        results = list(self.doctors)
+        if doctor_id:
+            doctor = self._doctors_by_id.get(doctor_id)
+            results = [doctor] if doctor else []
+        else:
+            results = list(self.doctors)
         
         if specialty:
             results = [d for d in results if specialty.lower() in d['specialty'].lower()]
         
-        if doctor_id:
-            results = [d for d in results if d['doctor_id'] == doctor_id]
-        
         if available_on:
             results = [d for d in results if available_on in d['available_days']]
         
         return results
     
+    @synchronized
     def schedule_appointment(
         self,
         patient_id: str,
@@ -311,22 +751,145 @@ class ClinicalTools:
         appointment_date: str,
         appointment_time: str,
         reason: str,
-        appointment_type: str = "Consultation"
+        appointment_type: str = "Consultation",
+        duration_minutes: int = 30
     ) -> Dict[str, Any]:
         """
         Schedule a medical appointment
         SAFETY: Validates IDs, checks conflicts, ensures proper scheduling
         """
+        checked = self._validate_appointment(
+            patient_id, doctor_id, appointment_date, appointment_time, duration_minutes
+        )
+        if not checked["success"]:
+            return checked
+        
+        return self._create_appointment(
+            checked["patient"], checked["doctor"], checked["appointment_datetime"],
+            reason, appointment_type, duration_minutes
+        )
+    
+    @synchronized
+    def schedule_appointments_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        atomic: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Schedule many appointments with one validation pass
+        SAFETY: Each request gets the same checks as schedule_appointment,
+        plus conflicts between requests in the same batch
+        
+        Args:
+            requests: dicts with the schedule_appointment arguments
+                (patient_id, doctor_id, appointment_date, appointment_time,
+                reason, optional appointment_type and duration_minutes)
+            atomic: if True, nothing is booked unless every request is valid;
+                otherwise valid requests are booked and failures reported per item
+        """
+        patients: Dict[str, Optional[Dict[str, Any]]] = {}
+        batch_calendar = AppointmentCalendar()
+        validated = []
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        
+        required = ("patient_id", "doctor_id", "appointment_date", "appointment_time", "reason")
+        
+        for index, request in enumerate(requests):
+            missing = [field for field in required if not request.get(field)]
+            if missing:
+                results[index] = {"success": False, "index": index, "error": f"Missing fields: {', '.join(missing)}"}
+                continue
+            
+            duration_minutes = request.get("duration_minutes", 30)
+            checked = self._validate_appointment(
+                request["patient_id"],
+                request["doctor_id"],
+                request["appointment_date"],
+                request["appointment_time"],
+                duration_minutes,
+                patients=patients,
+                pending=batch_calendar
+            )
+            
+            if not checked["success"]:
+                results[index] = dict(checked, index=index)
+                continue
+            
+            # Hold the slot so later requests in this batch see it
+            batch_calendar.add({
+                "appointment_id": f"batch[{index}]",
+                "doctor_id": request["doctor_id"],
+                "appointment_time": checked["appointment_datetime"].isoformat(),
+                "duration": duration_minutes,
+                "status": "scheduled"
+            })
+            validated.append((index, request, checked))
+        
+        failed = sum(1 for r in results if r is not None)
+        commit = not (atomic and failed)
+        
+        for index, request, checked in validated:
+            if commit:
+                created = self._create_appointment(
+                    checked["patient"], checked["doctor"], checked["appointment_datetime"],
+                    request["reason"], request.get("appointment_type", "Consultation"),
+                    request.get("duration_minutes", 30)
+                )
+                results[index] = dict(created, index=index)
+            else:
+                results[index] = {
+                    "success": False,
+                    "index": index,
+                    "valid": True,
+                    "error": "Not scheduled: other requests in this atomic batch failed"
+                }
+        
+        scheduled = len(validated) if commit else 0
+        self._log_operation("schedule_appointments_batch", {
+            "requested": len(requests),
+            "scheduled": scheduled,
+            "atomic": atomic
+        }, failed == 0)
+        
+        return {
+            "success": failed == 0,
+            "atomic": atomic,
+            "requested": len(requests),
+            "scheduled": scheduled,
+            "failed": failed,
+            "results": results
+        }
+    
+    def _validate_appointment(
+        self,
+        patient_id: str,
+        doctor_id: str,
+        appointment_date: str,
+        appointment_time: str,
+        duration_minutes: int,
+        patients: Optional[Dict[str, Optional[Dict[str, Any]]]] = None,
+        pending: Optional[AppointmentCalendar] = None
+    ) -> Dict[str, Any]:
+        """
+        Run every scheduling safety check for one request
+        Returns {"success": False, "error": ...} or the resolved patient,
+        doctor and appointment_datetime. `patients` memoizes patient lookups
+        and `pending` holds slots already claimed in the same batch.
+        """
         # Validate patient
-        patient = self.get_patient_details(patient_id)
+        if patients is not None and patient_id in patients:
+            patient = patients[patient_id]
+        else:
+            patient = self.get_patient_details(patient_id)
+            if patients is not None:
+                patients[patient_id] = patient
         if not patient or "error" in patient:
             return {"success": False, "error": "Invalid or unknown patient ID"}
         
         # Validate doctor
-        doctors = self.search_doctors(doctor_id=doctor_id)
-        if not doctors:
+        doctor = self._doctors_by_id.get(doctor_id)
+        if not doctor:
             return {"success": False, "error": "Invalid or unknown doctor ID"}
-        doctor = doctors[0]
         
         # Validate and parse datetime
         try:
@@ -338,6 +901,13 @@ class ClinicalTools:
         if appointment_datetime <= datetime.now():
             return {"success": False, "error": "Appointment must be scheduled in the future"}
         
+        # Batch items arrive as raw JSON values, so check the type before comparing
+        if isinstance(duration_minutes, bool) or not isinstance(duration_minutes, int):
+            return {"success": False, "error": "Appointment duration must be a whole number of minutes"}
+        
+        if duration_minutes <= 0:
+            return {"success": False, "error": "Appointment duration must be positive"}
+        
         # Check doctor availability day
         day_name = appointment_datetime.strftime("%A")
         if day_name not in doctor['available_days']:
@@ -349,9 +919,10 @@ class ClinicalTools:
         
         # Check for conflicts
         conflict = self.validator.check_appointment_conflict(
-            self.appointments,
+            self._calendar,
             doctor_id,
-            appointment_datetime
+            appointment_datetime,
+            duration_minutes
         )
         
         if conflict:
@@ -361,29 +932,52 @@ class ClinicalTools:
                 "conflicting_appointment": conflict['appointment_id']
             }
         
+        if pending is not None:
+            conflict = pending.find_conflict(doctor_id, appointment_datetime, duration_minutes)
+            if conflict:
+                return {
+                    "success": False,
+                    "error": "Time slot conflicts with another request in this batch",
+                    "conflicting_request": conflict['appointment_id']
+                }
+        
+        return {
+            "success": True,
+            "patient": patient,
+            "doctor": doctor,
+            "appointment_datetime": appointment_datetime
+        }
+    
+    def _create_appointment(
+        self,
+        patient: Dict[str, Any],
+        doctor: Dict[str, Any],
+        appointment_datetime: datetime,
+        reason: str,
+        appointment_type: str,
+        duration_minutes: int
+    ) -> Dict[str, Any]:
+        """Book a validated appointment and update all indexes"""
+        patient_id = patient['patient_id']
+        doctor_id = doctor['doctor_id']
+        
         # Create appointment
         appointment_id = f"APT{len(self.appointments) + 1:06d}"
-        appointment = {
-            "appointment_id": appointment_id,
-            "patient_id": patient_id,
-            "patient_name": f"{patient['first_name']} {patient['last_name']}",
-            "doctor_id": doctor_id,
-            "doctor_name": doctor['name'],
-            "appointment_time": appointment_datetime.isoformat(),
-            "duration": 30,
-            "reason": reason,
-            "type": appointment_type,
-            "status": "scheduled",
-            "consultation_fee": doctor['consultation_fee'],
-            "created_at": datetime.now().isoformat()
-        }
+        appointment = Appointment(
+            appointment_id, patient, doctor, appointment_datetime,
+            duration_minutes, reason, appointment_type
+        )
         
         self.appointments.append(appointment)
+        self._appointments_by_id[appointment_id] = appointment
+        self._calendar.add(appointment)
+        self._histories[patient_id].add_appointment(appointment)
         self._log_operation("schedule_appointment", {
             "appointment_id": appointment_id,
             "patient_id": patient_id,
             "doctor_id": doctor_id
         }, True)
+        self._notify("appointment_scheduled", appointment)
         
         return {
             "success": True,
@@ -399,6 +993,89 @@ class ClinicalTools:
             "message": f"Appointment scheduled successfully. ID: {appointment_id}"
         }
     
+    @synchronized
+    def find_available_slots(
+        self,
+        doctor_id: Optional[str] = None,
+        specialty: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        duration_minutes: int = 30,
+        limit: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Find the next free appointment slots for a doctor or specialty
+        Scans each doctor's available days between start_date and end_date
+        (default: the next 14 days) using the calendar's occupancy bitmaps,
+        so one call replaces trial-and-error booking.
+        """
+        if doctor_id:
+            doctors = self.search_doctors(doctor_id=doctor_id, specialty=specialty)
+        elif specialty:
+            doctors = self.search_doctors(specialty=specialty)
+        else:
+            return {"success": False, "error": "Provide a doctor_id or specialty"}
+        
+        if not doctors:
+            return {"success": False, "error": "No matching doctors found"}
+        
+        if duration_minutes <= 0:
+            return {"success": False, "error": "Appointment duration must be positive"}
+        
+        try:
+            first_day = date.fromisoformat(start_date) if start_date else date.today()
+            last_day = date.fromisoformat(end_date) if end_date else first_day + timedelta(days=14)
+        except ValueError:
+            return {"success": False, "error": "Invalid date format (use YYYY-MM-DD)"}
+        
+        slot_minutes = AppointmentCalendar.SLOT_MINUTES
+        open_slot = self.OPENING_HOUR * 60 // slot_minutes
+        close_slot = self.CLOSING_HOUR * 60 // slot_minutes
+        now = datetime.now()
+        
+        slots = []
+        day = first_day
+        while day <= last_day and len(slots) < limit:
+            day_name = day.strftime("%A")
+            midnight = datetime.combine(day, datetime.min.time())
+            day_slots = []
+            
+            for doctor in doctors:
+                if day_name not in doctor['available_days']:
+                    continue
+                for slot in self._calendar.free_starts(doctor['doctor_id'], day, open_slot, close_slot, duration_minutes):
+                    start = midnight + timedelta(minutes=slot * slot_minutes)
+                    if start <= now:
+                        continue
+                    day_slots.append((start, doctor))
+            
+            day_slots.sort(key=lambda item: item[0])
+            for start, doctor in day_slots[:limit - len(slots)]:
+                slots.append({
+                    "doctor_id": doctor['doctor_id'],
+                    "doctor_name": doctor['name'],
+                    "specialty": doctor['specialty'],
+                    "appointment_date": start.date().isoformat(),
+                    "appointment_time": start.strftime("%H:%M"),
+                    "start": start.isoformat(),
+                    "end": (start + timedelta(minutes=duration_minutes)).isoformat(),
+                    "duration_minutes": duration_minutes
+                })
+            day += timedelta(days=1)
+        
+        self._log_operation("find_available_slots", {
+            "doctor_id": doctor_id,
+            "specialty": specialty,
+            "slots_found": len(slots)
+        }, True)
+        
+        return {
+            "success": True,
+            "slots": slots,
+            "count": len(slots),
+            "searched_until": last_day.isoformat()
+        }
+    
     def get_appointments(
         self,
         patient_id: Optional[str] = None,
@@ -406,26 +1083,26 @@ class ClinicalTools:
         date: Optional[str] = None,
         status: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Retrieve appointments with filters"""
-        results = list(self.appointments)
-        
+        """Retrieve appointments with filters, sorted by appointment time"""
         if patient_id:
-            results = [a for a in results if a['patient_id'] == patient_id]
+            # The patient's view is already in time order
+            history = self._histories.get(patient_id)
+            results = history.appointments() if history else []
+        else:
+            results = sorted(self.appointments, key=lambda x: x.start)
         
         if doctor_id:
-            results = [a for a in results if a['doctor_id'] == doctor_id]
+            results = [a for a in results if a.doctor_id == doctor_id]
         
         if date:
-            results = [a for a in results if a['appointment_time'].startswith(date)]
+            results = [a for a in results if a.appointment_time.startswith(date)]
         
         if status:
-            results = [a for a in results if a['status'] == status]
-        
-        # Sort by appointment time
-        results.sort(key=lambda x: x['appointment_time'])
+            results = [a for a in results if a.status == status]
         
-        return results
+        return [a.to_dict() for a in results]
     
+    @synchronized
     def cancel_appointment(
         self,
         appointment_id: str,
@@ -435,25 +1112,29 @@ class ClinicalTools:
         Cancel an appointment
         SAFETY: Logs cancellation with reason
         """
-        for appointment in self.appointments:
-            if appointment['appointment_id'] == appointment_id:
-                appointment['status'] = 'cancelled'
-                appointment['cancellation_reason'] = reason
-                appointment['cancelled_at'] = datetime.now().isoformat()
-                
-                self._log_operation("cancel_appointment", {
-                    "appointment_id": appointment_id,
-                    "reason": reason
-                }, True)
-                
-                return {
-                    "success": True,
-                    "appointment_id": appointment_id,
-                    "message": "Appointment cancelled successfully"
-                }
+        appointment = self._appointments_by_id.get(appointment_id)
+        if not appointment:
+            return {"success": False, "error": "Appointment not found"}
         
-        return {"success": False, "error": "Appointment not found"}
+        self._calendar.remove(appointment)
+        self._histories[appointment['patient_id']].status_changed(appointment['status'], 'cancelled')
+        appointment['status'] = 'cancelled'
+        appointment['cancellation_reason'] = reason
+        appointment['cancelled_at'] = datetime.now().isoformat()
+        
+        self._log_operation("cancel_appointment", {
+            "appointment_id": appointment_id,
+            "reason": reason
+        }, True)
+        self._notify("appointment_cancelled", appointment)
+        
+        return {
+            "success": True,
+            "appointment_id": appointment_id,
+            "message": "Appointment cancelled successfully"
+        }
     
+    @synchronized
     def add_medical_record(
         self,
         patient_id: str,
@@ -475,37 +1156,28 @@ class ClinicalTools:
             return {"success": False, "error": "Invalid patient ID"}
         
         # Validate appointment if provided
-        if appointment_id:
-            appointments = [a for a in self.appointments if a['appointment_id'] == appointment_id]
-            if not appointments:
-                return {"success": False, "error": "Invalid appointment ID"}
+        if appointment_id and appointment_id not in self._appointments_by_id:
+            return {"success": False, "error": "Invalid appointment ID"}
         
         # Safety check: ensure diagnosis is not empty
         if not diagnosis or diagnosis.strip() == "":
             return {"success": False, "error": "Diagnosis is required for medical records"}
         
         record_id = f"MR{len(self.medical_records) + 1:06d}"
-        record = {
-            "record_id": record_id,
-            "patient_id": patient_id,
-            "appointment_id": appointment_id,
-            "date": datetime.now().isoformat(),
-            "diagnosis": diagnosis,
-            "symptoms": symptoms,
-            "prescribed_medications": prescribed_medications,
-            "notes": notes,
-            "follow_up_required": follow_up_required,
-            "follow_up_date": follow_up_date,
-            "created_by": "system",
-            "created_at": datetime.now().isoformat()
-        }
+        record = MedicalRecord(
+            record_id, patient_id, appointment_id, diagnosis, symptoms,
+            prescribed_medications, notes, follow_up_required, follow_up_date
+        )
         
         self.medical_records.append(record)
+        self._records_by_id[record_id] = record
+        self._histories[patient_id].add_record(record)
         self._log_operation("add_medical_record", {
             "record_id": record_id,
             "patient_id": patient_id,
             "diagnosis": diagnosis
         }, True)
+        self._notify("medical_record_added", record)
         
         return {
             "success": True,
@@ -517,54 +1189,35 @@ class ClinicalTools:
         """
         Retrieve complete medical history for a patient
         SAFETY: Validates patient ID, returns comprehensive history
+        Served from the patient's materialized view (no scans or sorts)
         """
         patient = self.get_patient_details(patient_id)
         if not patient or "error" in patient:
             return {"error": "Invalid patient ID"}
         
-        # Get all records for this patient
-        records = [r for r in self.medical_records if r['patient_id'] == patient_id]
-        records.sort(key=lambda x: x['date'], reverse=True)
-        
-        # Get all appointments
-        appointments = self.get_appointments(patient_id=patient_id)
-        
-        return {
-            "patient_id": patient_id,
-            "patient_name": f"{patient['first_name']} {patient['last_name']}",
-            "allergies": patient['allergies'],
-            "chronic_conditions": patient['chronic_conditions'],
-            "total_visits": len([a for a in appointments if a['status'] == 'completed']),
-            "upcoming_appointments": len([a for a in appointments if a['status'] == 'scheduled']),
-            "medical_records": records,
-            "recent_appointments": appointments[:5]
-        }
+        with self._lock:
+            history = self._histories.get(patient_id) or PatientHistory()
+            return {
+                "patient_id": patient_id,
+                "patient_name": f"{patient['first_name']} {patient['last_name']}",
+                "allergies": patient['allergies'],
+                "chronic_conditions": patient['chronic_conditions'],
+                "total_visits": history.status_counts['completed'],
+                "upcoming_appointments": history.status_counts['scheduled'],
+                "medical_records": [r.to_dict() for r in history.records()],
+                "recent_appointments": [a.to_dict() for a in history.appointments(limit=5)]
+            }
     
     def check_drug_interactions(
         self,
         medications: List[str]
     ) -> Dict[str, Any]:
         """
-        Check for potential drug interactions (mock implementation)
+        Check a medication list for interactions between any two of its drugs
         SAFETY: Critical safety check for prescriptions
+        Names are matched case-insensitively and through brand/generic synonyms
         """
-        # Mock interaction database
-        known_interactions = {
-            ("Warfarin", "Aspirin"): "High risk: Increased bleeding",
-            ("Metformin", "Alcohol"): "Moderate risk: Lactic acidosis",
-            ("Lisinopril", "Potassium"): "Moderate risk: Hyperkalemia"
-        }
-        
-        interactions = []
-        for i, med1 in enumerate(medications):
-            for med2 in medications[i+1:]:
-                key = tuple(sorted([med1, med2]))
-                if key in known_interactions:
-                    interactions.append({
-                        "drugs": list(key),
-                        "severity": "High" if "High" in known_interactions[key] else "Moderate",
-                        "description": known_interactions[key]
-                    })
+        interactions = self.interactions.screen(medications)
         
         self._log_operation("check_drug_interactions", {
             "medications": medications,
@@ -578,19 +1231,194 @@ class ClinicalTools:
             "safe": len(interactions) == 0
         }
     
+    def get_active_medications(self, patient_id: str) -> List[str]:
+        """
+        Medications currently prescribed to a patient, from their medical records (oldest first)
+        A prescription is active unless its status is discontinued/completed or its end_date has passed
+        Read from the patient's materialized view, so it costs O(their records)
+        """
+        today = date.today().isoformat()
+        with self._lock:
+            history = self._histories.get(patient_id)
+            records = history.records()[::-1] if history else []
+        active = []
+        for record in records:
+            for medication in record.get('prescribed_medications') or []:
+                name = medication_name(medication)
+                if name and is_active_prescription(medication, today):
+                    active.append(name)
+        return active
+    
+    def check_prescription_interactions(self, patient_id: str, medication: str) -> Dict[str, Any]:
+        """
+        Check a new prescription against the patient's active medications
+        SAFETY: Run before prescribing; validates patient ID
+        """
+        if patient_id not in self._patients_by_id:
+            return {"success": False, "error": "Invalid patient ID"}
+        
+        active = self.get_active_medications(patient_id)
+        interactions = self.interactions.check_against(medication, active)
+        
+        self._log_operation("check_prescription_interactions", {
+            "patient_id": patient_id,
+            "medication": medication,
+            "interactions_found": len(interactions)
+        }, True)
+        
+        return {
+            "success": True,
+            "patient_id": patient_id,
+            "medication": medication,
+            "active_medications": active,
+            "interactions_found": len(interactions),
+            "interactions": interactions,
+            "safe": len(interactions) == 0
+        }
+    
+    @synchronized
+    def _panel_incidence(self) -> Tuple[List[str], List[str], Dict[Tuple[int, int], str], "np.ndarray"]:
+        """
+        Patient x drug incidence matrix of active prescriptions across all records
+        Returns (patient IDs by row, canonical drugs by column, prescribed name per cell, matrix)
+        """
+        import numpy as np  # deferred: only panel screening needs it
+        
+        today = date.today().isoformat()
+        rows: Dict[str, int] = {}
+        columns: Dict[str, int] = {}
+        names: Dict[Tuple[int, int], str] = {}
+        row_cells, column_cells = [], []
+        for record in self.medical_records:
+            for medication in record.get('prescribed_medications') or []:
+                name = medication_name(medication)
+                if not name or not is_active_prescription(medication, today):
+                    continue
+                row = rows.setdefault(record['patient_id'], len(rows))
+                column = columns.setdefault(self.interactions.canonical(name), len(columns))
+                names.setdefault((row, column), name)
+                row_cells.append(row)
+                column_cells.append(column)
+        
+        matrix = np.zeros((len(rows), len(columns)), dtype=bool)
+        matrix[row_cells, column_cells] = True
+        return list(rows), list(columns), names, matrix
+    
+    def iter_panel_interactions(self, severities: Optional[List[str]] = None):
+        """
+        Screen every patient's active medications for interactions in one vectorized pass
+        Yields ("summary", {...}) first, then ("interaction", {...}) for each flagged
+        patient/drug pair, grouped by severity (High, Moderate, Low) then patient
+        """
+        import numpy as np
+        
+        patient_ids, drugs, names, matrix = self._panel_incidence()
+        pairs = self.interactions.pairs_among(drugs)
+        if severities:
+            pairs = [pair for pair in pairs if pair[2]['severity'] in severities]
+        
+        hit_rows = np.empty(0, dtype=np.int64)
+        hit_pairs = np.empty(0, dtype=np.int64)
+        if pairs and len(patient_ids):
+            first = np.array([pair[0] for pair in pairs])
+            second = np.array([pair[1] for pair in pairs])
+            found_rows, found_pairs = [], []
+            for start in range(0, len(patient_ids), self.PANEL_CHUNK_ROWS):
+                chunk = matrix[start:start + self.PANEL_CHUNK_ROWS]
+                rows, flagged = np.nonzero(chunk[:, first] & chunk[:, second])
+                found_rows.append(rows + start)
+                found_pairs.append(flagged)
+            hit_rows = np.concatenate(found_rows)
+            hit_pairs = np.concatenate(found_pairs)
+        
+        rank = np.array([self.interactions.SEVERITY_ORDER.get(pair[2]['severity'], 3) for pair in pairs], dtype=np.int64)
+        order = np.lexsort((hit_rows, rank[hit_pairs])) if len(hit_pairs) else hit_pairs
+        counts = Counter(pairs[k][2]['severity'] for k in hit_pairs.tolist())
+        
+        self._log_operation("screen_panel_interactions", {
+            "patients": len(patient_ids),
+            "interactions_found": len(hit_pairs)
+        }, True)
+        
+        yield "summary", {
+            "patients_screened": len(patient_ids),
+            "drugs": len(drugs),
+            "interactions_found": len(hit_pairs),
+            "by_severity": {severity: counts[severity] for severity in self.interactions.SEVERITY_ORDER if counts[severity]}
+        }
+        for index in order.tolist():
+            row, k = int(hit_rows[index]), int(hit_pairs[index])
+            first_column, second_column, interaction = pairs[k]
+            yield "interaction", dict(
+                interaction,
+                patient_id=patient_ids[row],
+                medications=[names[(row, first_column)], names[(row, second_column)]]
+            )
+    
+    def screen_panel_interactions(self, severities: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Screen the whole panel for drug interactions (see iter_panel_interactions)
+        Returns the summary plus flagged pairs grouped by severity
+        """
+        report = {"by_severity": {}}
+        for event, data in self.iter_panel_interactions(severities):
+            if event == "summary":
+                report.update(data, by_severity={})
+            else:
+                report["by_severity"].setdefault(data["severity"], []).append(data)
+        return report
+    
     def get_safety_log(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """Retrieve recent safety audit log"""
-        return self.safety_log[-limit:]
+        """Retrieve recent safety audit log (oldest first, from the in-memory ring buffer)"""
+        return self.safety_log.recent(limit)
+
+
+# Process-wide repository shared by agent tools and API endpoints
+_shared_tools: Optional[ClinicalTools] = None
+_shared_tools_lock = threading.Lock()
+
+
+def get_shared_clinical_tools() -> ClinicalTools:
+    """
+    Get the process-wide ClinicalTools instance, creating it on first use
+    
+    State (appointments, records, audit log) persists across tool calls.
+    """
+    global _shared_tools
+    if _shared_tools is None:
+        with _shared_tools_lock:
+            if _shared_tools is None:
+                _shared_tools = ClinicalTools()
+    return _shared_tools
+
 
+def set_shared_clinical_tools(tools: Optional[ClinicalTools]) -> None:
+    """Inject the process-wide ClinicalTools instance (None resets it)"""
+    global _shared_tools
+    with _shared_tools_lock:
+        _shared_tools = tools
 
-def get_clinical_tools() -> Dict[str, callable]:
+
+def shutdown_shared_clinical_tools() -> None:
+    """Close and drop the process-wide ClinicalTools instance"""
+    global _shared_tools
+    with _shared_tools_lock:
+        tools, _shared_tools = _shared_tools, None
+    if tools is not None:
+        tools.close()
+
+
+def get_clinical_tools(tools: Optional[ClinicalTools] = None) -> Dict[str, callable]:
     """
     Get all available clinical tools as a dictionary
     
+    Args:
+        tools: ClinicalTools instance to bind (defaults to the shared instance)
+    
     Returns:
         Dictionary mapping tool names to their functions
     """
-    tools = ClinicalTools()
+    tools = tools or get_shared_clinical_tools()
     
     return {
         "search_patients": tools.search_patients,
@@ -598,10 +1426,14 @@ def get_clinical_tools() -> Dict[str, callable]:
         "register_new_patient": tools.register_new_patient,
         "search_doctors": tools.search_doctors,
         "schedule_appointment": tools.schedule_appointment,
+        "schedule_appointments_batch": tools.schedule_appointments_batch,
+        "find_available_slots": tools.find_available_slots,
         "get_appointments": tools.get_appointments,
         "cancel_appointment": tools.cancel_appointment,
         "add_medical_record": tools.add_medical_record,
         "get_medical_history": tools.get_medical_history,
         "check_drug_interactions": tools.check_drug_interactions,
+        "check_prescription_interactions": tools.check_prescription_interactions,
+        "screen_panel_interactions": tools.screen_panel_interactions,
         "get_safety_log": tools.get_safety_log,
     }
@@ -0,0 +1,790 @@
+"""
+Conversation Storage Backends for Patient Memory
+Pluggable stores behind PatientMemoryManager: JSON files, append-only segment logs, SQLite
+"""
+
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import threading
+
+
+# ============================================================================
+# STORE INTERFACE
+# ============================================================================
+
+class ConversationStore:
+    """Base class for per-patient conversation storage
+
+    Messages are dicts with 'type' ('human' | 'ai'), 'content' and 'timestamp'.
+    `append_only` stores persist new messages with append_messages(); the others
+    need the full history and are written with write_history().
+    """
+    
+    name = "base"
+    append_only = False
+    
+    def read_history(self, patient_id: str) -> List[Dict]:
+        """Read a patient's full history, oldest first"""
+        raise NotImplementedError
+    
+    def read_recent(self, patient_id: str, limit: int) -> List[Dict]:
+        """Read the last `limit` messages, oldest first"""
+        if limit <= 0:
+            return []
+        return self.read_history(patient_id)[-limit:]
+    
+    def count_messages(self, patient_id: str) -> int:
+        """Count a patient's stored messages"""
+        return len(self.read_history(patient_id))
+    
+    def append_messages(self, patient_id: str, messages: List[Dict]) -> None:
+        """Append messages to a patient's history"""
+        if messages:
+            self.write_history(patient_id, self.read_history(patient_id) + list(messages))
+    
+    def write_history(self, patient_id: str, messages: List[Dict]) -> None:
+        """Replace a patient's history"""
+        raise NotImplementedError
+    
+    def delete_history(self, patient_id: str) -> None:
+        """Delete a patient's history"""
+        raise NotImplementedError
+    
+    def has_history(self, patient_id: str) -> bool:
+        """Check whether anything is stored for a patient"""
+        return self.count_messages(patient_id) > 0
+    
+    def list_patients(self) -> List[str]:
+        """List patient IDs with stored history, sorted"""
+        raise NotImplementedError
+    
+    def summarize(self, patient_id: str) -> Dict:
+        """Summarize a patient's history (counts and last timestamp)"""
+        return summarize_messages(patient_id, self.read_history(patient_id))
+    
+    def summarize_all(self) -> List[Dict]:
+        """Summarize every patient with stored history, sorted by patient ID"""
+        return [self.summarize(patient_id) for patient_id in self.list_patients()]
+    
+    def close(self) -> None:
+        """Release any resources held by the store"""
+
+
+def summarize_messages(patient_id: str, messages: List[Dict]) -> Dict:
+    """Build a conversation summary from a list of messages"""
+    return {
+        'patient_id': patient_id,
+        'total_messages': len(messages),
+        'last_updated': messages[-1]['timestamp'] if messages else None,
+        'human_messages': len([m for m in messages if m['type'] == 'human']),
+        'ai_messages': len([m for m in messages if m['type'] == 'ai']),
+    }
+
+
+# ============================================================================
+# SUMMARY MANIFEST (file-based stores)
+# ============================================================================
+
+class SummaryManifest:
+    """Persisted per-patient message counters for file-based stores
+
+    Entries are kept in memory and persisted as a snapshot
+    (_<store>_manifest.json) plus an append-only journal
+    (_<store>_manifest.log), so each update costs one small append. The
+    journal is folded into the snapshot every COMPACT_AFTER updates and on
+    close. Each entry records a fingerprint of the patient's files; stores
+    compare it against the disk and recount entries that are missing or
+    stale. Each store format keeps its own files, since their fingerprints
+    are not comparable.
+    """
+    
+    COMPACT_AFTER = 1000
+    
+    def __init__(self, storage_dir: Path, namespace: str):
+        self.snapshot_path = Path(storage_dir) / f"_{namespace}_manifest.json"
+        self.journal_path = Path(storage_dir) / f"_{namespace}_manifest.log"
+        self._entries: Dict[str, Dict] = {}
+        self._journal_lines = 0
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self) -> None:
+        """Load the snapshot and replay the journal (a torn last line is ignored)"""
+        if self.snapshot_path.exists():
+            try:
+                with open(self.snapshot_path, 'r') as f:
+                    self._entries = json.load(f).get('patients', {})
+            except (OSError, ValueError):
+                self._entries = {}
+        
+        if self.journal_path.exists():
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._apply(record['patient_id'], record['entry'])
+                    self._journal_lines += 1
+    
+    def _apply(self, patient_id: str, entry: Optional[Dict]) -> None:
+        if entry is None:
+            self._entries.pop(patient_id, None)
+        else:
+            self._entries[patient_id] = entry
+    
+    def _record(self, patient_id: str, entry: Optional[Dict]) -> None:
+        """Apply an update in memory and append it to the journal"""
+        self._apply(patient_id, entry)
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps({'patient_id': patient_id, 'entry': entry}) + "\n")
+        self._journal_lines += 1
+        if self._journal_lines >= self.COMPACT_AFTER:
+            self._compact()
+    
+    def _compact(self) -> None:
+        """Write a fresh snapshot atomically and truncate the journal"""
+        tmp_path = self.snapshot_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'patients': self._entries}, f)
+        os.replace(tmp_path, self.snapshot_path)
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self._journal_lines = 0
+    
+    def get(self, patient_id: str, fingerprint: Optional[List]) -> Optional[Dict]:
+        """Get a patient's summary if the entry matches the current fingerprint"""
+        with self._lock:
+            entry = self._entries.get(patient_id)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return {
+            'patient_id': patient_id,
+            'total_messages': entry['total_messages'],
+            'last_updated': entry['last_updated'],
+            'human_messages': entry['human_messages'],
+            'ai_messages': entry['ai_messages'],
+        }
+    
+    def put(self, summary: Dict, fingerprint: Optional[List]) -> None:
+        """Store a freshly computed summary"""
+        entry = {key: summary[key] for key in ('total_messages', 'last_updated', 'human_messages', 'ai_messages')}
+        entry['fingerprint'] = fingerprint
+        with self._lock:
+            self._record(summary['patient_id'], entry)
+    
+    def record_messages(self, patient_id: str, messages: List[Dict], before: Optional[List], after: Optional[List]) -> None:
+        """Add appended messages to a patient's counters
+
+        `before`/`after` are the patient's fingerprints around the append. If
+        the entry did not match `before` it is stale and is dropped so the
+        next summary recounts from disk.
+        """
+        with self._lock:
+            entry = self._entries.get(patient_id)
+            if entry is None and before is None:
+                entry = {'total_messages': 0, 'last_updated': None, 'human_messages': 0, 'ai_messages': 0}
+            elif entry is None or entry['fingerprint'] != before:
+                if entry is not None:
+                    self._record(patient_id, None)
+                return
+            
+            entry = dict(entry)
+            entry['total_messages'] += len(messages)
+            entry['human_messages'] += sum(1 for m in messages if m['type'] == 'human')
+            entry['ai_messages'] += sum(1 for m in messages if m['type'] == 'ai')
+            if messages:
+                entry['last_updated'] = messages[-1]['timestamp']
+            entry['fingerprint'] = after
+            self._record(patient_id, entry)
+    
+    def remove(self, patient_id: str) -> None:
+        """Drop a patient's entry"""
+        with self._lock:
+            if patient_id in self._entries:
+                self._record(patient_id, None)
+    
+    def retain(self, patient_ids: List[str]) -> None:
+        """Drop entries for patients no longer on disk"""
+        keep = set(patient_ids)
+        with self._lock:
+            for patient_id in [p for p in self._entries if p not in keep]:
+                self._record(patient_id, None)
+    
+    def close(self) -> None:
+        """Fold the journal into the snapshot"""
+        with self._lock:
+            if self._journal_lines or not self.snapshot_path.exists():
+                self._compact()
+
+
+class ManifestedStore(ConversationStore):
+    """File-based store whose summaries come from a SummaryManifest
+
+    Subclasses implement _fingerprint() (cheap stat-based identity of a
+    patient's files, None when nothing is stored) and keep the manifest
+    current on writes. Reads and writes of one patient's files hold that
+    patient's lock, so concurrent appends (e.g. API requests persisting turns
+    on executor threads) never interleave.
+    """
+    
+    def __init__(self, storage_dir: str = ".patient_conversations"):
+        self.storage_dir = Path(storage_dir)
+        self.storage_dir.mkdir(exist_ok=True)
+        self.manifest = SummaryManifest(self.storage_dir, self.name)
+        self._patient_locks: Dict[str, threading.RLock] = {}
+        self._patient_locks_guard = threading.Lock()
+    
+    def _patient_lock(self, patient_id: str) -> threading.RLock:
+        """Get the lock guarding one patient's files (reentrant: writes read and append under it)"""
+        with self._patient_locks_guard:
+            lock = self._patient_locks.get(patient_id)
+            if lock is None:
+                lock = self._patient_locks[patient_id] = threading.RLock()
+            return lock
+    
+    def _fingerprint(self, patient_id: str) -> Optional[List]:
+        raise NotImplementedError
+    
+    def summarize(self, patient_id: str) -> Dict:
+        with self._patient_lock(patient_id):
+            fingerprint = self._fingerprint(patient_id)
+            if fingerprint is None:
+                self.manifest.remove(patient_id)
+                return summarize_messages(patient_id, [])
+            
+            summary = self.manifest.get(patient_id, fingerprint)
+            if summary is None:
+                # Missing or stale: recount from disk
+                summary = summarize_messages(patient_id, self.read_history(patient_id))
+                self.manifest.put(summary, self._fingerprint(patient_id))
+            return summary
+    
+    def summarize_all(self) -> List[Dict]:
+        patients = self.list_patients()
+        self.manifest.retain(patients)
+        return [self.summarize(patient_id) for patient_id in patients]
+    
+    def close(self) -> None:
+        self.manifest.close()
+
+
+# ============================================================================
+# JSON FILE STORE (default)
+# ============================================================================
+
+class JsonFileStore(ManifestedStore):
+    """One {patient_id}_history.json file per patient, rewritten on every save"""
+    
+    name = "json"
+    
+    def get_patient_file(self, patient_id: str) -> Path:
+        """Get file path for patient's conversation history"""
+        return self.storage_dir / f"{patient_id}_history.json"
+    
+    def read_history(self, patient_id: str) -> List[Dict]:
+        file_path = self.get_patient_file(patient_id)
+        
+        with self._patient_lock(patient_id):
+            if file_path.exists():
+                with open(file_path, 'r') as f:
+                    return json.load(f)
+        return []
+    
+    def append_messages(self, patient_id: str, messages: List[Dict]) -> None:
+        """Read, extend and rewrite the patient's file under the patient lock"""
+        if not messages:
+            return
+        with self._patient_lock(patient_id):
+            self._write(patient_id, self.read_history(patient_id) + list(messages))
+    
+    def write_history(self, patient_id: str, messages: List[Dict]) -> None:
+        with self._patient_lock(patient_id):
+            self._write(patient_id, messages)
+    
+    def _write(self, patient_id: str, messages: List[Dict]) -> None:
+        """Replace the patient's file atomically (caller holds the patient lock)"""
+        file_path = self.get_patient_file(patient_id)
+        tmp_path = file_path.with_suffix('.json.tmp')
+        
+        with open(tmp_path, 'w') as f:
+            json.dump(messages, f, indent=2, default=str)
+        os.replace(tmp_path, file_path)
+        
+        # The file is rewritten in full anyway, so counting in memory is cheap
+        self.manifest.put(summarize_messages(patient_id, messages), self._fingerprint(patient_id))
+    
+    def delete_history(self, patient_id: str) -> None:
+        file_path = self.get_patient_file(patient_id)
+        with self._patient_lock(patient_id):
+            if file_path.exists():
+                file_path.unlink()
+            self.manifest.remove(patient_id)
+    
+    def _fingerprint(self, patient_id: str) -> Optional[List]:
+        try:
+            stat = self.get_patient_file(patient_id).stat()
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+    
+    def has_history(self, patient_id: str) -> bool:
+        return self.get_patient_file(patient_id).exists()
+    
+    def list_patients(self) -> List[str]:
+        files = list(self.storage_dir.glob("*_history.json"))
+        return sorted(f.stem[:-len('_history')] for f in files)
+
+
+# ============================================================================
+# APPEND-ONLY SEGMENT LOG STORE
+# ============================================================================
+
+class SegmentLogStore(ManifestedStore):
+    """Append-only segment log per patient ({patient_id}_history/)
+
+    Each NNNNNN.jsonl segment is paired with an NNNNNN.idx file of 8-byte line
+    offsets, so appends are O(1) and counts and tail reads never parse the
+    whole conversation. Legacy {patient_id}_history.json files are imported
+    on first access.
+    """
+    
+    name = "jsonl"
+    append_only = True
+    SEGMENT_MAX_MESSAGES = 1000
+    OFFSET_SIZE = 8
+    
+    def __init__(self, storage_dir: str = ".patient_conversations"):
+        super().__init__(storage_dir)
+        
+        # Active (last) segment number per patient, checked for torn writes once per process
+        self._active_segments: Dict[str, int] = {}
+    
+    def get_log_dir(self, patient_id: str) -> Path:
+        """Get segment directory for patient's append-only conversation log"""
+        return self.storage_dir / f"{patient_id}_history"
+    
+    def get_legacy_file(self, patient_id: str) -> Path:
+        """Get path of a pre-segment {patient_id}_history.json file"""
+        return self.storage_dir / f"{patient_id}_history.json"
+    
+    def count_messages(self, patient_id: str) -> int:
+        with self._patient_lock(patient_id):
+            return sum(count for _, count in self._segment_counts(patient_id))
+    
+    def write_history(self, patient_id: str, messages: List[Dict]) -> None:
+        with self._patient_lock(patient_id):
+            self._remove_log_dir(patient_id)
+            self.manifest.remove(patient_id)
+            self.get_log_dir(patient_id).mkdir()
+            self._active_segments[patient_id] = 1
+            self.append_messages(patient_id, messages)
+    
+    def has_history(self, patient_id: str) -> bool:
+        return self.get_log_dir(patient_id).exists() or self.get_legacy_file(patient_id).exists()
+    
+    def list_patients(self) -> List[str]:
+        dirs = [d for d in self.storage_dir.glob("*_history") if d.is_dir()]
+        patients = [d.name[:-len('_history')] for d in dirs]
+        legacy = [f.stem[:-len('_history')] for f in self.storage_dir.glob("*_history.json")]
+        return sorted(set(patients) | set(legacy))
+    
+    def _fingerprint(self, patient_id: str) -> Optional[List]:
+        segments = self._list_segments(patient_id)
+        if not segments:
+            return None
+        _, idx_path = self._segment_paths(patient_id, segments[-1])
+        try:
+            stat = idx_path.stat()
+        except FileNotFoundError:
+            return [len(segments), 0, 0]
+        return [len(segments), stat.st_size, stat.st_mtime_ns]
+    
+    def _segment_paths(self, patient_id: str, segment: int) -> Tuple[Path, Path]:
+        """Get (log, offset index) paths for one segment"""
+        log_dir = self.get_log_dir(patient_id)
+        return log_dir / f"{segment:06d}.jsonl", log_dir / f"{segment:06d}.idx"
+    
+    def _list_segments(self, patient_id: str) -> List[int]:
+        """List segment numbers for a patient, oldest first"""
+        self._import_legacy_history(patient_id)
+        log_dir = self.get_log_dir(patient_id)
+        if not log_dir.exists():
+            return []
+        return sorted(int(p.stem) for p in log_dir.glob("*.jsonl") if p.stem.isdigit())
+    
+    def _segment_counts(self, patient_id: str) -> List[Tuple[int, int]]:
+        """Get (segment, message count) pairs from index file sizes"""
+        segments = self._list_segments(patient_id)
+        if segments:
+            self._repair_segment(patient_id, segments[-1])
+        counts = []
+        for segment in segments:
+            _, idx_path = self._segment_paths(patient_id, segment)
+            size = idx_path.stat().st_size if idx_path.exists() else 0
+            counts.append((segment, size // self.OFFSET_SIZE))
+        return counts
+    
+    def _repair_segment(self, patient_id: str, segment: int) -> None:
+        """Reconcile the active segment with its index after a torn write
+
+        A message is appended to the log before its offset is appended to the
+        index, so a crash can leave a complete line without an offset (re-index
+        it) or a partial trailing line (truncate it). Checked once per process.
+        """
+        if self._active_segments.get(patient_id) == segment:
+            return
+        
+        log_path, idx_path = self._segment_paths(patient_id, segment)
+        with open(idx_path, 'ab+') as idx:
+            idx_size = idx.seek(0, os.SEEK_END)
+            indexed = idx_size // self.OFFSET_SIZE
+            if idx_size % self.OFFSET_SIZE:
+                idx.truncate(indexed * self.OFFSET_SIZE)
+            
+            start = 0
+            if indexed:
+                idx.seek((indexed - 1) * self.OFFSET_SIZE)
+                start = struct.unpack('>Q', idx.read(self.OFFSET_SIZE))[0]
+            
+            with open(log_path, 'rb+') as log:
+                log.seek(start)
+                tail = log.read()
+                offset = start
+                new_offsets = []
+                for line in tail.splitlines(keepends=True):
+                    if not line.endswith(b'\n'):
+                        log.truncate(offset)
+                        break
+                    new_offsets.append(offset)
+                    offset += len(line)
+            
+            # The first complete line at `start` is already indexed
+            if indexed:
+                new_offsets = new_offsets[1:]
+            idx.seek(0, os.SEEK_END)
+            for missing in new_offsets:
+                idx.write(struct.pack('>Q', missing))
+        
+        self._active_segments[patient_id] = segment
+    
+    def append_messages(self, patient_id: str, messages: List[Dict]) -> None:
+        """Append messages to the patient's active segment, rolling over when full"""
+        if not messages:
+            return
+        
+        with self._patient_lock(patient_id):
+            segment = self._active_segments.get(patient_id)
+            if segment is None:
+                segments = self._list_segments(patient_id)
+                segment = segments[-1] if segments else 1
+                self.get_log_dir(patient_id).mkdir(exist_ok=True)
+                if segments:
+                    self._repair_segment(patient_id, segment)
+                self._active_segments[patient_id] = segment
+            
+            before = self._fingerprint(patient_id)
+            remaining = list(messages)
+            while remaining:
+                log_path, idx_path = self._segment_paths(patient_id, segment)
+                count = idx_path.stat().st_size // self.OFFSET_SIZE if idx_path.exists() else 0
+                if count >= self.SEGMENT_MAX_MESSAGES:
+                    segment += 1
+                    self._active_segments[patient_id] = segment
+                    continue
+                
+                batch = remaining[:self.SEGMENT_MAX_MESSAGES - count]
+                remaining = remaining[len(batch):]
+                
+                lines = [(json.dumps(message, default=str) + "\n").encode('utf-8') for message in batch]
+                with open(log_path, 'ab') as log:
+                    offset = log.seek(0, os.SEEK_END)
+                    log.write(b''.join(lines))
+                offsets = []
+                for line in lines:
+                    offsets.append(struct.pack('>Q', offset))
+                    offset += len(line)
+                with open(idx_path, 'ab') as idx:
+                    idx.write(b''.join(offsets))
+            
+            self.manifest.record_messages(patient_id, messages, before, self._fingerprint(patient_id))
+    
+    def read_recent(self, patient_id: str, limit: int) -> List[Dict]:
+        """Read the last `limit` messages, newest segments first"""
+        if limit <= 0:
+            return []
+        with self._patient_lock(patient_id):
+            messages: List[Dict] = []
+            remaining = limit
+            
+            for segment, count in reversed(self._segment_counts(patient_id)):
+                if remaining <= 0:
+                    break
+                take = min(count, remaining)
+                if not take:
+                    continue
+                
+                log_path, idx_path = self._segment_paths(patient_id, segment)
+                with open(idx_path, 'rb') as idx:
+                    idx.seek((count - take) * self.OFFSET_SIZE)
+                    start = struct.unpack('>Q', idx.read(self.OFFSET_SIZE))[0]
+                with open(log_path, 'rb') as log:
+                    log.seek(start)
+                    lines = log.read().splitlines()[:take]
+                
+                messages = [json.loads(line) for line in lines] + messages
+                remaining -= take
+            
+            return messages
+    
+    def read_history(self, patient_id: str) -> List[Dict]:
+        """Read every message from all segments"""
+        with self._patient_lock(patient_id):
+            messages: List[Dict] = []
+            for segment, count in self._segment_counts(patient_id):
+                log_path, _ = self._segment_paths(patient_id, segment)
+                with open(log_path, 'rb') as log:
+                    lines = log.read().splitlines()[:count]
+                messages.extend(json.loads(line) for line in lines)
+            return messages
+    
+    def delete_history(self, patient_id: str) -> None:
+        """Delete a patient's segment log and any legacy JSON file"""
+        with self._patient_lock(patient_id):
+            self._remove_log_dir(patient_id)
+            self.manifest.remove(patient_id)
+            legacy_file = self.get_legacy_file(patient_id)
+            if legacy_file.exists():
+                legacy_file.unlink()
+    
+    def _remove_log_dir(self, patient_id: str) -> None:
+        """Delete a patient's segment directory"""
+        self._active_segments.pop(patient_id, None)
+        log_dir = self.get_log_dir(patient_id)
+        if log_dir.exists():
+            shutil.rmtree(log_dir)
+    
+    def _import_legacy_history(self, patient_id: str) -> None:
+        """Convert a {patient_id}_history.json file into segments on first access"""
+        legacy_file = self.get_legacy_file(patient_id)
+        if self.get_log_dir(patient_id).exists() or not legacy_file.exists():
+            return
+        
+        with open(legacy_file, 'r') as f:
+            history = json.load(f)
+        
+        self.get_log_dir(patient_id).mkdir(exist_ok=True)
+        self._active_segments[patient_id] = 1
+        self.manifest.remove(patient_id)
+        self.append_messages(patient_id, history)
+        legacy_file.rename(legacy_file.with_suffix('.json.migrated'))
+
+
+# ============================================================================
+# SQLITE STORE
+# ============================================================================
+
+class SQLiteStore(ConversationStore):
+    """All conversations in one SQLite database (WAL mode)
+
+    Messages are indexed on (patient_id, timestamp), so tail reads, summaries
+    and the patient list are answered by indexed and aggregate queries.
+    """
+    
+    name = "sqlite"
+    append_only = True
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_patient_timestamp
+            ON messages (patient_id, timestamp);
+    """
+    
+    def __init__(self, storage_dir: str = ".patient_conversations", db_name: str = "conversations.db"):
+        self.storage_dir = Path(storage_dir)
+        self.storage_dir.mkdir(exist_ok=True)
+        self.db_path = self.storage_dir / db_name
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    @staticmethod
+    def _to_message(row: sqlite3.Row) -> Dict:
+        return {'type': row['type'], 'content': row['content'], 'timestamp': row['timestamp']}
+    
+    def read_history(self, patient_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT type, content, timestamp FROM messages WHERE patient_id = ? "
+                "ORDER BY timestamp, id",
+                (patient_id,)
+            ).fetchall()
+        return [self._to_message(row) for row in rows]
+    
+    def read_recent(self, patient_id: str, limit: int) -> List[Dict]:
+        if limit <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT type, content, timestamp FROM messages WHERE patient_id = ? "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (patient_id, limit)
+            ).fetchall()
+        return [self._to_message(row) for row in reversed(rows)]
+    
+    def count_messages(self, patient_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE patient_id = ?", (patient_id,)
+            ).fetchone()
+        return row[0]
+    
+    def append_messages(self, patient_id: str, messages: List[Dict]) -> None:
+        if not messages:
+            return
+        rows = [(patient_id, m['type'], m['content'], str(m['timestamp'])) for m in messages]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO messages (patient_id, type, content, timestamp) VALUES (?, ?, ?, ?)",
+                rows
+            )
+    
+    def write_history(self, patient_id: str, messages: List[Dict]) -> None:
+        rows = [(patient_id, m['type'], m['content'], str(m['timestamp'])) for m in messages]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE patient_id = ?", (patient_id,))
+            self._conn.executemany(
+                "INSERT INTO messages (patient_id, type, content, timestamp) VALUES (?, ?, ?, ?)",
+                rows
+            )
+    
+    def delete_history(self, patient_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE patient_id = ?", (patient_id,))
+    
+    def list_patients(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT patient_id FROM messages ORDER BY patient_id"
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def summarize(self, patient_id: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS total, "
+                "COALESCE(SUM(type = 'human'), 0) AS human, "
+                "COALESCE(SUM(type = 'ai'), 0) AS ai, "
+                "MAX(timestamp) AS last_updated "
+                "FROM messages WHERE patient_id = ?",
+                (patient_id,)
+            ).fetchone()
+        return {
+            'patient_id': patient_id,
+            'total_messages': row['total'],
+            'last_updated': row['last_updated'],
+            'human_messages': row['human'],
+            'ai_messages': row['ai'],
+        }
+    
+    def summarize_all(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT patient_id, COUNT(*) AS total, "
+                "SUM(type = 'human') AS human, "
+                "SUM(type = 'ai') AS ai, "
+                "MAX(timestamp) AS last_updated "
+                "FROM messages GROUP BY patient_id ORDER BY patient_id"
+            ).fetchall()
+        return [
+            {
+                'patient_id': row['patient_id'],
+                'total_messages': row['total'],
+                'last_updated': row['last_updated'],
+                'human_messages': row['human'],
+                'ai_messages': row['ai'],
+            }
+            for row in rows
+        ]
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================================================
+# FACTORY & MIGRATION
+# ============================================================================
+
+STORES = {
+    JsonFileStore.name: JsonFileStore,
+    SegmentLogStore.name: SegmentLogStore,
+    SQLiteStore.name: SQLiteStore,
+}
+
+
+def create_conversation_store(storage_format: str = "json", storage_dir: str = ".patient_conversations") -> ConversationStore:
+    """Create the conversation store for a storage format ("json", "jsonl", "sqlite")"""
+    if storage_format not in STORES:
+        raise ValueError(f"Unknown storage format: {storage_format}. Expected one of {tuple(STORES)}")
+    return STORES[storage_format](storage_dir)
+
+
+def migrate_conversations(source: ConversationStore, target: ConversationStore) -> Dict[str, int]:
+    """Copy every patient's history from one store to another
+
+    Existing histories in the target are replaced. Returns message counts per patient.
+    """
+    migrated = {}
+    for patient_id in source.list_patients():
+        history = source.read_history(patient_id)
+        target.write_history(patient_id, history)
+        migrated[patient_id] = len(history)
+    return migrated
+
+
+def main():
+    """CLI: python conversation_store.py migrate --from json --to sqlite"""
+    parser = argparse.ArgumentParser(description="Patient conversation storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate = subparsers.add_parser("migrate", help="Copy conversations between storage formats")
+    migrate.add_argument("--from", dest="source", default="json", choices=tuple(STORES))
+    migrate.add_argument("--to", dest="target", default="sqlite", choices=tuple(STORES))
+    migrate.add_argument("--dir", dest="storage_dir", default=".patient_conversations")
+    args = parser.parse_args()
+    
+    if args.source == args.target:
+        parser.error("--from and --to must be different storage formats")
+    
+    source = create_conversation_store(args.source, args.storage_dir)
+    target = create_conversation_store(args.target, args.storage_dir)
+    try:
+        migrated = migrate_conversations(source, target)
+    finally:
+        source.close()
+        target.close()
+    
+    for patient_id, count in migrated.items():
+        print(f"✅ {patient_id}: {count} messages")
+    print(f"\n📦 Migrated {len(migrated)} patients from {args.source} to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Drug Interaction Index
+Normalized, synonym-aware interaction table loaded from a local JSON file
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pathlib import Path
+import json
+import re
+
+
+DEFAULT_INTERACTIONS_PATH = Path(__file__).parent / "drug_interactions.json"
+
+# Trailing strength/form, e.g. "Warfarin 5 mg tablet" -> "warfarin"
+_STRENGTH = re.compile(r"\s+\d[\d.,/]*\s*(mg|mcg|g|ml|iu|units?|%)?\b.*$")
+
+
+def normalize_drug_name(name: str) -> str:
+    """Lowercase, collapse whitespace and drop a trailing strength"""
+    name = re.sub(r"\s+", " ", name.strip().lower())
+    return _STRENGTH.sub("", name)
+
+
+class DrugInteractionIndex:
+    """Adjacency index of pairwise drug interactions
+
+    Every name is normalized and mapped through the synonym table to a
+    canonical drug, so "Coumadin 5mg" and "warfarin" are the same entry.
+    Interactions are stored both ways (drug -> partner -> interaction).
+
+    File format:
+        {"synonyms": {"warfarin": ["coumadin", ...]},
+         "interactions": [{"drugs": [a, b], "severity": "High", "description": "..."}]}
+    """
+
+    SEVERITY_ORDER = {"High": 0, "Moderate": 1, "Low": 2}
+
+    def __init__(self):
+        self._canonical: Dict[str, str] = {}
+        self._adjacency: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._listed: Set[Tuple[str, str]] = set()  # (first, second) canonical IDs in table order
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "DrugInteractionIndex":
+        with open(path or DEFAULT_INTERACTIONS_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        index = cls()
+        for drug, synonyms in data.get("synonyms", {}).items():
+            index.add_synonyms(drug, synonyms)
+        for entry in data.get("interactions", []):
+            first, second = entry["drugs"]
+            index.add_interaction(first, second, entry["severity"], entry["description"])
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(partners) for partners in self._adjacency.values()) // 2
+
+    def add_synonyms(self, drug: str, synonyms: List[str]) -> None:
+        canonical = self.canonical(drug)
+        self._canonical[canonical] = canonical
+        for synonym in synonyms:
+            self._canonical[normalize_drug_name(synonym)] = canonical
+
+    def add_interaction(self, first: str, second: str, severity: str, description: str) -> None:
+        first, second = self.canonical(first), self.canonical(second)
+        self._canonical.setdefault(first, first)
+        self._canonical.setdefault(second, second)
+        interaction = {
+            "drugs": [first.title(), second.title()],
+            "severity": severity,
+            "description": description
+        }
+        self._adjacency.setdefault(first, {})[second] = interaction
+        self._adjacency.setdefault(second, {})[first] = interaction
+        self._listed.discard((second, first))
+        self._listed.add((first, second))
+
+    def canonical(self, name: str) -> str:
+        """Canonical drug for a name; unknown drugs are their own normalized name"""
+        normalized = normalize_drug_name(name)
+        return self._canonical.get(normalized, normalized)
+
+    def names(self) -> List[str]:
+        """Every recognized name (canonical and synonyms), sorted"""
+        return sorted(self._canonical)
+
+    def pairs_among(self, drugs: List[str]) -> List[Tuple[int, int, Dict[str, Any]]]:
+        """
+        Interacting pairs within a list of canonical drugs, each found once
+        Returns (position of first, position of second, interaction) with the
+        positions in the order the interaction lists its drugs
+        """
+        positions = {drug: position for position, drug in enumerate(drugs)}
+        pairs = []
+        for position, drug in enumerate(drugs):
+            for partner, interaction in self._adjacency.get(drug, {}).items():
+                partner_position = positions.get(partner)
+                if partner_position is None or position >= partner_position:
+                    continue
+                if (drug, partner) in self._listed:
+                    pairs.append((position, partner_position, interaction))
+                else:
+                    pairs.append((partner_position, position, interaction))
+        return pairs
+
+    def screen(self, medications: List[str]) -> List[Dict[str, Any]]:
+        """
+        Find every interacting pair in a medication list
+        One pass canonicalizes the list (first name given per drug); each drug
+        then looks its partners up in that set, so the cost is O(N) plus the
+        partner counts of the listed drugs, linear in N for a fixed table.
+        """
+        positions: Dict[str, int] = {}
+        names: List[str] = []
+        for name in medications:
+            drug = self.canonical(name)
+            if drug not in positions:
+                positions[drug] = len(names)
+                names.append(name)
+
+        hits = []
+        for drug, position in positions.items():
+            for partner, interaction in self._adjacency.get(drug, {}).items():
+                earlier = positions.get(partner)
+                if earlier is not None and earlier < position:
+                    hits.append(dict(interaction, medications=[names[earlier], names[position]]))
+
+        hits.sort(key=lambda hit: self.SEVERITY_ORDER.get(hit["severity"], len(self.SEVERITY_ORDER)))
+        return hits
+
+    def check_against(self, medication: str, current: List[str]) -> List[Dict[str, Any]]:
+        """Interactions between one new medication and a list of current ones"""
+        partners = self._adjacency.get(self.canonical(medication), {})
+        checked = set()
+        hits = []
+        for name in current:
+            drug = self.canonical(name)
+            interaction = partners.get(drug)
+            if interaction is not None and drug not in checked:
+                hits.append(dict(interaction, medications=[medication, name]))
+            checked.add(drug)
+        hits.sort(key=lambda hit: self.SEVERITY_ORDER.get(hit["severity"], len(self.SEVERITY_ORDER)))
+        return hits
@@ -0,0 +1,204 @@
+"""
+Persistent LLM Response Cache
+Caches completions keyed by (model, temperature, normalized prompt) with TTL and LRU eviction
+"""
+
+from typing import Dict, Optional
+from collections import OrderedDict
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivially different phrasings share a cache entry"""
+    prompt = re.sub(r"\s+", " ", prompt.strip().lower())
+    return prompt.rstrip(" ?!.")
+
+
+class LLMResponseCache:
+    """LRU cache of LLM responses, persisted to SQLite
+
+    Entries live in memory in LRU order and are written through to disk.
+    Hits never touch the database: their last-use times are kept in memory
+    and written with the next put() and on close(). On startup unexpired
+    entries are loaded back in order of last use, so recency survives
+    restarts. Entries older than `ttl_seconds` are treated as misses and
+    dropped.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses (created_at);
+    """
+
+    def __init__(self, path: str = ".llm_cache/responses.db", ttl_seconds: float = 86400, max_entries: int = 1000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._touched: Dict[str, float] = {}  # key -> last hit, not yet on disk
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        self._load()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        raw = json.dumps([model, float(temperature), normalize_prompt(prompt)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _migrate(self) -> None:
+        """Add the last_used column to caches written before it existed"""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+        if "last_used" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN last_used REAL")
+        self._conn.execute("UPDATE responses SET last_used = created_at WHERE last_used IS NULL")
+        self._conn.commit()
+
+    def _load(self) -> None:
+        """Load unexpired entries from disk, keeping the `max_entries` most recently used"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+            rows = self._conn.execute(
+                "SELECT key, response, created_at FROM responses ORDER BY last_used DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+            for key, response, created_at in reversed(rows):
+                self._entries[key] = (response, created_at)
+
+    def get(self, model: str, temperature: float, prompt: str) -> Optional[str]:
+        """Return the cached response, or None on a miss"""
+        key = self.make_key(model, temperature, prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+                self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._touched[key] = time.time()
+            self.hits += 1
+            return entry[0]
+
+    def put(self, model: str, temperature: float, prompt: str, response: str) -> None:
+        """Store a response, evicting the least recently used entries beyond capacity"""
+        key = self.make_key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (response, now)
+            self._entries.move_to_end(key)
+            self._touched.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._touched.pop(oldest, None)
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (oldest,))
+                self.evictions += 1
+            self._write_touched()
+            self._conn.commit()
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def _write_touched(self) -> None:
+        """Write pending last-use times (caller holds the lock and commits)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._touched.pop(key, None)
+        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--path", default=".llm_cache/responses.db", help="Cache database path")
+    args = parser.parse_args()
+
+    cache = LLMResponseCache(args.path)
+    if args.command == "clear":
+        cache.clear()
+        print(f"🧹 Cleared {args.path}")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Shared LLM Client
+One pooled HTTP client for every ChatOpenAI in the process, with deadlines, jittered retries and an in-flight limit
+"""
+
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential
+)
+
+
+# ============================================================================
+# GOVERNED TRANSPORT
+# ============================================================================
+
+# Failures worth another attempt: timeouts, dropped connections, rate limits, overloaded upstreams
+TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees its in-flight slot when closed (streamed completions hold it until the last token)"""
+
+    def __init__(self, stream: httpx.SyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    """Async counterpart of _ReleasingStream"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class TransportGovernor:
+    """In-flight limit, retry policy and counters shared by the sync and async transports
+
+    At most `max_in_flight` requests (including streaming bodies still being
+    read) are outstanding across both; further callers wait up to
+    `queue_timeout` seconds for a slot. Transient errors and statuses are
+    retried up to `max_retries` times with full-jitter exponential backoff,
+    never past `retry_deadline` seconds from the first attempt. When retries
+    run out the last response is returned as-is, so the caller sees the
+    upstream status.
+    """
+
+    # Async callers poll for a free slot rather than block the event loop
+    ASYNC_POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        queue_timeout: float = 30.0,
+        max_retries: int = 3,
+        retry_deadline: float = 120.0,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0
+    ):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_deadline = retry_deadline
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def acquire(self, request: httpx.Request):
+        """Wait for an in-flight slot; returns its release() (idempotent)"""
+        return self._admit(self._slots.acquire(timeout=self.queue_timeout), request)
+
+    async def acquire_async(self, request: httpx.Request):
+        """acquire() for async callers (nothing is left holding a slot if the caller is cancelled)"""
+        deadline = time.monotonic() + self.queue_timeout
+        acquired = self._slots.acquire(blocking=False)
+        while not acquired and time.monotonic() < deadline:
+            await asyncio.sleep(self.ASYNC_POLL_INTERVAL)
+            acquired = self._slots.acquire(blocking=False)
+        return self._admit(acquired, request)
+
+    def _admit(self, acquired: bool, request: httpx.Request):
+        if not acquired:
+            with self._stats_lock:
+                self.rejected += 1
+            raise httpx.PoolTimeout(f"LLM in-flight limit ({self.max_in_flight}) reached", request=request)
+        with self._stats_lock:
+            self.in_flight += 1
+            self.requests += 1
+
+        released = threading.Event()
+
+        def release():
+            if not released.is_set():
+                released.set()
+                with self._stats_lock:
+                    self.in_flight -= 1
+                self._slots.release()
+
+        return release
+
+    def retry_policy(self) -> Dict[str, Any]:
+        """Keyword arguments for tenacity's Retrying / AsyncRetrying"""
+        return dict(
+            stop=stop_after_attempt(self.max_retries + 1) | stop_after_delay(self.retry_deadline),
+            wait=wait_random_exponential(multiplier=self.backoff, max=self.max_backoff),
+            retry=retry_if_exception_type(TRANSIENT_ERRORS) | retry_if_result(self.is_transient),
+            before_sleep=self._count_retry,
+            retry_error_callback=lambda state: state.outcome.result()
+        )
+
+    @staticmethod
+    def is_transient(response: httpx.Response) -> bool:
+        return response.status_code in TRANSIENT_STATUS
+
+    def _count_retry(self, state) -> None:
+        with self._stats_lock:
+            self.retries += 1
+
+    def count_failure(self) -> None:
+        with self._stats_lock:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected": self.rejected
+            }
+
+
+class GovernedTransport(httpx.BaseTransport):
+    """Keep-alive connection pool (or any inner transport) governed by a TransportGovernor"""
+
+    def __init__(
+        self,
+        governor: Optional[TransportGovernor] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        **kwargs
+    ):
+        self.governor = governor or TransportGovernor()
+        self._transport = transport or httpx.HTTPTransport(**kwargs)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        release = self.governor.acquire(request)
+        try:
+            response = Retrying(**self.governor.retry_policy())(self._send, request)
+        except Exception:
+            self.governor.count_failure()
+            release()
+            raise
+
+        if self.governor.is_transient(response):
+            # Retries ran out; the caller gets the last transient response
+            self.governor.count_failure()
+        if response.is_closed:
+            # The body is already in memory (read before a retry, or never streamed)
+            release()
+        else:
+            response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    def _send(self, request: httpx.Request) -> httpx.Response:
+        response = self._transport.handle_request(request)
+        if self.governor.is_transient(response):
+            # Read and close so the pooled connection is reusable for the retry
+            response.read()
+            response.close()
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return self.governor.stats()
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncGovernedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of GovernedTransport (share a governor to share the in-flight limit)"""
+
+    def __init__(
+        self,
+        governor: Optional[TransportGovernor] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        **kwargs
+    ):
+        self.governor = governor or TransportGovernor()
+        self._transport = transport or httpx.AsyncHTTPTransport(**kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        release = await self.governor.acquire_async(request)
+        try:
+            response = await AsyncRetrying(**self.governor.retry_policy())(self._send, request)
+        except Exception:
+            self.governor.count_failure()
+            release()
+            raise
+        except BaseException:
+            # Cancelled: free the slot without counting a failure
+            release()
+            raise
+
+        if self.governor.is_transient(response):
+            self.governor.count_failure()
+        if response.is_closed:
+            release()
+        else:
+            response.stream = _AsyncReleasingStream(response.stream, release)
+        return response
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        response = await self._transport.handle_async_request(request)
+        if self.governor.is_transient(response):
+            await response.aread()
+            await response.aclose()
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return self.governor.stats()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# ============================================================================
+# CLIENT FACTORY
+# ============================================================================
+
+_client_lock = threading.Lock()
+_governor: Optional[TransportGovernor] = None
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _pool_settings() -> Dict[str, Any]:
+    """Connection limits and timeouts from LLM_* environment variables"""
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=30.0
+        ),
+        "timeout": httpx.Timeout(
+            float(os.getenv("LLM_TIMEOUT", "60")),
+            connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        )
+    }
+
+
+def _get_governor() -> TransportGovernor:
+    """The process-wide governor (caller holds _client_lock)"""
+    global _governor
+    if _governor is None:
+        _governor = TransportGovernor(
+            max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "8")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "30")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+            retry_deadline=float(os.getenv("LLM_RETRY_DEADLINE", "120"))
+        )
+    return _governor
+
+
+def get_http_client() -> httpx.Client:
+    """The process-wide pooled HTTP client (configured from LLM_* environment variables on first call)"""
+    global _http_client
+    with _client_lock:
+        if _http_client is None:
+            settings = _pool_settings()
+            _http_client = httpx.Client(
+                transport=GovernedTransport(_get_governor(), limits=settings["limits"]),
+                timeout=settings["timeout"]
+            )
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """The process-wide async client, sharing the sync client's in-flight limit, retries and counters"""
+    global _async_http_client
+    with _client_lock:
+        if _async_http_client is None:
+            settings = _pool_settings()
+            _async_http_client = httpx.AsyncClient(
+                transport=AsyncGovernedTransport(_get_governor(), limits=settings["limits"]),
+                timeout=settings["timeout"]
+            )
+        return _async_http_client
+
+
+def create_chat_model(model: str = "gpt-4", temperature: float = 0.3, **kwargs):
+    """A ChatOpenAI that sends every request, sync or async, through the shared clients
+
+    OPENAI_BASE_URL points it at any OpenAI-compatible server (e.g. a local
+    mock). Retries happen in the transport, so the SDK's own are disabled.
+    """
+    from langchain_openai import ChatOpenAI
+
+    client = get_http_client()
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        timeout=client.timeout.read,
+        max_retries=0,
+        http_client=client,
+        http_async_client=get_async_http_client(),
+        **kwargs
+    )
+
+
+def client_stats() -> Dict[str, Any]:
+    """Transport counters (empty until the client is first used)"""
+    with _client_lock:
+        return _governor.stats() if _governor is not None else {}
+
+
+def close_http_client() -> None:
+    """Close pooled connections; the next get_http_client() starts a fresh client
+
+    An AsyncClient can only be closed from its event loop, so the async
+    client is dropped here and its connections close with that loop.
+    """
+    global _governor, _http_client, _async_http_client
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _async_http_client = None
+        _governor = None
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Send one prompt through the shared LLM client")
+    parser.add_argument("prompt", nargs="?", default="Reply with OK.")
+    parser.add_argument("--model", default="gpt-4")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    llm = create_chat_model(args.model)
+    print(f"🤖 {llm.invoke(args.prompt).content}")
+    print(json.dumps(client_stats(), indent=2))
+    close_http_client()
+
+
+if __name__ == "__main__":
+    main()
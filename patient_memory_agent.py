@@ -7,17 +7,24 @@ import os
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from datetime import datetime
+from collections import OrderedDict
 import json
 from pathlib import Path
 import re
+import sqlite3
+import threading
+import time
+import atexit
 
 # LangChain imports
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
+from langchain_core.messages import AIMessageChunk, ToolMessage
 from langgraph.prebuilt import create_react_agent
 
 # Local imports
-from clinical_tools import ClinicalTools
+from clinical_tools import get_shared_clinical_tools, shutdown_shared_clinical_tools
+from conversation_store import ConversationStore, create_conversation_store
+from llm_client import create_chat_model, close_http_client
 
 load_dotenv()
 
@@ -25,90 +32,202 @@ load_dotenv()
 # PATIENT-BASED MEMORY MANAGER
 # ============================================================================
 
+class _CachedHistory:
+    """In-memory view of one patient's history held by PatientMemoryManager
+
+    `messages` is the full history for JSON files (as loaded, plus messages
+    added since) but only the most recent messages for segment logs, which
+    are never loaded in full just to cache. `pending` holds messages not yet
+    written to disk; only these are ever written back.
+    """
+    
+    def __init__(self, messages: List[Dict], total: int):
+        self.messages = messages
+        self.total = total
+        self.pending: List[Dict] = []
+        self.dirty_since: Optional[float] = None
+    
+    @property
+    def complete(self) -> bool:
+        return len(self.messages) == self.total
+
+
 class PatientMemoryManager:
-    """Manages separate conversation histories per patient"""
+    """Manages separate conversation histories per patient
+
+    Storage is delegated to a ConversationStore (see conversation_store.py):
+      - "json" (default): one {patient_id}_history.json file per patient
+      - "jsonl": append-only segment log per patient with an offset index
+      - "sqlite": single WAL-mode database indexed on (patient_id, timestamp)
+
+    Loaded histories are kept in an LRU cache of `cache_size` patients.
+    Durability depends on `flush_interval`:
+      - None (default): write-through, add_message is on disk when it returns
+        (add_message(..., defer=True) holds a message for the next write, so an
+        agent turn stores its question and answer in one write)
+      - N seconds: write-behind, new messages are flushed by a background
+        thread after at most N seconds, on cache eviction, on flush()/close()
+        and at interpreter exit. A hard crash can lose up to N seconds of messages.
+    """
+    
+    CACHED_TAIL_MESSAGES = 50
     
-    def __init__(self, storage_dir: str = ".patient_conversations"):
+    def __init__(
+        self,
+        storage_dir: str = ".patient_conversations",
+        storage_format: str = "json",
+        cache_size: int = 128,
+        flush_interval: Optional[float] = None,
+        store: Optional[ConversationStore] = None
+    ):
+        if cache_size < 1:
+            raise ValueError("cache_size must be at least 1")
+        
         self.storage_dir = Path(storage_dir)
-        self.storage_dir.mkdir(exist_ok=True)
+        self.store = store or create_conversation_store(storage_format, storage_dir)
+        self.storage_format = self.store.name
         self.current_patient = None
+        
+        # LRU cache of loaded histories with write-behind of pending messages
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self._cache: "OrderedDict[str, _CachedHistory]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        
+        if flush_interval is not None:
+            if flush_interval <= 0:
+                raise ValueError("flush_interval must be positive (use None for write-through)")
+            self._flusher = threading.Thread(target=self._flush_loop, name="patient-memory-flush", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
     
     def get_patient_file(self, patient_id: str) -> Path:
-        """Get file path for patient's conversation history"""
+        """Get file path for patient's conversation history (JSON layout)"""
         return self.storage_dir / f"{patient_id}_history.json"
     
     def load_patient_memory(self, patient_id: str) -> List[Dict]:
         """Load previous conversation history for a patient"""
-        file_path = self.get_patient_file(patient_id)
-        
-        if file_path.exists():
-            with open(file_path, 'r') as f:
-                history = json.load(f)
-                return history
-        return []
+        with self._lock:
+            entry = self._get_cached(patient_id)
+            if entry.complete:
+                return list(entry.messages)
+            self._flush_entry(patient_id, entry)
+            return self.store.read_history(patient_id)
+    
+    def load_recent_messages(self, patient_id: str, limit: int) -> List[Dict]:
+        """Load only the last `limit` messages of a patient's history"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            entry = self._get_cached(patient_id)
+            if entry.complete or limit <= len(entry.messages):
+                return entry.messages[-limit:]
+            self._flush_entry(patient_id, entry)
+            return self.store.read_recent(patient_id, limit)
+    
+    def get_message_count(self, patient_id: str) -> int:
+        """Get number of stored messages for a patient"""
+        with self._lock:
+            return self._get_cached(patient_id).total
     
     def save_patient_memory(self, patient_id: str, messages: List[Dict]) -> None:
-        """Save conversation history for a patient"""
-        file_path = self.get_patient_file(patient_id)
-        
-        with open(file_path, 'w') as f:
-            json.dump(messages, f, indent=2, default=str)
+        """Save conversation history for a patient, replacing anything cached"""
+        with self._lock:
+            self._cache.pop(patient_id, None)
+            self.store.write_history(patient_id, messages)
     
     def switch_patient(self, patient_id: str) -> None:
         """Switch to a different patient"""
-        history = self.load_patient_memory(patient_id)
+        message_count = self.get_message_count(patient_id)
         self.current_patient = patient_id
         
-        if not history:
+        if not message_count:
             print(f"\n📝 Starting new conversation with {patient_id}")
         else:
-            print(f"\n📚 Loaded {len(history)} previous messages for {patient_id}")
+            print(f"\n📚 Loaded {message_count} previous messages for {patient_id}")
         
         print(f"👤 Current patient: {patient_id}")
     
-    def add_message(self, patient_id: str, role: str, content: str) -> None:
-        """Add a message to patient's history"""
-        history = self.load_patient_memory(patient_id)
-        history.append({
+    def add_message(self, patient_id: str, role: str, content: str, defer: bool = False) -> Dict:
+        """Add a message to patient's history and return it (defer: leave it for the next write)"""
+        message = {
             'type': role,
             'content': content,
             'timestamp': datetime.now().isoformat()
-        })
-        self.save_patient_memory(patient_id, history)
+        }
+        
+        with self._lock:
+            entry = self._get_cached(patient_id)
+            entry.messages.append(message)
+            if self.store.append_only:
+                del entry.messages[:-self.CACHED_TAIL_MESSAGES]
+            entry.total += 1
+            entry.pending.append(message)
+            if entry.dirty_since is None:
+                entry.dirty_since = time.monotonic()
+            
+            if self.flush_interval is None and not defer:
+                self._flush_entry(patient_id, entry)
+        return message
+    
+    def flush(self, patient_id: Optional[str] = None) -> None:
+        """Write pending messages to disk for one patient, or all patients"""
+        with self._lock:
+            if patient_id is not None:
+                entry = self._cache.get(patient_id)
+                if entry:
+                    self._flush_entry(patient_id, entry)
+                return
+            for pid, entry in list(self._cache.items()):
+                self._flush_entry(pid, entry)
+    
+    def close(self) -> None:
+        """Stop the background flusher, write all pending messages and close the store"""
+        if self._closed.is_set() and self._flusher is None:
+            return
+        self._closed.set()
+        if self._flusher and self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=5)
+        self._flusher = None
+        self.flush()
+        self.store.close()
     
     def get_all_patients(self) -> List[str]:
         """Get list of all patients with conversation history"""
-        files = list(self.storage_dir.glob("*_history.json"))
-        patients = [f.stem.replace('_history', '') for f in files]
-        return sorted(patients)
+        with self._lock:
+            unflushed = {pid for pid, entry in self._cache.items() if entry.pending}
+        return sorted(set(self.store.list_patients()) | unflushed)
     
     def get_patient_summary(self, patient_id: str) -> Dict:
         """Get summary of patient's conversation history"""
-        history = self.load_patient_memory(patient_id)
-        return {
-            'patient_id': patient_id,
-            'total_messages': len(history),
-            'last_updated': history[-1]['timestamp'] if history else None,
-            'human_messages': len([m for m in history if m['type'] == 'human']),
-            'ai_messages': len([m for m in history if m['type'] == 'ai']),
-        }
+        self.flush(patient_id)
+        return self.store.summarize(patient_id)
+    
+    def get_all_summaries(self) -> List[Dict]:
+        """Get summaries for all patients from the store's summary index"""
+        self.flush()
+        return self.store.summarize_all()
     
     def clear_patient_history(self, patient_id: str) -> None:
         """Clear conversation history for a patient"""
-        file_path = self.get_patient_file(patient_id)
-        if file_path.exists():
-            file_path.unlink()
-            print(f"🗑️  Cleared history for {patient_id}")
+        with self._lock:
+            entry = self._cache.pop(patient_id, None)
+            had_pending = bool(entry and entry.pending)
+            
+            if self.store.has_history(patient_id) or had_pending:
+                self.store.delete_history(patient_id)
+                print(f"🗑️  Cleared history for {patient_id}")
     
     def get_patient_context(self, patient_id: str) -> str:
         """Get patient's recent conversation as context"""
-        history = self.load_patient_memory(patient_id)
+        # Get last 5 messages
+        recent = self.load_recent_messages(patient_id, 5)
         
-        if not history:
+        if not recent:
             return ""
         
-        # Get last 5 messages
-        recent = history[-5:]
         context_lines = []
         
         for msg in recent:
@@ -116,6 +235,55 @@ class PatientMemoryManager:
             context_lines.append(f"{role}: {msg['content'][:100]}")
         
         return "\n".join(context_lines)
+    
+    # ------------------------------------------------------------------------
+    # History cache (write-behind)
+    # ------------------------------------------------------------------------
+    
+    def _get_cached(self, patient_id: str) -> _CachedHistory:
+        """Get a patient's cached history, loading it with a single read on a miss"""
+        entry = self._cache.get(patient_id)
+        if entry is not None:
+            self._cache.move_to_end(patient_id)
+            return entry
+        
+        if self.store.append_only:
+            total = self.store.count_messages(patient_id)
+            entry = _CachedHistory(self.store.read_recent(patient_id, self.CACHED_TAIL_MESSAGES), total)
+        else:
+            history = self.store.read_history(patient_id)
+            entry = _CachedHistory(history, len(history))
+        
+        self._cache[patient_id] = entry
+        while len(self._cache) > self.cache_size:
+            evicted_id, evicted = self._cache.popitem(last=False)
+            self._flush_entry(evicted_id, evicted)
+        return entry
+    
+    def _flush_entry(self, patient_id: str, entry: _CachedHistory) -> None:
+        """Append an entry's pending messages as one coalesced write
+
+        Only the pending tail is written: other processes (the API server)
+        may have appended to the same history since it was cached, so the
+        cached copy never replaces what is on disk.
+        """
+        if not entry.pending:
+            return
+        self.store.append_messages(patient_id, entry.pending)
+        entry.pending = []
+        entry.dirty_since = None
+    
+    def _flush_loop(self) -> None:
+        """Background write-behind: flush entries dirty for longer than flush_interval"""
+        while not self._closed.wait(self.flush_interval):
+            now = time.monotonic()
+            with self._lock:
+                for pid, entry in list(self._cache.items()):
+                    if entry.dirty_since is not None and now - entry.dirty_since >= self.flush_interval:
+                        try:
+                            self._flush_entry(pid, entry)
+                        except (OSError, sqlite3.Error) as e:
+                            print(f"\n❌ Failed to flush history for {pid}: {e}")
 
 
 # ============================================================================
@@ -126,7 +294,7 @@ class PatientMemoryManager:
 def search_patients(patient_id: str = None, last_name: str = None) -> str:
     """Search for patients by ID or last name"""
     try:
-        clinical = ClinicalTools()
+        clinical = get_shared_clinical_tools()
         results = clinical.search_patients(patient_id=patient_id, last_name=last_name)
         return json.dumps(results, indent=2)
     except Exception as e:
@@ -137,8 +305,8 @@ def search_patients(patient_id: str = None, last_name: str = None) -> str:
 def search_doctors(specialty: str = None, available_day: str = None) -> str:
     """Search for doctors by specialty or availability"""
     try:
-        clinical = ClinicalTools()
-        results = clinical.search_doctors(specialty=specialty, available_day=available_day)
+        clinical = get_shared_clinical_tools()
+        results = clinical.search_doctors(specialty=specialty, available_on=available_day)
         return json.dumps(results, indent=2)
     except Exception as e:
         return json.dumps({"error": str(e)})
@@ -147,13 +315,15 @@ def search_doctors(specialty: str = None, available_day: str = None) -> str:
 @tool
 def schedule_appointment(patient_id: str, doctor_id: str, appointment_time: str, 
                          reason: str, appointment_type: str = "checkup") -> str:
-    """Schedule an appointment for a patient"""
+    """Schedule an appointment for a patient (appointment_time: ISO datetime, e.g. 2026-03-02T10:00)"""
     try:
-        clinical = ClinicalTools()
+        clinical = get_shared_clinical_tools()
+        appointment_datetime = datetime.fromisoformat(appointment_time)
         result = clinical.schedule_appointment(
             patient_id=patient_id,
             doctor_id=doctor_id,
-            appointment_time=appointment_time,
+            appointment_date=appointment_datetime.date().isoformat(),
+            appointment_time=appointment_datetime.strftime("%H:%M"),
             reason=reason,
             appointment_type=appointment_type
         )
@@ -162,11 +332,31 @@ def schedule_appointment(patient_id: str, doctor_id: str, appointment_time: str,
         return json.dumps({"error": str(e)})
 
 
+@tool
+def find_available_slots(doctor_id: str = None, specialty: str = None, start_date: str = None,
+                         end_date: str = None, duration_minutes: int = 30, limit: int = 5) -> str:
+    """Find the next free appointment slots for a doctor or specialty (dates: YYYY-MM-DD).
+    Use this before schedule_appointment instead of guessing times."""
+    try:
+        clinical = get_shared_clinical_tools()
+        result = clinical.find_available_slots(
+            doctor_id=doctor_id,
+            specialty=specialty,
+            start_date=start_date,
+            end_date=end_date,
+            duration_minutes=duration_minutes,
+            limit=limit
+        )
+        return json.dumps(result, indent=2)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
 @tool
 def get_medical_history(patient_id: str) -> str:
     """Get medical history for a patient"""
     try:
-        clinical = ClinicalTools()
+        clinical = get_shared_clinical_tools()
         result = clinical.get_medical_history(patient_id=patient_id)
         return json.dumps(result, indent=2)
     except Exception as e:
@@ -174,11 +364,21 @@ def get_medical_history(patient_id: str) -> str:
 
 
 @tool
-def check_drug_interactions(medication1: str, medication2: str) -> str:
-    """Check for drug interactions between two medications"""
+def check_drug_interactions(medications: str) -> str:
+    """Check for drug interactions among a comma-separated list of medications (e.g. "warfarin, aspirin")"""
+    try:
+        clinical = get_shared_clinical_tools()
+        result = clinical.check_drug_interactions([m.strip() for m in medications.split(",") if m.strip()])
+        return json.dumps(result)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+@tool
+def check_prescription_interactions(patient_id: str, medication: str) -> str:
+    """Check a new prescription against the patient's active medications before prescribing"""
     try:
-        clinical = ClinicalTools()
-        result = clinical.check_drug_interactions(medication1=medication1, medication2=medication2)
+        clinical = get_shared_clinical_tools()
+        result = clinical.check_prescription_interactions(patient_id, medication)
         return json.dumps(result)
     except Exception as e:
         return json.dumps({"error": str(e)})
@@ -192,23 +392,29 @@ class LangChainPatientAgent:
     """LangChain-based Clinical Agent with patient-based memory"""
     
     def __init__(self):
-        # Initialize patient memory manager
-        self.memory_manager = PatientMemoryManager()
+        # Shared clinical repository used by all tools
+        self.clinical = get_shared_clinical_tools()
+        self.clinical.warm_up()
         
-        # Initialize LLM
-        self.llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.3,
-            api_key=os.getenv("OPENAI_API_KEY")
+        # Initialize patient memory manager
+        flush_interval = os.getenv("PATIENT_MEMORY_FLUSH_INTERVAL")
+        self.memory_manager = PatientMemoryManager(
+            storage_format=os.getenv("PATIENT_MEMORY_FORMAT", "json"),
+            flush_interval=float(flush_interval) if flush_interval else None
         )
         
+        # Initialize LLM (shared pooled client with deadlines, retries and an in-flight limit)
+        self.llm = create_chat_model("gpt-4", 0.3)
+        
         # Initialize tools
         self.tools = [
             search_patients,
             search_doctors,
+            find_available_slots,
             schedule_appointment,
             get_medical_history,
-            check_drug_interactions
+            check_drug_interactions,
+            check_prescription_interactions
         ]
         
         # Create agent with tools
@@ -223,7 +429,30 @@ class LangChainPatientAgent:
         return match.group(0) if match else None
     
     def process_input(self, user_input: str) -> str:
-        """Process user input and route to correct patient"""
+        """Process user input and return the agent's full answer"""
+        output = ""
+        for event, data in self.stream_input(user_input):
+            if event == "done":
+                output = data["message"]["content"]
+            elif event == "error":
+                output = data["error"]
+        return output
+    
+    def stream_input(self, user_input: str):
+        """
+        Process user input as a stream of (event, data) pairs: ("tool", {...})
+        and ("token", {"text": ...}) while the agent runs, then ("done", {...})
+        carrying the persisted AI message or ("error", {...}).
+        The turn's question and answer are persisted in one write (before
+        "done", or when the stream ends early).
+        """
+        try:
+            yield from self._stream_turn(user_input)
+        finally:
+            self.memory_manager.flush()
+    
+    def _stream_turn(self, user_input: str):
+        """Route user input to the correct patient and stream the agent run"""
         
         # Check if input specifies a patient
         detected_patient = self.detect_patient_from_input(user_input)
@@ -231,62 +460,58 @@ class LangChainPatientAgent:
         if detected_patient:
             # Switch to this patient
             self.memory_manager.switch_patient(detected_patient)
-            
-            # Save user message
-            self.memory_manager.add_message(detected_patient, 'human', user_input)
-            
-            # Get patient context
-            context = self.memory_manager.get_patient_context(detected_patient)
-            
-            # Create input with patient context
-            if context:
-                full_input = f"Patient {detected_patient} (Recent context:\n{context})\n\nNew request: {user_input}"
-            else:
-                full_input = f"Patient {detected_patient}: {user_input}"
-            
-            try:
-                # Run agent
-                print("\n🧠 Processing...", end="", flush=True)
-                response = self.agent.invoke({"input": full_input})
-                output = response.get('output', 'No response')
-                print("\r             ", end="\r")  # Clear line
-                
-                # Save AI response
-                self.memory_manager.add_message(detected_patient, 'ai', output)
-                
-                return output
-            except Exception as e:
-                print("\r             ", end="\r")
-                return f"Error: {str(e)}"
+        
+        patient_id = detected_patient or self.memory_manager.current_patient
+        if not patient_id:
+            yield "error", {"error": "Please specify a patient ID (e.g., 'PT000001') in your message."}
+            return
+        
+        # Save user message (written together with the answer, or by the flush when the turn ends)
+        self.memory_manager.add_message(patient_id, 'human', user_input, defer=True)
+        
+        # Get patient context
+        context = self.memory_manager.get_patient_context(patient_id)
+        
+        # Create input with patient context
+        if context:
+            full_input = f"Patient {patient_id} (Recent context:\n{context})\n\nNew request: {user_input}"
         else:
-            if self.memory_manager.current_patient:
-                # Use current patient
-                self.memory_manager.add_message(self.memory_manager.current_patient, 'human', user_input)
-                
-                context = self.memory_manager.get_patient_context(self.memory_manager.current_patient)
-                
-                if context:
-                    full_input = f"Patient {self.memory_manager.current_patient} (Recent context:\n{context})\n\nNew request: {user_input}"
-                else:
-                    full_input = f"Patient {self.memory_manager.current_patient}: {user_input}"
-                
-                try:
-                    print("\n🧠 Processing...", end="", flush=True)
-                    response = self.agent.invoke({"input": full_input})
-                    output = response.get('output', 'No response')
-                    print("\r             ", end="\r")
-                    
-                    self.memory_manager.add_message(self.memory_manager.current_patient, 'ai', output)
-                    return output
-                except Exception as e:
-                    print("\r             ", end="\r")
-                    return f"Error: {str(e)}"
-            else:
-                return "Please specify a patient ID (e.g., 'PT000001') in your message."
-    
-    def show_patient_history(self, patient_id: str) -> None:
-        """Display conversation history for a patient"""
-        history = self.memory_manager.load_patient_memory(patient_id)
+            full_input = f"Patient {patient_id}: {user_input}"
+        
+        try:
+            output = yield from self._stream_agent(full_input)
+        except Exception as e:
+            yield "error", {"error": f"Error: {str(e)}"}
+            return
+        
+        # Save AI response
+        message = self.memory_manager.add_message(patient_id, 'ai', output or 'No response')
+        yield "done", {"patient_id": patient_id, "message": message}
+    
+    def _stream_agent(self, full_input: str):
+        """Run the LangGraph agent, yielding tokens and tool progress; returns the final answer"""
+        parts = []
+        stream = self.agent.stream({"messages": [("user", full_input)]}, stream_mode="messages")
+        for chunk, _metadata in stream:
+            if isinstance(chunk, ToolMessage):
+                yield "tool", {"name": chunk.name, "status": "finished"}
+                continue
+            if not isinstance(chunk, AIMessageChunk):
+                continue
+            if isinstance(chunk.content, str) and chunk.content:
+                parts.append(chunk.content)
+                yield "token", {"text": chunk.content}
+            for call in chunk.tool_call_chunks or []:
+                if call.get("name"):
+                    # Text before a tool call is reasoning, not the answer
+                    parts = []
+                    yield "tool", {"name": call["name"], "status": "started"}
+        return "".join(parts)
+    
+    def show_patient_history(self, patient_id: str, limit: int = 20) -> None:
+        """Display the most recent conversation history for a patient"""
+        history = self.memory_manager.load_recent_messages(patient_id, limit)
+        total = self.memory_manager.get_message_count(patient_id)
         
         print(f"\n{'='*60}")
         print(f"📋 Conversation History for {patient_id}")
@@ -296,6 +521,9 @@ class LangChainPatientAgent:
             print("No history found.")
             return
         
+        if total > len(history):
+            print(f"(showing last {len(history)} of {total} messages)")
+        
         for msg in history:
             role = "👤 You" if msg['type'] == 'human' else "🤖 Agent"
             content = msg['content'][:200] + "..." if len(msg['content']) > 200 else msg['content']
@@ -305,18 +533,18 @@ class LangChainPatientAgent:
     
     def list_all_patients(self) -> None:
         """List all patients with conversation history"""
-        patients = self.memory_manager.get_all_patients()
+        summaries = self.memory_manager.get_all_summaries()
         
         print(f"\n{'='*60}")
-        print(f"📂 Patients with Conversation History ({len(patients)})")
+        print(f"📂 Patients with Conversation History ({len(summaries)})")
         print(f"{'='*60}")
         
-        if not patients:
+        if not summaries:
             print("No patients yet.")
             return
         
-        for patient_id in patients:
-            summary = self.memory_manager.get_patient_summary(patient_id)
+        for summary in summaries:
+            patient_id = summary['patient_id']
             marker = " 👤" if patient_id == self.memory_manager.current_patient else ""
             print(f"\n{patient_id}{marker}")
             print(f"   Messages: {summary['total_messages']} ({summary['human_messages']} questions, {summary['ai_messages']} responses)")
@@ -335,7 +563,7 @@ def show_welcome():
     print(f"{'='*60}")
     print("\n📝 Commands:")
     print("   /list              - Show all patients")
-    print("   /history PT000001   - Show patient history")
+    print("   /history PT000001   - Show patient history (last 20, or /history PT000001 50)")
     print("   /clear PT000001     - Clear patient history")
     print("   /help              - Show this help")
     print("   /quit              - Exit")
@@ -377,7 +605,10 @@ def main():
                 parts = user_input.split()
                 if len(parts) > 1:
                     patient_id = parts[1]
-                    agent.show_patient_history(patient_id)
+                    if len(parts) > 2 and parts[2].isdigit():
+                        agent.show_patient_history(patient_id, limit=int(parts[2]))
+                    else:
+                        agent.show_patient_history(patient_id)
                 continue
             
             elif user_input.lower().startswith("/clear "):
@@ -387,15 +618,26 @@ def main():
                     agent.memory_manager.clear_patient_history(patient_id)
                 continue
             
-            # Process query
-            response = agent.process_input(user_input)
-            print(f"\n🤖 Agent: {response}\n")
+            # Process query, printing the answer as it streams in
+            print("\n🤖 Agent: ", end="", flush=True)
+            for event, data in agent.stream_input(user_input):
+                if event == "token":
+                    print(data["text"], end="", flush=True)
+                elif event == "tool" and data["status"] == "started":
+                    print(f"\n   🔧 {data['name']}...", flush=True)
+                elif event == "error":
+                    print(data["error"], end="")
+            print("\n")
         
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!")
             break
         except Exception as e:
             print(f"\n❌ Error: {str(e)}\n")
+    
+    agent.memory_manager.close()
+    close_http_client()
+    shutdown_shared_clinical_tools()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,225 @@
+"""
+Query Router for the Direct Tool Agent
+One Aho-Corasick automaton over intent keywords, patient names/IDs and medication names
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+from collections import deque
+import re
+import threading
+
+from clinical_tools import ClinicalTools, medication_names
+from drug_interactions import normalize_drug_name
+
+
+# ============================================================================
+# MULTI-PATTERN MATCHER
+# ============================================================================
+
+class PatternMatcher:
+    """Aho-Corasick automaton matching whole-word patterns in one pass
+
+    New patterns are batched: until MAX_PENDING of them are waiting, scans
+    check them directly (a substring search each) and the linked automaton is
+    left alone; past that, the batch is inserted into the trie and failure
+    links are recomputed in one BFS. A scan costs O(len(text) + matches) plus
+    at most MAX_PENDING substring searches. Payloads must be hashable.
+    """
+
+    MAX_PENDING = 32
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self._pending: Dict[Tuple[str, Any], None] = {}
+
+    def add(self, pattern: str, payload: Any) -> None:
+        """Add a pattern (case-insensitive); duplicate (pattern, payload) pairs are ignored"""
+        pattern = pattern.lower().strip()
+        if pattern and not self._linked_has(pattern, payload):
+            self._pending[(pattern, payload)] = None
+
+    def _linked_has(self, pattern: str, payload: Any) -> bool:
+        state = 0
+        for char in pattern:
+            state = self._goto[state].get(char)
+            if state is None:
+                return False
+        return (len(pattern), payload) in self._out[state]
+
+    def _insert(self, pattern: str, payload: Any) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+
+        # Only the node's own patterns are kept until the links are rebuilt
+        own = self._own_outputs(state, len(pattern))
+        if (len(pattern), payload) not in own:
+            own.append((len(pattern), payload))
+        self._out[state] = own
+
+    def _own_outputs(self, state: int, depth: int) -> List[Tuple[int, Any]]:
+        return [item for item in self._out[state] if item[0] == depth]
+
+    def _link(self) -> None:
+        """Insert the pending batch, then recompute failure links and merged outputs breadth-first"""
+        for pattern, payload in self._pending:
+            self._insert(pattern, payload)
+        self._pending.clear()
+
+        depth = [0] * len(self._goto)
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            depth[child] = 1
+            self._out[child] = self._own_outputs(child, 1)
+            queue.append(child)
+
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                depth[child] = depth[state] + 1
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._own_outputs(child, depth[child]) + self._out[self._fail[child]]
+                queue.append(child)
+
+    def scan(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Return (start, end, payload) for every whole-word match, in text order"""
+        if len(self._pending) > self.MAX_PENDING:
+            self._link()
+
+        text = text.lower()
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, payload in self._out[state]:
+                start = index - length + 1
+                end = index + 1
+                if self._whole_word(text, start, end):
+                    matches.append((start, end, payload))
+
+        if self._pending:
+            for pattern, payload in self._pending:
+                start = text.find(pattern)
+                while start != -1:
+                    end = start + len(pattern)
+                    if self._whole_word(text, start, end):
+                        matches.append((start, end, payload))
+                    start = text.find(pattern, start + 1)
+            # Same order as the automaton: by end, longer matches first
+            matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    @staticmethod
+    def _whole_word(text: str, start: int, end: int) -> bool:
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+# ============================================================================
+# QUERY ROUTER
+# ============================================================================
+
+class QueryRouter:
+    """Extracts intents, the patient and medications from a query in one scan
+
+    Built from the patients and medications in ClinicalTools and kept current
+    through its change notifications.
+    """
+
+    INTENT_KEYWORDS = {
+        "interactions": ["interaction", "interactions", "interact", "drug", "drugs"],
+        "search": ["search", "find", "list", "show"]
+    }
+
+    # Fallback for IDs of patients the repository does not know
+    PATIENT_ID_PATTERN = re.compile(r'\b(P[T-]?\d+)\b', re.IGNORECASE)
+
+    def __init__(self, clinical: ClinicalTools):
+        self.clinical = clinical
+        self.matcher = PatternMatcher()
+        self._lock = threading.Lock()
+
+        for intent, keywords in self.INTENT_KEYWORDS.items():
+            for keyword in keywords:
+                self.matcher.add(keyword, ("intent", intent))
+        for patient in clinical.patients:
+            self._add_patient(patient)
+        for medication in clinical.known_medications():
+            self._add_medication(medication)
+
+        clinical.subscribe(self._on_change)
+
+    def _add_patient(self, patient: Dict[str, Any]) -> None:
+        patient_id = patient['patient_id']
+        self.matcher.add(patient_id, ("patient_id", patient_id))
+        self.matcher.add(patient['first_name'], ("patient_name", patient_id))
+        self.matcher.add(patient['last_name'], ("patient_name", patient_id))
+
+    def _add_medication(self, name: str) -> None:
+        # Synonyms and brand names all route to the canonical drug; prescribed
+        # names carry a strength ("Zolpidem 10mg"), so the bare name is matched
+        self.matcher.add(normalize_drug_name(name), ("medication", self.clinical.interactions.canonical(name)))
+
+    def _on_change(self, event: str, entity: Dict[str, Any]) -> None:
+        with self._lock:
+            if event == "patient_registered":
+                self._add_patient(entity)
+            elif event == "medical_record_added":
+                for medication in medication_names(entity):
+                    self._add_medication(medication)
+
+    def route(self, text: str) -> Dict[str, Any]:
+        """
+        Route a query
+        Returns {"intents": set, "patient_id": str | None, "medications": [names in order]}
+        """
+        with self._lock:
+            matches = self.matcher.scan(text)
+
+        intents: Set[str] = set()
+        patient_ids: List[str] = []
+        name_hits: Dict[str, Set[str]] = {}
+        medications: List[str] = []
+        for start, end, (kind, value) in matches:
+            if kind == "intent":
+                intents.add(value)
+            elif kind == "patient_id":
+                patient_ids.append(value)
+            elif kind == "patient_name":
+                name_hits.setdefault(value, set()).add(text[start:end].lower())
+            elif kind == "medication" and value not in medications:
+                medications.append(value)
+
+        return {
+            "intents": intents,
+            "patient_id": patient_ids[0] if patient_ids else self._resolve_name(name_hits) or self._unknown_id(text),
+            "medications": medications
+        }
+
+    @staticmethod
+    def _resolve_name(name_hits: Dict[str, Set[str]]) -> Optional[str]:
+        """The patient matching the most distinct name words, if unambiguous"""
+        if not name_hits:
+            return None
+        ranked = sorted(name_hits.items(), key=lambda item: len(item[1]), reverse=True)
+        if len(ranked) > 1 and len(ranked[0][1]) == len(ranked[1][1]):
+            return None
+        return ranked[0][0]
+
+    def _unknown_id(self, text: str) -> Optional[str]:
+        match = self.PATIENT_ID_PATTERN.search(text)
+        return match.group(1).upper() if match else None
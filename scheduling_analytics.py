@@ -0,0 +1,275 @@
+"""
+Scheduling Analytics
+Doctor utilization, cancellation rates and booked revenue over a NumPy columnar mirror of the appointment book
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, timedelta
+import threading
+
+import numpy as np
+
+from clinical_entities import EPOCH
+from clinical_tools import ClinicalTools
+
+
+DAY_MICROSECONDS = 86400 * 1000000
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+EPOCH_DAY = EPOCH.date().toordinal()
+
+
+def _epoch_day(day: date) -> int:
+    return day.toordinal() - EPOCH_DAY
+
+
+def _day(epoch_day: int) -> date:
+    return date.fromordinal(epoch_day + EPOCH_DAY)
+
+
+class SchedulingAnalytics:
+    """
+    Group-by aggregates over appointments in vectorized passes
+
+    Appointments are mirrored into growable columns (start in epoch
+    microseconds, duration, doctor index, status code, fee) built once from
+    ClinicalTools and kept current through its "appointment_scheduled"/
+    "appointment_cancelled" notifications. Reports are cached per date range until the next write.
+    """
+
+    INITIAL_CAPACITY = 1024
+    CANCELLED = "cancelled"
+    MAX_CACHED_REPORTS = 32
+
+    def __init__(self, clinical: ClinicalTools, max_range_days: int = 366):
+        self.clinical = clinical
+        self.max_range_days = max_range_days
+        self._lock = threading.Lock()
+
+        # Doctor dimension: index -> ID / specialty index / bookable weekdays
+        self._doctor_index: Dict[str, int] = {}
+        self._doctor_ids: List[str] = []
+        self._doctor_names: List[str] = []
+        self._doctor_specialty: List[int] = []
+        self._doctor_weekdays: List[List[bool]] = []
+        self._specialties: List[str] = []
+        self._statuses: List[str] = []
+
+        # Appointment columns (the first _size rows are live)
+        self._size = 0
+        self._rows: Dict[str, int] = {}
+        self._start = np.empty(0, dtype=np.int64)
+        self._duration = np.empty(0, dtype=np.int32)
+        self._doctor = np.empty(0, dtype=np.int32)
+        self._status = np.empty(0, dtype=np.int16)
+        self._fee = np.empty(0, dtype=np.float64)
+
+        self._reports: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+        for doctor in clinical.doctors:
+            self._doctor_code(doctor['doctor_id'], doctor)
+
+        # Subscribe before the snapshot; events wait on the lock and are applied after it
+        clinical.subscribe(self._on_change)
+        with self._lock:
+            self._load(list(clinical.appointments))
+
+    # ------------------------------------------------------------------
+    # Columnar mirror
+    # ------------------------------------------------------------------
+
+    def _doctor_code(self, doctor_id: str, doctor: Optional[Dict[str, Any]] = None) -> int:
+        code = self._doctor_index.get(doctor_id)
+        if code is None:
+            doctor = doctor or {}
+            code = len(self._doctor_ids)
+            self._doctor_index[doctor_id] = code
+            self._doctor_ids.append(doctor_id)
+            self._doctor_names.append(doctor.get('name') or doctor_id)
+            specialty = doctor.get('specialty') or "Unknown"
+            if specialty not in self._specialties:
+                self._specialties.append(specialty)
+            self._doctor_specialty.append(self._specialties.index(specialty))
+            available = doctor.get('available_days') or []
+            self._doctor_weekdays.append([day in available for day in WEEKDAYS])
+        return code
+
+    def _status_code(self, status: str) -> int:
+        try:
+            return self._statuses.index(status)
+        except ValueError:
+            self._statuses.append(status)
+            return len(self._statuses) - 1
+
+    def _reserve(self, rows: int) -> None:
+        """Grow every column (doubling) to hold `rows` rows"""
+        capacity = len(self._start)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, self.INITIAL_CAPACITY)
+        for name in ("_start", "_duration", "_doctor", "_status", "_fee"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _load(self, appointments: List) -> None:
+        """Append a snapshot of appointments in one vectorized fill (caller holds the lock)"""
+        appointments = [a for a in appointments if a['appointment_id'] not in self._rows]
+        if not appointments:
+            return
+        count = len(appointments)
+        self._reserve(self._size + count)
+        rows = slice(self._size, self._size + count)
+        self._start[rows] = np.fromiter((a.start for a in appointments), dtype=np.int64, count=count)
+        self._duration[rows] = np.fromiter((a.duration for a in appointments), dtype=np.int32, count=count)
+        self._doctor[rows] = np.fromiter(
+            (self._doctor_code(a.doctor_id, a.doctor) for a in appointments), dtype=np.int32, count=count
+        )
+        self._status[rows] = np.fromiter((self._status_code(a.status) for a in appointments), dtype=np.int16, count=count)
+        self._fee[rows] = np.fromiter((a.consultation_fee or 0 for a in appointments), dtype=np.float64, count=count)
+        for offset, appointment in enumerate(appointments):
+            self._rows[appointment['appointment_id']] = self._size + offset
+        self._size += count
+        self._reports.clear()
+
+    def _on_change(self, event: str, entity: Any) -> None:
+        if event not in ("appointment_scheduled", "appointment_cancelled"):
+            return
+        with self._lock:
+            row = self._rows.get(entity['appointment_id'])
+            if row is None:
+                self._load([entity])
+            else:
+                self._status[row] = self._status_code(entity['status'])
+                self._reports.clear()
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+
+    def report(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Utilization, cancellations and booked revenue for appointments starting
+        between start_date and end_date inclusive (YYYY-MM-DD; default: the 30
+        days either side of today). Raises ValueError for a bad range or one
+        longer than max_range_days, whose per-day columns would grow unbounded.
+        """
+        today = date.today()
+        first = date.fromisoformat(start_date) if start_date else today - timedelta(days=30)
+        last = date.fromisoformat(end_date) if end_date else today + timedelta(days=30)
+        if last < first:
+            raise ValueError("end_date must not be before start_date")
+        if (last - first).days + 1 > self.max_range_days:
+            raise ValueError(f"Date range must not be longer than {self.max_range_days} days")
+        key = (_epoch_day(first), _epoch_day(last) + 1)
+
+        with self._lock:
+            report = self._reports.get(key)
+            if report is not None:
+                self.hits += 1
+                return report
+            self.misses += 1
+            report = self._compute(*key)
+            if len(self._reports) >= self.MAX_CACHED_REPORTS:
+                self._reports.clear()
+            self._reports[key] = report
+            return report
+
+    def _compute(self, first_day: int, end_day: int) -> Dict[str, Any]:
+        """All aggregates for [first_day, end_day) in epoch days (caller holds the lock)"""
+        size = self._size
+        start = self._start[:size]
+        rows = np.nonzero((start >= first_day * DAY_MICROSECONDS) & (start < end_day * DAY_MICROSECONDS))[0]
+        start = start[rows]
+        duration = self._duration[:size][rows]
+        doctor = self._doctor[:size][rows]
+        fee = self._fee[:size][rows]
+        cancelled = self._status[:size][rows] == self._status_code(self.CANCELLED)
+        booked = ~cancelled
+
+        doctors = len(self._doctor_ids)
+        specialty_of = np.array(self._doctor_specialty, dtype=np.int32)
+        specialty = specialty_of[doctor]
+        specialties = len(self._specialties)
+
+        # Utilization: booked minutes over bookable minutes on each doctor's working days
+        days = np.arange(first_day, end_day)
+        weekday = (days + EPOCH.weekday()) % 7
+        working_days = np.array(self._doctor_weekdays, dtype=bool).reshape(doctors, 7)[:, weekday].sum(axis=1)
+        open_minutes = working_days * (self.clinical.CLOSING_HOUR - self.clinical.OPENING_HOUR) * 60
+        booked_minutes = np.bincount(doctor, weights=duration * booked, minlength=doctors)
+        appointments_by_doctor = np.bincount(doctor, minlength=doctors)
+        cancelled_by_doctor = np.bincount(doctor, weights=cancelled, minlength=doctors)
+        revenue_by_doctor = np.bincount(doctor, weights=fee * booked, minlength=doctors)
+
+        # Revenue by day, by ISO week (Monday start) and by specialty
+        booked_fee = fee * booked
+        day_index = start // DAY_MICROSECONDS - first_day
+        revenue_by_day = np.bincount(day_index, weights=booked_fee, minlength=len(days))
+        booked_by_day = np.bincount(day_index, weights=booked, minlength=len(days))
+        first_monday = first_day - int(weekday[0])
+        week_index = (start // DAY_MICROSECONDS - first_monday) // 7
+        weeks = (end_day - 1 - first_monday) // 7 + 1
+        revenue_by_week = np.bincount(week_index, weights=booked_fee, minlength=weeks)
+        booked_by_week = np.bincount(week_index, weights=booked, minlength=weeks)
+        revenue_by_specialty = np.bincount(specialty, weights=booked_fee, minlength=specialties)
+        appointments_by_specialty = np.bincount(specialty, minlength=specialties)
+        cancelled_by_specialty = np.bincount(specialty, weights=cancelled, minlength=specialties)
+
+        def rate(part, whole) -> float:
+            return round(float(part) / whole, 4) if whole else 0.0
+
+        return {
+            "start_date": _day(first_day).isoformat(),
+            "end_date": _day(end_day - 1).isoformat(),
+            "appointments": int(len(rows)),
+            "booked": int(booked.sum()),
+            "cancelled": int(cancelled.sum()),
+            "cancellation_rate": rate(cancelled.sum(), len(rows)),
+            "booked_revenue": round(float(booked_fee.sum()), 2),
+            "utilization": [
+                {
+                    "doctor_id": self._doctor_ids[i],
+                    "doctor_name": self._doctor_names[i],
+                    "specialty": self._specialties[self._doctor_specialty[i]],
+                    "booked_minutes": int(booked_minutes[i]),
+                    "open_minutes": int(open_minutes[i]),
+                    "utilization": rate(booked_minutes[i], open_minutes[i]),
+                    "appointments": int(appointments_by_doctor[i]),
+                    "cancellation_rate": rate(cancelled_by_doctor[i], appointments_by_doctor[i]),
+                    "booked_revenue": round(float(revenue_by_doctor[i]), 2)
+                }
+                for i in range(doctors)
+            ],
+            "by_specialty": [
+                {
+                    "specialty": self._specialties[i],
+                    "appointments": int(appointments_by_specialty[i]),
+                    "cancellation_rate": rate(cancelled_by_specialty[i], appointments_by_specialty[i]),
+                    "booked_revenue": round(float(revenue_by_specialty[i]), 2)
+                }
+                for i in range(specialties)
+            ],
+            "revenue_by_day": [
+                {"date": _day(first_day + i).isoformat(), "booked": int(booked_by_day[i]), "revenue": round(float(revenue_by_day[i]), 2)}
+                for i in range(len(days))
+            ],
+            "revenue_by_week": [
+                {"week_start": _day(first_monday + 7 * i).isoformat(), "booked": int(booked_by_week[i]), "revenue": round(float(revenue_by_week[i]), 2)}
+                for i in range(weeks)
+            ]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "appointments": self._size,
+                "cached_reports": len(self._reports),
+                "hits": self.hits,
+                "misses": self.misses
+            }
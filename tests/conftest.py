@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Modules create runtime state (.agent_actions, .audit_logs) relative to the
+# working directory on import, so the suite runs from a scratch directory
+os.environ["SAFETY_AUDIT_DIR"] = ""
+os.chdir(tempfile.mkdtemp(prefix="clinical-tests-"))
@@ -0,0 +1,97 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from action_log import ActionLog
+
+
+def _append_actions(storage_dir: str, worker: int, count: int) -> None:
+    log = ActionLog(storage_dir)
+    for i in range(count):
+        log.append(f"PT00000{i % 3}", {"worker": worker, "i": i, "timestamp": f"{worker}-{i:04d}"})
+
+
+def test_concurrent_thread_appends_are_all_kept(tmp_path):
+    log = ActionLog(str(tmp_path))
+    threads = [threading.Thread(target=_append_actions, args=(str(tmp_path), worker, 60)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(log.count(p) for p in log.list_patients()) == 240
+    summary = log.summary()
+    assert summary["total_actions"] == 240
+    assert summary["total_patients"] == 3
+
+
+def test_concurrent_process_appends_are_all_kept(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_append_actions, args=(str(tmp_path), worker, 40)) for worker in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    log = ActionLog(str(tmp_path))
+    assert log.summary()["total_actions"] == 120
+    assert {p: log.patient_action_count(p) for p in log.list_patients()} == {p: log.count(p) for p in log.list_patients()}
+
+
+def test_journal_is_seeded_once_from_existing_logs(tmp_path):
+    _append_actions(str(tmp_path), 0, 6)
+    log = ActionLog(str(tmp_path))
+    log.get_activity_file().unlink()
+
+    fresh = ActionLog(str(tmp_path))
+    fresh.append("PT000009", {"timestamp": "9"})
+    assert fresh.summary()["total_actions"] == 7
+    assert fresh.summary()["recent_patients"][0] == "PT000009"
+
+
+def test_journal_compaction_keeps_totals(tmp_path, monkeypatch):
+    monkeypatch.setattr(ActionLog, "COMPACT_MIN_LINES", 10)
+    monkeypatch.setattr(ActionLog, "COMPACT_CHECK_EVERY", 5)
+    log = ActionLog(str(tmp_path))
+    _append_actions(str(tmp_path), 0, 50)
+    other = ActionLog(str(tmp_path))
+    other.summary()
+
+    for i in range(30):
+        log.append("PT000001", {"i": i, "timestamp": f"z{i}"})
+    assert sum(1 for _ in open(log.get_activity_file())) < 30
+    assert log.summary()["total_actions"] == 80
+    # Another instance notices the journal was replaced and refolds it
+    assert other.summary() == log.summary()
+    assert other.summary()["recent_patients"][0] == "PT000001"
+
+def test_torn_tail_is_dropped_by_the_next_append(tmp_path):
+    log = ActionLog(str(tmp_path))
+    log.append("PT000001", {"i": 0})
+    with open(log.get_log_file("PT000001"), "ab") as f:
+        f.write(b'{"i": 1, "tor')
+
+    assert log.read_page("PT000001")["actions"] == [{"i": 0}]
+    log.append("PT000001", {"i": 2})
+    assert log.read_page("PT000001")["actions"] == [{"i": 0}, {"i": 2}]
+
+
+def test_pages_walk_backwards_and_reject_bad_cursors(tmp_path):
+    log = ActionLog(str(tmp_path))
+    for i in range(5):
+        log.append("PT000001", {"i": i})
+
+    page = log.read_page("PT000001", limit=2)
+    assert [a["i"] for a in page["actions"]] == [3, 4]
+    page = log.read_page("PT000001", limit=2, cursor=page["next_cursor"])
+    assert [a["i"] for a in page["actions"]] == [1, 2]
+    page = log.read_page("PT000001", limit=2, cursor=page["next_cursor"])
+    assert [a["i"] for a in page["actions"]] == [0]
+    assert page["next_cursor"] is None
+
+    with pytest.raises(ValueError):
+        log.read_page("PT000001", cursor=3)
+    with pytest.raises(ValueError):
+        log.read_page("PT000001", cursor=10 ** 6)
@@ -0,0 +1,427 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import api_server
+from action_log import ActionLog
+from api_server import AgentBusyError, AgentRunner, SingleFlight
+from clinical_tools import ClinicalTools, shutdown_shared_clinical_tools
+from llm_cache import LLMResponseCache
+
+
+# ----------------------------------------------------------------------------
+# AgentRunner backpressure
+# ----------------------------------------------------------------------------
+
+def test_runner_bounds_concurrency():
+    runner = AgentRunner(max_concurrency=2, queue_limit=10, queue_timeout=5)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(runner.run(work) for _ in range(6)))
+
+    asyncio.run(run())
+    runner.shutdown()
+    assert peak[0] == 2
+    assert runner.stats()["in_flight"] == 0
+
+
+def test_runner_rejects_when_the_queue_is_full():
+    runner = AgentRunner(max_concurrency=1, queue_limit=1, queue_timeout=5)
+    release = threading.Event()
+
+    async def run():
+        busy = asyncio.ensure_future(runner.run(release.wait))
+        queued = asyncio.ensure_future(runner.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(AgentBusyError):
+            await runner.run(lambda: "rejected")
+        release.set()
+        return await busy, await queued
+
+    assert asyncio.run(run()) == (True, "queued")
+    runner.shutdown()
+    assert runner.stats()["rejected"] == 1
+
+
+def test_runner_gives_up_after_the_queue_timeout():
+    runner = AgentRunner(max_concurrency=1, queue_limit=5, queue_timeout=0.05)
+    release = threading.Event()
+
+    async def run():
+        busy = asyncio.ensure_future(runner.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AgentBusyError):
+            await runner.run(lambda: None)
+        release.set()
+        await busy
+
+    asyncio.run(run())
+    runner.shutdown()
+    assert runner.stats() == {"max_concurrency": 1, "in_flight": 0, "waiting": 0, "queue_limit": 5, "rejected": 1}
+
+
+# ----------------------------------------------------------------------------
+# SingleFlight
+# ----------------------------------------------------------------------------
+
+def test_single_flight_coalesces_identical_calls():
+    flights = SingleFlight()
+    calls = []
+
+    async def load(patient_id):
+        calls.append(patient_id)
+        await asyncio.sleep(0.02)
+        return {"patient_id": patient_id}
+
+    async def run():
+        return await asyncio.gather(
+            flights.run(("history", "PT1"), load, "PT1"),
+            flights.run(("history", "PT1"), load, "PT1"),
+            flights.run(("history", "PT2"), load, "PT2")
+        )
+
+    results = asyncio.run(run())
+    assert results == [{"patient_id": "PT1"}, {"patient_id": "PT1"}, {"patient_id": "PT2"}]
+    assert calls == ["PT1", "PT2"]
+    assert flights.stats() == {"in_flight": 0, "started": 2, "coalesced": 1, "invalidated": 0}
+
+
+def test_single_flight_runs_sync_functions_off_the_loop_and_shares_errors():
+    flights = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.02)
+        raise LookupError("missing")
+
+    async def run():
+        return await asyncio.gather(
+            flights.run(("history", "PT1"), fail),
+            flights.run(("history", "PT1"), fail),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, LookupError) for result in results)
+    assert len(calls) == 1 and calls[0] != threading.main_thread().name
+
+
+def test_single_flight_invalidation_starts_a_fresh_call():
+    flights = SingleFlight()
+    versions = iter(["old", "new"])
+
+    async def load():
+        version = next(versions)
+        await asyncio.sleep(0.02)
+        return version
+
+    async def run():
+        first = asyncio.ensure_future(flights.run(("history", "PT1", "x"), load))
+        await asyncio.sleep(0)
+        flights.invalidate("history", "PT1")
+        second = await flights.run(("history", "PT1", "x"), load)
+        return await first, second
+
+    assert asyncio.run(run()) == ("old", "new")
+    assert flights.stats()["invalidated"] == 1
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    flights = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        impatient = asyncio.ensure_future(flights.run(("history", "PT1"), load))
+        patient = asyncio.ensure_future(flights.run(("history", "PT1"), load))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == "done"
+
+
+# ----------------------------------------------------------------------------
+# Agent endpoints
+# ----------------------------------------------------------------------------
+
+class FakeAgent:
+    def __init__(self, fail: bool = False, delay: float = 0):
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, input_data):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {"output": f"answer to {input_data['input']}"}
+
+    def stream(self, input_data):
+        self.calls += 1
+        yield "tool", {"name": "search_patients", "status": "finished"}
+        if self.fail:
+            raise RuntimeError("upstream down")
+        yield "token", {"text": "answer"}
+        yield "output", {"output": "answer"}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    runner = AgentRunner(max_concurrency=1, queue_limit=2, queue_timeout=0.1)
+    agent = FakeAgent()
+    turns = []
+    monkeypatch.setattr(api_server, "agent_runner", runner)
+    monkeypatch.setattr(api_server, "get_agent", lambda: agent)
+    monkeypatch.setattr(api_server, "persist_turn", lambda *turn: turns.append(turn) or {"type": "ai", "content": turn[2]})
+    yield runner, agent, turns
+    runner.shutdown()
+
+
+def post_queries(*queries):
+    """POST several agent queries concurrently through the ASGI app"""
+    async def run():
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await asyncio.gather(*(client.post("/api/agent/query", json=query) for query in queries))
+
+    return asyncio.run(run())
+
+
+def test_query_runs_on_the_agent_pool_and_persists_the_turn(api):
+    runner, agent, turns = api
+    (response,) = post_queries({"patient_id": "PT000001", "question": "hi"})
+
+    assert response.status_code == 200
+    assert response.json()["response"] == "answer to Patient PT000001: hi"
+    assert turns == [("PT000001", "hi", "answer to Patient PT000001: hi")]
+    assert runner.stats()["in_flight"] == 0
+
+
+def test_queries_beyond_the_queue_get_503(api):
+    runner, agent, _ = api
+    agent.delay = 0.3
+    responses = post_queries(*({"patient_id": "PT000001", "question": f"q{i}"} for i in range(3)))
+
+    # One runs, the others wait past the 0.1s queue timeout
+    assert sorted(r.status_code for r in responses) == [200, 503, 503]
+    assert all(r.headers["Retry-After"] == "5" for r in responses if r.status_code == 503)
+    assert agent.calls == 1
+
+
+def test_identical_concurrent_queries_share_one_agent_run(api):
+    runner, agent, turns = api
+    agent.delay = 0.1
+    responses = post_queries(*({"patient_id": "PT000001", "question": "same"} for _ in range(3)))
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert len({r.json()["response"] for r in responses}) == 1
+    assert agent.calls == 1
+    assert len(turns) == 1
+
+
+def sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_events_and_frees_the_slot(api):
+    runner, agent, turns = api
+    response = TestClient(api_server.app).post("/api/agent/query/stream", json={"patient_id": "PT000001", "question": "hi"})
+
+    assert response.status_code == 200
+    assert [event for event, _ in sse_events(response.text)] == ["start", "tool", "token", "done"]
+    assert turns == [("PT000001", "hi", "answer")]
+    assert runner.stats()["in_flight"] == 0
+
+
+def test_stream_reports_agent_errors_and_frees_the_slot(api):
+    runner, agent, turns = api
+    agent.fail = True
+    response = TestClient(api_server.app).post("/api/agent/query/stream", json={"patient_id": "PT000001", "question": "hi"})
+
+    events = sse_events(response.text)
+    assert events[-1] == ("error", {"error": "upstream down"})
+    assert turns == []
+    assert runner.stats()["in_flight"] == 0
+
+
+def test_stream_is_rejected_up_front_when_the_queue_is_full(api, monkeypatch):
+    runner, agent, _ = api
+    monkeypatch.setattr(runner, "queue_limit", 0)
+    asyncio.run(runner.acquire())  # hold the only slot
+    response = TestClient(api_server.app).post("/api/agent/query/stream", json={"patient_id": "PT000001", "question": "hi"})
+    runner.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert agent.calls == 0
+
+
+def test_stream_waiting_too_long_for_a_slot_gets_an_error_event(api):
+    runner, agent, _ = api
+    asyncio.run(runner.acquire())  # hold the only slot
+    response = TestClient(api_server.app).post("/api/agent/query/stream", json={"patient_id": "PT000001", "question": "hi"})
+    runner.release()
+
+    assert response.status_code == 200
+    event, data = sse_events(response.text)[0]
+    assert event == "error" and data["retry_after"] == 5
+    assert agent.calls == 0
+    assert runner.stats()["in_flight"] == 0
+
+
+# ----------------------------------------------------------------------------
+# Panel screening
+# ----------------------------------------------------------------------------
+
+def test_panel_screening_streams_ndjson(monkeypatch):
+    clinical = ClinicalTools()
+    clinical.add_medical_record("PT000001", None, "Review", [], [{"name": "warfarin"}, {"name": "aspirin"}], "")
+    clinical.add_medical_record("PT000002", None, "Review", [], [{"name": "levothyroxine"}, {"name": "omeprazole"}], "")
+    monkeypatch.setitem(api_server.app.dependency_overrides, api_server.get_clinical, lambda: clinical)
+
+    response = TestClient(api_server.app).get("/api/medications/panel-screening", params={"severity": ["High", "Moderate"]})
+    clinical.close()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines] == ["summary", "interaction"]
+    assert lines[0]["interactions_found"] == 1
+    assert (lines[1]["patient_id"], lines[1]["severity"]) == ("PT000001", "High")
+
+
+# ----------------------------------------------------------------------------
+# Agent actions
+# ----------------------------------------------------------------------------
+
+def test_actions_are_logged_and_paged(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_server, "action_store", ActionLog(str(tmp_path)))
+    client = TestClient(api_server.app)
+    for action_type in ("sms", "call", "escalation"):
+        response = client.post("/api/agent/actions", json={"patient_id": "PT000001", "action_type": action_type, "details": {}})
+        assert response.status_code == 200
+
+    page = client.get("/api/agent/actions/PT000001", params={"limit": 2}).json()
+    assert [action["action_type"] for action in page["actions"]] == ["call", "escalation"]
+    assert page["total"] == 3
+    older = client.get("/api/agent/actions/PT000001", params={"limit": 2, "cursor": page["next_cursor"]}).json()
+    assert [action["action_type"] for action in older["actions"]] == ["sms"]
+    assert client.get("/api/agent/actions/PT000001", params={"cursor": 5}).status_code == 400
+
+
+def test_dashboard_summary_counts_logged_actions(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_server, "action_store", ActionLog(str(tmp_path)))
+    client = TestClient(api_server.app)
+    for patient_id in ("PT000001", "PT000002", "PT000001"):
+        client.post("/api/agent/actions", json={"patient_id": patient_id, "action_type": "sms", "details": {}})
+
+    summary = client.get("/api/dashboard/summary").json()
+    assert (summary["total_patients"], summary["total_actions"]) == (2, 3)
+    assert summary["recent_patients"] == ["PT000001", "PT000002"]
+
+
+# ----------------------------------------------------------------------------
+# Scheduling analytics
+# ----------------------------------------------------------------------------
+
+def test_scheduling_analytics_uses_the_injected_repository(monkeypatch):
+    clinical = ClinicalTools()
+    doctor = clinical.doctors[0]
+    day = date.today() + timedelta(days=1)
+    while day.strftime("%A") not in doctor["available_days"]:
+        day += timedelta(days=1)
+    assert clinical.schedule_appointment("PT000001", doctor["doctor_id"], day.isoformat(), "09:00", "Checkup")["success"]
+    monkeypatch.setitem(api_server.app.dependency_overrides, api_server.get_clinical, lambda: clinical)
+    monkeypatch.setattr(api_server, "_analytics", None)
+
+    client = TestClient(api_server.app)
+    response = client.get("/api/analytics/scheduling", params={"start_date": day.isoformat(), "end_date": day.isoformat()})
+    clinical.close()
+
+    assert response.status_code == 200
+    assert response.json()["appointments"] == 1
+    assert api_server._analytics.clinical is clinical
+    assert client.get("/api/analytics/scheduling", params={"start_date": "2026-02-01", "end_date": "2026-01-01"}).status_code == 400
+
+
+def test_scheduling_analytics_rejects_long_ranges(monkeypatch):
+    monkeypatch.setenv("SCHEDULING_ANALYTICS_MAX_DAYS", "31")
+    monkeypatch.setattr(api_server, "_analytics", None)
+    clinical = ClinicalTools()
+    monkeypatch.setitem(api_server.app.dependency_overrides, api_server.get_clinical, lambda: clinical)
+
+    response = TestClient(api_server.app).get("/api/analytics/scheduling", params={"start_date": "2026-01-01", "end_date": "2026-02-01"})
+    clinical.close()
+
+    assert response.status_code == 400
+    assert "31 days" in response.json()["detail"]
+
+# ----------------------------------------------------------------------------
+# Readiness
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def startup(tmp_path, monkeypatch):
+    """Fresh readiness state, with the agent and stores replaced by cheap fakes"""
+    cache = LLMResponseCache(str(tmp_path / "responses.db"))
+    monkeypatch.setattr(api_server, "_ready", threading.Event())
+    monkeypatch.setattr(api_server, "_startup_error", None)
+    monkeypatch.setattr(api_server, "startup_timings", {})
+    monkeypatch.setattr(api_server, "_analytics", None)
+    monkeypatch.setattr(api_server, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(api_server, "get_conversation_store", lambda: None)
+    monkeypatch.setattr(api_server, "get_agent", FakeAgent)
+    yield TestClient(api_server.app)
+    cache.close()
+    shutdown_shared_clinical_tools()
+
+
+def test_ready_is_503_until_services_are_initialized(startup):
+    response = startup.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "initializing"
+    assert startup.get("/health").status_code == 200
+
+    api_server.initialize_services()
+
+    response = startup.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert set(response.json()["startup"]) >= {"clinical_repository_seconds", "agent_seconds", "initialize_seconds"}
+
+
+def test_ready_reports_a_failed_startup(startup, monkeypatch):
+    def broken_agent():
+        raise RuntimeError("no API key")
+
+    monkeypatch.setattr(api_server, "get_agent", broken_agent)
+    api_server.initialize_services()
+
+    response = startup.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+    assert response.json()["error"] == "agent: no API key"
+
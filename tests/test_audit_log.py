@@ -0,0 +1,107 @@
+import gzip
+import json
+import threading
+
+from audit_log import SafetyAuditLog
+
+
+def written_entries(audit_dir):
+    """Every entry on disk: rotated archives and the active file"""
+    entries = []
+    for path in sorted(audit_dir.iterdir()):
+        if path.name.endswith(".jsonl.gz"):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f)
+        elif path.name == SafetyAuditLog.ACTIVE_FILE:
+            with open(path, encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f)
+    return entries
+
+
+def test_recent_is_a_bounded_ring_buffer():
+    log = SafetyAuditLog(audit_dir=None, capacity=5)
+    for i in range(12):
+        log.record({"i": i})
+
+    assert len(log) == 5
+    assert [e["i"] for e in log.recent(3)] == [9, 10, 11]
+    assert [e["i"] for e in log.recent(50)] == [7, 8, 9, 10, 11]
+    assert log.recent(0) == []
+    assert log.stats()["recorded"] == 12
+
+
+def test_close_writes_everything_pending(tmp_path):
+    log = SafetyAuditLog(str(tmp_path), flush_interval=60)
+    for i in range(10):
+        log.record({"i": i})
+    log.close()
+
+    assert [e["i"] for e in written_entries(tmp_path)] == list(range(10))
+    assert log.stats()["written"] == 10
+    assert log.stats()["pending"] == 0
+
+
+def test_active_file_rotates_into_compressed_archives(tmp_path):
+    log = SafetyAuditLog(str(tmp_path), flush_interval=60, batch_size=10 ** 6, max_file_bytes=2000)
+    for batch in range(10):
+        for i in range(20):
+            log.record({"batch": batch, "i": i, "pad": "x" * 20})
+        log.flush()
+    log.close()
+
+    archives = list(tmp_path.glob("audit-*.jsonl.gz"))
+    assert archives
+    assert [(e["batch"], e["i"]) for e in written_entries(tmp_path)] == [(b, i) for b in range(10) for i in range(20)]
+
+
+def test_logs_sharing_a_directory_lose_nothing_across_rotations(tmp_path):
+    logs = [SafetyAuditLog(str(tmp_path), flush_interval=0.01, batch_size=25, max_file_bytes=4000) for _ in range(3)]
+
+    def record(log, writer):
+        for i in range(400):
+            log.record({"writer": writer, "i": i})
+
+    threads = [threading.Thread(target=record, args=(log, writer)) for writer, log in enumerate(logs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for log in logs:
+        log.close()
+
+    entries = written_entries(tmp_path)
+    assert len(entries) == 1200
+    assert len({(e["writer"], e["i"]) for e in entries}) == 1200
+
+
+def test_backlog_is_capped_while_writes_fail(tmp_path):
+    blocked = tmp_path / "not-a-directory"
+    blocked.write_text("")
+    log = SafetyAuditLog(str(blocked), flush_interval=60, batch_size=10 ** 6, max_pending=50)
+
+    for i in range(40):
+        log.record({"i": i})
+    log.flush()
+    for i in range(40, 200):
+        log.record({"i": i})
+
+    stats = log.stats()
+    assert stats["pending"] == 50
+    assert stats["dropped"] == 150
+    assert stats["written"] == 0
+    assert stats["in_memory"] == 200
+    log.close()
+
+
+def test_reopen_after_close_writes_again(tmp_path):
+    log = SafetyAuditLog(str(tmp_path), flush_interval=60)
+    log.record({"i": 0})
+    log.close()
+    log.record({"i": 1})  # closed: kept in memory only
+
+    log.reopen()
+    log.record({"i": 2})
+    log.close()
+
+    assert [e["i"] for e in written_entries(tmp_path)] == [0, 2]
+    assert [e["i"] for e in log.recent()] == [0, 1, 2]
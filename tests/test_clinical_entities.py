@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+
+from clinical_entities import Appointment, MedicalRecord, from_epoch, to_epoch
+
+
+PATIENT = {"patient_id": "PT000001", "first_name": "John", "last_name": "Smith"}
+DOCTOR = {"doctor_id": "DR001", "name": "Dr. Sarah Williams", "consultation_fee": 150}
+
+
+def test_epoch_round_trips_full_precision():
+    for value in (datetime(2026, 3, 4, 5, 6, 7, 123456), datetime(1969, 12, 31, 23, 59, 59, 1), datetime(2026, 1, 1)):
+        assert from_epoch(to_epoch(value)) == value
+
+
+def test_same_second_timestamps_keep_their_order():
+    earlier = to_epoch("2026-05-01T10:00:00.100000")
+    later = to_epoch("2026-05-01T10:00:00.900000")
+    assert earlier < later
+    assert to_epoch(None) is None
+
+
+def test_appointment_reads_like_the_dict_it_replaces():
+    appointment = Appointment("APT1", PATIENT, DOCTOR, datetime(2026, 5, 1, 9, 30), 30, "Checkup", "Consultation")
+
+    assert not hasattr(appointment, "__dict__")
+    assert appointment["patient_name"] == "John Smith"
+    assert appointment.get("consultation_fee") == 150
+    assert appointment.get("cancelled_at", "n/a") == "n/a"
+    assert "cancelled_at" not in appointment and "status" in appointment
+    assert dict(appointment.items()) == appointment.to_dict()
+    with pytest.raises(KeyError):
+        appointment["start"]
+
+
+def test_appointment_cancellation_fields_appear_once_set():
+    appointment = Appointment("APT1", PATIENT, DOCTOR, datetime(2026, 5, 1, 9, 30), 30, "Checkup", "Consultation")
+    appointment["status"] = "cancelled"
+    appointment["cancellation_reason"] = "Sick"
+    appointment["cancelled_at"] = "2026-04-30T08:00:00"
+
+    assert appointment.to_dict()["cancelled_at"] == "2026-04-30T08:00:00"
+    assert "cancellation_reason" in appointment
+    with pytest.raises(KeyError):
+        appointment["appointment_time"] = "2026-05-02T09:30:00"
+
+
+def test_legacy_dicts_round_trip():
+    appointment = {
+        "appointment_id": "APT1", "patient_id": "PT000009", "patient_name": "Ghost Patient",
+        "doctor_id": "DR001", "doctor_name": "Dr. Sarah Williams", "appointment_time": "2026-05-01T09:30:00",
+        "duration": 45, "reason": "Checkup", "type": "Consultation", "status": "cancelled",
+        "consultation_fee": 150, "created_at": "2026-04-01T12:00:00.250000",
+        "cancellation_reason": "Moved", "cancelled_at": "2026-04-02T08:00:00"
+    }
+    record = {
+        "record_id": "MR1", "patient_id": "PT000001", "appointment_id": "APT1", "date": "2026-05-01T10:00:00",
+        "diagnosis": "Flu", "symptoms": ["fever"], "prescribed_medications": [{"name": "Tylenol"}],
+        "notes": "Rest", "follow_up_required": True, "follow_up_date": "2026-05-08",
+        "created_by": "DR001", "created_at": "2026-05-01T10:05:00"
+    }
+
+    assert Appointment.from_dict(appointment).to_dict() == appointment
+    assert MedicalRecord.from_dict(record).to_dict() == record
@@ -0,0 +1,507 @@
+import json
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from clinical_entities import Appointment, MedicalRecord
+from clinical_tools import (
+    AppointmentCalendar,
+    ClinicalTools,
+    PatientHistory,
+    SafetyValidator,
+    get_clinical_tools,
+    get_shared_clinical_tools,
+    set_shared_clinical_tools,
+    shutdown_shared_clinical_tools
+)
+
+
+@pytest.fixture
+def clinical():
+    clinical = ClinicalTools()
+    yield clinical
+    clinical.close()
+
+
+def working_days(doctor, count, start=None):
+    """The next `count` days (ISO dates) the doctor works, from tomorrow"""
+    days = []
+    day = start or date.today() + timedelta(days=1)
+    while len(days) < count:
+        if day.strftime("%A") in doctor["available_days"]:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def book(clinical, day, time, doctor_id="DR001", patient_id="PT000001", **kwargs):
+    result = clinical.schedule_appointment(patient_id, doctor_id, day, time, "Checkup", **kwargs)
+    assert result["success"], result
+    return result["appointment_id"]
+
+
+# ----------------------------------------------------------------------------
+# Shared repository
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def shared():
+    set_shared_clinical_tools(None)
+    yield
+    shutdown_shared_clinical_tools()
+
+
+def test_shared_instance_is_created_once(shared):
+    instances = []
+    barrier = threading.Barrier(8)
+
+    def get():
+        barrier.wait()
+        instances.append(get_shared_clinical_tools())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(instance) for instance in instances}) == 1
+    assert get_clinical_tools()["search_patients"].__self__ is instances[0]
+
+
+def test_state_persists_across_tool_lookups(shared):
+    register = get_clinical_tools()["register_new_patient"]
+    result = register("Ada", "Lovelace", "1815-12-10", "Female", "555-555-0100", "ada@example.com", "1 St James Sq")
+    assert result["success"]
+
+    found = get_clinical_tools()["search_patients"](last_name="lovelace")
+    assert [p["patient_id"] for p in found] == [result["patient_id"]]
+
+
+def test_injected_instance_is_shared(shared, clinical):
+    set_shared_clinical_tools(clinical)
+    assert get_shared_clinical_tools() is clinical
+    assert get_clinical_tools()["search_doctors"].__self__ is clinical
+
+
+def test_shutdown_closes_and_resets_the_shared_instance(shared):
+    first = get_shared_clinical_tools()
+    shutdown_shared_clinical_tools()
+
+    assert not first.ready
+    assert get_shared_clinical_tools() is not first
+    shutdown_shared_clinical_tools()
+
+
+# ----------------------------------------------------------------------------
+# Primary-key indexes
+# ----------------------------------------------------------------------------
+
+def test_lookups_by_id(clinical):
+    assert clinical.get_patient_details("PT000002")["last_name"] == "Garcia"
+    assert clinical.get_patient_details("PT999999") is None
+    assert "error" in clinical.get_patient_details("bogus")
+    assert [d["name"] for d in clinical.search_doctors(doctor_id="DR002")] == ["Dr. Michael Chen"]
+    assert clinical.search_doctors(doctor_id="DR999") == []
+    assert clinical.search_doctors(doctor_id="DR002", specialty="pediatrics") == []
+
+
+def test_writes_keep_the_indexes_current(clinical):
+    registered = clinical.register_new_patient(
+        "Grace", "Hopper", "1906-12-09", "Female", "555-555-0199", "grace@example.com", "Arlington"
+    )
+    patient_id = registered["patient_id"]
+    assert clinical.get_patient_details(patient_id)["first_name"] == "Grace"
+
+    appointment_id = book(clinical, working_days(clinical.doctors[0], 1)[0], "10:00", patient_id=patient_id)
+    record = clinical.add_medical_record(patient_id, appointment_id, "Flu", ["fever"], [], "Rest")
+    assert record["success"]
+    assert clinical._records_by_id[record["record_id"]]["diagnosis"] == "Flu"
+
+    assert clinical.add_medical_record(patient_id, "APT999999", "Flu", [], [], "")["error"] == "Invalid appointment ID"
+    assert clinical.cancel_appointment("APT999999")["success"] is False
+    assert clinical.cancel_appointment(appointment_id)["success"]
+    assert clinical.get_appointments(patient_id=patient_id)[0]["status"] == "cancelled"
+
+
+def test_warm_up_rebuilds_indexes_after_close(clinical):
+    appointment_id = book(clinical, working_days(clinical.doctors[0], 1)[0], "11:00")
+    clinical.close()
+
+    assert clinical.warm_up()["appointments"] == 1
+    assert clinical.ready
+    assert clinical._appointments_by_id[appointment_id] is clinical.appointments[0]
+    assert clinical.get_patient_details("PT000001")["first_name"] == "John"
+
+
+def test_warm_up_after_close_reopens_the_audit_log(tmp_path, monkeypatch):
+    monkeypatch.setenv("SAFETY_AUDIT_DIR", str(tmp_path))
+    clinical = ClinicalTools()
+    clinical.close()
+    clinical.warm_up()
+    clinical.search_patients(last_name="Smith")
+    clinical.close()
+
+    with open(tmp_path / "audit.jsonl", encoding="utf-8") as f:
+        operations = [json.loads(line)["operation"] for line in f]
+    assert operations == ["warm_up", "search_patients"]
+
+
+# ----------------------------------------------------------------------------
+# Patient search
+# ----------------------------------------------------------------------------
+
+def test_search_by_each_criterion(clinical):
+    ids = lambda results: [p["patient_id"] for p in results]
+
+    assert ids(clinical.search_patients(last_name="SMI")) == ["PT000001"]
+    assert ids(clinical.search_patients(first_name="r")) == ["PT000002", "PT000003"]
+    assert ids(clinical.search_patients(last_name="ohnso")) == ["PT000003"]
+    assert ids(clinical.search_patients(date_of_birth="1990-07-22")) == ["PT000002"]
+    assert ids(clinical.search_patients(phone="(555) 02")) == ["PT000002"]
+    assert ids(clinical.search_patients(patient_id="PT000003", last_name="john")) == ["PT000003"]
+    assert clinical.search_patients(first_name="maria", last_name="smith") == []
+    assert len(clinical.search_patients()) == len(clinical.patients)
+
+
+def test_search_keeps_registration_order(clinical):
+    for i, first_name in enumerate(["Zed", "Amy", "Bob"]):
+        assert clinical.register_new_patient(
+            first_name, "Walker", "2000-01-01", "Other", f"555-555-01{i:02d}", f"w{i}@example.com", "Main St"
+        )["success"]
+
+    assert [p["first_name"] for p in clinical.search_patients(last_name="walker")] == ["Zed", "Amy", "Bob"]
+
+
+def test_duplicate_registration_is_rejected(clinical):
+    duplicate = clinical.register_new_patient(
+        "John", "Smith", "1985-03-15", "Male", "555-555-0101", "js@example.com", "Main St"
+    )
+    assert duplicate == {"success": False, "error": "Patient with same name and DOB already exists"}
+
+
+def test_search_while_registering_patients(clinical):
+    errors = []
+    done = threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                clinical.search_patients(last_name="son")
+            except Exception as e:  # e.g. "Set changed size during iteration"
+                errors.append(e)
+                return
+
+    reader = threading.Thread(target=search)
+    reader.start()
+    for i in range(300):
+        registered = clinical.register_new_patient(
+            f"Test{i}", f"Johnson{i}", "1990-01-01", "Other", f"555-555-{i:04d}", f"t{i}@example.com", "1 Main St"
+        )
+        assert registered["success"]
+    done.set()
+    reader.join()
+
+    assert errors == []
+    assert len(clinical.search_patients(last_name="johnson")) == 301
+
+
+# ----------------------------------------------------------------------------
+# Appointment conflicts
+# ----------------------------------------------------------------------------
+
+def test_overlapping_bookings_are_rejected(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    first = book(clinical, day, "10:00", duration_minutes=60)
+
+    conflict = clinical.schedule_appointment("PT000002", "DR001", day, "10:30", "Checkup")
+    assert conflict["success"] is False
+    assert conflict["conflicting_appointment"] == first
+    # Back to back on either side is fine
+    book(clinical, day, "11:00", patient_id="PT000002")
+    book(clinical, day, "09:30", patient_id="PT000003")
+
+
+def test_cancelling_frees_the_slot(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    first = book(clinical, day, "14:00")
+    clinical.cancel_appointment(first)
+    book(clinical, day, "14:00", patient_id="PT000002")
+
+
+def test_calendar_agrees_with_a_linear_scan():
+    start = datetime(2030, 1, 7, 9, 0)
+    appointments = [
+        {"appointment_id": f"A{i}", "doctor_id": f"DR00{i % 2}", "status": "cancelled" if i % 5 == 0 else "scheduled",
+         "appointment_time": (start + timedelta(minutes=25 * i)).isoformat(), "duration": 15 + 10 * (i % 4)}
+        for i in range(40)
+    ]
+    calendar = AppointmentCalendar(appointments)
+
+    for minute in range(0, 25 * 40, 5):
+        for doctor_id in ("DR000", "DR001"):
+            probe = start + timedelta(minutes=minute)
+            expected = SafetyValidator.check_appointment_conflict(appointments, doctor_id, probe, 20)
+            found = SafetyValidator.check_appointment_conflict(calendar, doctor_id, probe, 20)
+            assert (found is None) == (expected is None), probe
+
+
+def test_concurrent_bookings_of_one_slot_admit_exactly_one(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    barrier = threading.Barrier(len(clinical.patients))
+    results = []
+
+    def attempt(patient):
+        barrier.wait()
+        results.append(clinical.schedule_appointment(patient["patient_id"], "DR001", day, "10:00", "Checkup"))
+
+    threads = [threading.Thread(target=attempt, args=(patient,)) for patient in clinical.patients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(1 for result in results if result["success"]) == 1
+    assert len(clinical.get_appointments(doctor_id="DR001")) == 1
+
+
+# ----------------------------------------------------------------------------
+# Batch scheduling
+# ----------------------------------------------------------------------------
+
+def batch_request(day, time, patient_id="PT000001", doctor_id="DR001", **kwargs):
+    return dict(
+        patient_id=patient_id, doctor_id=doctor_id, appointment_date=day,
+        appointment_time=time, reason="Checkup", **kwargs
+    )
+
+
+def test_atomic_batch_books_everything_or_nothing(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+
+    failed = clinical.schedule_appointments_batch([
+        batch_request(day, "09:00"),
+        batch_request(day, "09:30", patient_id="PT999999")
+    ])
+    assert failed["success"] is False
+    assert failed["scheduled"] == 0 and failed["failed"] == 1
+    assert failed["results"][0]["valid"] is True
+    assert failed["results"][1]["error"] == "Invalid or unknown patient ID"
+    assert clinical.appointments == []
+
+    booked = clinical.schedule_appointments_batch([batch_request(day, "09:00"), batch_request(day, "09:30")])
+    assert booked["success"] and booked["scheduled"] == 2
+    assert [r["index"] for r in booked["results"]] == [0, 1]
+    assert len(clinical.get_appointments(doctor_id="DR001")) == 2
+
+
+def test_non_atomic_batch_books_the_valid_requests(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    result = clinical.schedule_appointments_batch([
+        batch_request(day, "09:00"),
+        {"patient_id": "PT000002"},
+        batch_request(day, "10:00", doctor_id="DR999")
+    ], atomic=False)
+
+    assert result["scheduled"] == 1 and result["failed"] == 2
+    assert result["results"][0]["success"]
+    assert result["results"][1]["error"].startswith("Missing fields: doctor_id")
+    assert result["results"][2]["error"] == "Invalid or unknown doctor ID"
+
+
+def test_requests_in_one_batch_conflict_with_each_other(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    book(clinical, day, "09:00")
+    result = clinical.schedule_appointments_batch([
+        batch_request(day, "09:15", patient_id="PT000002"),
+        batch_request(day, "10:00", duration_minutes=45),
+        batch_request(day, "10:30", patient_id="PT000003"),
+        batch_request(day, "10:45", patient_id="PT000003")
+    ], atomic=False)
+
+    assert result["results"][0]["error"] == "Time slot already booked"
+    assert result["results"][1]["success"]
+    assert result["results"][2]["conflicting_request"] == "batch[1]"
+    assert result["results"][3]["success"]
+
+
+def test_batch_durations_must_be_whole_minutes(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    result = clinical.schedule_appointments_batch([
+        batch_request(day, "09:00", duration_minutes="30"),
+        batch_request(day, "10:00", duration_minutes=True),
+        batch_request(day, "11:00", duration_minutes=0),
+        batch_request(day, "12:00", duration_minutes=45)
+    ], atomic=False)
+
+    errors = [r.get("error") for r in result["results"]]
+    assert errors[:2] == ["Appointment duration must be a whole number of minutes"] * 2
+    assert errors[2] == "Appointment duration must be positive"
+    assert result["results"][3]["success"]
+
+
+# ----------------------------------------------------------------------------
+# Free-slot search
+# ----------------------------------------------------------------------------
+
+def test_free_slots_skip_booked_time(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    book(clinical, day, "09:00", duration_minutes=45)
+    book(clinical, day, "10:15", patient_id="PT000002")
+
+    result = clinical.find_available_slots(doctor_id="DR001", start_date=day, end_date=day, limit=3)
+    assert result["success"]
+    assert [slot["appointment_time"] for slot in result["slots"]] == ["09:45", "10:45", "11:00"]
+    assert all(slot["appointment_date"] == day for slot in result["slots"])
+
+    # A 60 minute visit needs four free slots in a row
+    result = clinical.find_available_slots(doctor_id="DR001", start_date=day, end_date=day, duration_minutes=60, limit=1)
+    assert result["slots"][0]["appointment_time"] == "10:45"
+    assert result["slots"][0]["end"].endswith("11:45:00")
+
+
+def test_free_slots_reopen_after_cancellation(clinical):
+    day = working_days(clinical.doctors[0], 1)[0]
+    appointment_id = book(clinical, day, "09:00")
+    assert clinical.find_available_slots(doctor_id="DR001", start_date=day, limit=1)["slots"][0]["appointment_time"] == "09:30"
+
+    clinical.cancel_appointment(appointment_id)
+    assert clinical.find_available_slots(doctor_id="DR001", start_date=day, limit=1)["slots"][0]["appointment_time"] == "09:00"
+
+
+def test_free_slots_stay_within_hours_and_working_days(clinical):
+    doctor = clinical.doctors[1]
+    first, last = working_days(doctor, 2)
+    result = clinical.find_available_slots(doctor_id=doctor["doctor_id"], start_date=first, end_date=last, limit=100)
+
+    # Every 15 minute start from opening time until 30 minutes before closing
+    per_day = (ClinicalTools.CLOSING_HOUR - ClinicalTools.OPENING_HOUR) * 60 // AppointmentCalendar.SLOT_MINUTES - 1
+    assert result["count"] == 2 * per_day
+    assert {slot["appointment_date"] for slot in result["slots"]} == {first, last}
+    assert result["slots"][-1]["end"].endswith(f"{ClinicalTools.CLOSING_HOUR}:00:00")
+
+
+def test_free_slots_by_specialty_are_ordered_across_doctors(clinical):
+    clinical.doctors.append(dict(clinical.doctors[0], doctor_id="DR004", name="Dr. Second"))
+    clinical._doctors_by_id["DR004"] = clinical.doctors[-1]
+    day = working_days(clinical.doctors[0], 1)[0]
+    book(clinical, day, "09:00")
+
+    # Earliest first; doctors free at the same time keep roster order
+    slots = clinical.find_available_slots(specialty="family", start_date=day, end_date=day, limit=4)["slots"]
+    assert [(slot["doctor_id"], slot["appointment_time"]) for slot in slots] == [
+        ("DR004", "09:00"), ("DR004", "09:15"), ("DR001", "09:30"), ("DR004", "09:30")
+    ]
+
+
+def test_free_slot_search_rejects_bad_input(clinical):
+    assert clinical.find_available_slots()["success"] is False
+    assert clinical.find_available_slots(doctor_id="DR999")["error"] == "No matching doctors found"
+    assert clinical.find_available_slots(doctor_id="DR001", duration_minutes=0)["success"] is False
+    assert clinical.find_available_slots(doctor_id="DR001", start_date="next week")["success"] is False
+
+
+# ----------------------------------------------------------------------------
+# Medical history view
+# ----------------------------------------------------------------------------
+
+def test_history_view_orders_records_and_appointments():
+    history = PatientHistory()
+    for record_id, day in [("MR1", "2026-01-02"), ("MR2", "2026-03-01"), ("MR3", "2026-01-02")]:
+        history.add_record(MedicalRecord.from_dict({"record_id": record_id, "patient_id": "PT1", "date": day}))
+    patient, doctor = {"patient_id": "PT1", "first_name": "A", "last_name": "B"}, {"doctor_id": "DR1", "name": "Dr. C"}
+    for appointment_id, time in [("APT1", "2026-02-01T10:00"), ("APT2", "2026-01-01T09:00"), ("APT3", "2026-02-01T10:00")]:
+        history.add_appointment(Appointment.from_dict(
+            {"appointment_id": appointment_id, "patient_id": "PT1", "doctor_id": "DR1", "appointment_time": time}, patient, doctor
+        ))
+
+    # Newest first / earliest first; equal times keep insertion order
+    assert [r["record_id"] for r in history.records()] == ["MR2", "MR1", "MR3"]
+    assert [a["appointment_id"] for a in history.appointments()] == ["APT2", "APT1", "APT3"]
+    assert [a["appointment_id"] for a in history.appointments(limit=2)] == ["APT2", "APT1"]
+    assert history.status_counts["scheduled"] == 3
+
+
+def test_medical_history_follows_bookings_cancellations_and_records(clinical):
+    earlier, later = working_days(clinical.doctors[0], 2)
+    last = book(clinical, later, "10:00")
+    cancelled = book(clinical, earlier, "11:00")
+    first = book(clinical, earlier, "09:00")
+    book(clinical, earlier, "13:00", patient_id="PT000002")
+    clinical.cancel_appointment(cancelled)
+    clinical.add_medical_record("PT000001", None, "Flu", ["fever"], [], "Rest")
+
+    history = clinical.get_medical_history("PT000001")
+    assert [a["appointment_id"] for a in history["recent_appointments"]] == [first, cancelled, last]
+    assert history["recent_appointments"][1]["status"] == "cancelled"
+    assert history["upcoming_appointments"] == 2
+    assert history["total_visits"] == 0
+    assert [r["diagnosis"] for r in history["medical_records"]] == ["Flu"]
+    assert clinical.get_medical_history("PT999999") == {"error": "Invalid patient ID"}
+
+
+def test_active_medications_come_from_the_history_view(clinical):
+    clinical.add_medical_record("PT000001", None, "Clot", [], [{"name": "Warfarin"}, {"name": "Aspirin", "status": "stopped"}], "")
+    clinical.add_medical_record("PT000001", None, "Pain", [], ["Advil", {"name": "Tylenol", "end_date": "2000-01-01"}], "")
+    clinical.add_medical_record("PT000002", None, "Diabetes", [], [{"name": "Metformin"}], "")
+
+    assert clinical.get_active_medications("PT000001") == ["Warfarin", "Advil"]
+    assert clinical.get_active_medications("PT000003") == []
+
+    check = clinical.check_prescription_interactions("PT000001", "Coumadin")
+    assert check["active_medications"] == ["Warfarin", "Advil"]
+    assert [hit["medications"] for hit in check["interactions"]] == [["Coumadin", "Advil"]]
+
+
+# ----------------------------------------------------------------------------
+# Panel screening
+# ----------------------------------------------------------------------------
+
+def prescribe(clinical, patient_id, *medications):
+    result = clinical.add_medical_record(
+        patient_id, None, "Review", [], [m if isinstance(m, dict) else {"name": m} for m in medications], ""
+    )
+    assert result["success"], result
+
+
+def test_panel_screening_flags_pairs_per_patient(clinical):
+    prescribe(clinical, "PT000001", "Coumadin 5mg", "Lisinopril")
+    prescribe(clinical, "PT000001", "Advil")
+    prescribe(clinical, "PT000002", "warfarin", "metformin")
+    prescribe(clinical, "PT000003", "lisinopril", "potassium chloride", "levothyroxine", "Prilosec")
+
+    report = clinical.screen_panel_interactions()
+
+    assert report["patients_screened"] == 3
+    assert report["interactions_found"] == 4
+    assert {severity: len(hits) for severity, hits in report["by_severity"].items()} == {"High": 1, "Moderate": 2, "Low": 1}
+    high = report["by_severity"]["High"][0]
+    assert (high["patient_id"], high["medications"]) == ("PT000001", ["Coumadin 5mg", "Advil"])
+    assert [hit["patient_id"] for hit in report["by_severity"]["Moderate"]] == ["PT000001", "PT000003"]
+
+
+def test_panel_screening_skips_inactive_prescriptions(clinical):
+    prescribe(clinical, "PT000001", "warfarin", {"name": "aspirin", "status": "discontinued"})
+    prescribe(clinical, "PT000002", "warfarin", {"name": "ibuprofen", "end_date": "2000-01-01"})
+
+    report = clinical.screen_panel_interactions()
+    assert report["interactions_found"] == 0
+    assert report["by_severity"] == {}
+
+
+def test_panel_screening_filters_by_severity_across_chunks(clinical, monkeypatch):
+    monkeypatch.setattr(ClinicalTools, "PANEL_CHUNK_ROWS", 1)
+    prescribe(clinical, "PT000001", "warfarin", "aspirin", "ibuprofen")
+    prescribe(clinical, "PT000003", "levothyroxine", "tums")
+
+    events = list(clinical.iter_panel_interactions(["High"]))
+
+    assert events[0] == ("summary", {"patients_screened": 2, "drugs": 5, "interactions_found": 2, "by_severity": {"High": 2}})
+    assert [data["drugs"] for _, data in events[1:]] == [["Warfarin", "Aspirin"], ["Warfarin", "Ibuprofen"]]
+
+
+def test_panel_screening_of_an_empty_panel(clinical):
+    assert list(clinical.iter_panel_interactions()) == [
+        ("summary", {"patients_screened": 0, "drugs": 0, "interactions_found": 0, "by_severity": {}})
+    ]
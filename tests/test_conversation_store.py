@@ -0,0 +1,217 @@
+import json
+import struct
+import threading
+
+import pytest
+
+from conversation_store import SegmentLogStore, SQLiteStore, create_conversation_store, migrate_conversations
+
+
+def message(i: int, role: str = "human") -> dict:
+    return {"type": role, "content": f"message {i}", "timestamp": f"2026-01-01T00:00:{i:02d}"}
+
+
+@pytest.fixture(params=["json", "jsonl", "sqlite"])
+def store(request, tmp_path):
+    store = create_conversation_store(request.param, str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_append_read_and_count(store):
+    store.append_messages("PT000001", [message(0), message(1, "ai")])
+    store.append_messages("PT000001", [message(2)])
+    store.append_messages("PT000002", [message(3)])
+
+    assert store.read_history("PT000001") == [message(0), message(1, "ai"), message(2)]
+    assert store.read_recent("PT000001", 2) == [message(1, "ai"), message(2)]
+    assert store.read_recent("PT000001", 0) == []
+    assert store.count_messages("PT000001") == 3
+    assert store.list_patients() == ["PT000001", "PT000002"]
+
+
+def test_write_history_replaces_and_delete_removes(store):
+    store.append_messages("PT000001", [message(0), message(1)])
+    store.write_history("PT000001", [message(5)])
+    assert store.read_history("PT000001") == [message(5)]
+
+    store.delete_history("PT000001")
+    assert store.read_history("PT000001") == []
+    assert not store.has_history("PT000001")
+    assert store.list_patients() == []
+
+
+def test_summaries_track_appends(store):
+    store.append_messages("PT000001", [message(0), message(1, "ai")])
+    assert store.summarize("PT000001") == {
+        "patient_id": "PT000001",
+        "total_messages": 2,
+        "last_updated": message(1)["timestamp"],
+        "human_messages": 1,
+        "ai_messages": 1
+    }
+    store.append_messages("PT000001", [message(2)])
+    assert store.summarize("PT000001")["total_messages"] == 3
+    assert [s["patient_id"] for s in store.summarize_all()] == ["PT000001"]
+
+
+@pytest.mark.parametrize("storage_format", ["json", "jsonl", "sqlite"])
+def test_history_survives_reopen(tmp_path, storage_format):
+    store = create_conversation_store(storage_format, str(tmp_path))
+    store.append_messages("PT000001", [message(0), message(1)])
+    store.close()
+
+    reopened = create_conversation_store(storage_format, str(tmp_path))
+    assert reopened.read_history("PT000001") == [message(0), message(1)]
+    assert reopened.count_messages("PT000001") == 2
+    reopened.close()
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        create_conversation_store("xml", str(tmp_path))
+
+
+@pytest.mark.parametrize("storage_format", ["json", "jsonl", "sqlite"])
+def test_concurrent_appends_are_all_kept(tmp_path, monkeypatch, storage_format):
+    monkeypatch.setattr(SegmentLogStore, "SEGMENT_MAX_MESSAGES", 64)
+    store = create_conversation_store(storage_format, str(tmp_path))
+    threads, appends = 8, 50
+
+    def append(worker):
+        for i in range(appends):
+            store.append_messages("PT000001", [{"type": "human", "content": f"{worker}:{i}", "timestamp": "t"}])
+            store.read_recent("PT000001", 3)
+
+    workers = [threading.Thread(target=append, args=(w,)) for w in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    history = [m["content"] for m in store.read_history("PT000001")]
+    assert len(history) == threads * appends
+    assert store.count_messages("PT000001") == threads * appends
+    assert store.summarize("PT000001")["total_messages"] == threads * appends
+    for w in range(threads):
+        assert [c for c in history if c.startswith(f"{w}:")] == [f"{w}:{i}" for i in range(appends)]
+    assert [m["content"] for m in store.read_recent("PT000001", 5)] == history[-5:]
+
+    if storage_format == "jsonl":
+        for segment, count in store._segment_counts("PT000001"):
+            assert count <= SegmentLogStore.SEGMENT_MAX_MESSAGES
+            log_path, idx_path = store._segment_paths("PT000001", segment)
+            offsets = [offset for (offset,) in struct.iter_unpack(">Q", idx_path.read_bytes())]
+            data = log_path.read_bytes()
+            assert offsets == sorted(offsets)
+            assert all(offset == 0 or data[offset - 1:offset] == b"\n" for offset in offsets)
+    store.close()
+
+
+# ----------------------------------------------------------------------------
+# Segment log
+# ----------------------------------------------------------------------------
+
+def test_segments_roll_over_and_tail_reads_span_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(SegmentLogStore, "SEGMENT_MAX_MESSAGES", 3)
+    store = SegmentLogStore(str(tmp_path))
+    messages = [message(i) for i in range(8)]
+    store.append_messages("PT000001", messages[:5])
+    store.append_messages("PT000001", messages[5:])
+
+    assert sorted(p.name for p in store.get_log_dir("PT000001").glob("*.jsonl")) == [
+        "000001.jsonl", "000002.jsonl", "000003.jsonl"
+    ]
+    assert store.count_messages("PT000001") == 8
+    assert store.read_recent("PT000001", 4) == messages[4:]
+    assert store.read_history("PT000001") == messages
+
+
+def test_torn_segment_write_is_repaired_on_reopen(tmp_path):
+    store = SegmentLogStore(str(tmp_path))
+    store.append_messages("PT000001", [message(0), message(1)])
+    store.close()
+
+    # A crash after a complete line reached the log but before its offset reached the index,
+    # followed by a partial line
+    log_path, _ = SegmentLogStore(str(tmp_path))._segment_paths("PT000001", 1)
+    with open(log_path, "ab") as log:
+        log.write((json.dumps(message(2)) + "\n").encode("utf-8"))
+        log.write(b'{"type": "hu')
+
+    reopened = SegmentLogStore(str(tmp_path))
+    assert reopened.count_messages("PT000001") == 3
+    reopened.append_messages("PT000001", [message(3)])
+    assert reopened.read_history("PT000001") == [message(0), message(1), message(2), message(3)]
+
+
+def test_legacy_json_history_is_imported(tmp_path):
+    (tmp_path / "PT000001_history.json").write_text(json.dumps([message(0), message(1)]))
+
+    store = SegmentLogStore(str(tmp_path))
+    assert store.read_history("PT000001") == [message(0), message(1)]
+    assert (tmp_path / "PT000001_history.json.migrated").exists()
+    store.append_messages("PT000001", [message(2)])
+    assert store.count_messages("PT000001") == 3
+
+
+# ----------------------------------------------------------------------------
+# Summary manifest
+# ----------------------------------------------------------------------------
+
+def test_store_formats_keep_separate_manifests(tmp_path):
+    json_store = create_conversation_store("json", str(tmp_path))
+    json_store.write_history("PT000001", [message(0)])
+    json_store.close()
+    log_store = create_conversation_store("jsonl", str(tmp_path))
+    log_store.append_messages("PT000002", [message(0), message(1), message(2)])
+    log_store.close()
+
+    assert (tmp_path / "_json_manifest.json").exists()
+    assert (tmp_path / "_jsonl_manifest.json").exists()
+    reopened = create_conversation_store("jsonl", str(tmp_path))
+    assert reopened.summarize("PT000002")["total_messages"] == 3
+    reopened.close()
+
+
+def test_stale_manifest_entries_are_recounted(tmp_path):
+    store = create_conversation_store("json", str(tmp_path))
+    store.write_history("PT000001", [message(0)])
+    store.write_history("PT000002", [message(1)])
+    store.close()
+
+    # Edited and removed behind the manifest's back
+    (tmp_path / "PT000001_history.json").write_text(json.dumps([message(0), message(1), message(2)]))
+    (tmp_path / "PT000002_history.json").unlink()
+
+    reopened = create_conversation_store("json", str(tmp_path))
+    assert [(s["patient_id"], s["total_messages"]) for s in reopened.summarize_all()] == [("PT000001", 3)]
+    reopened.close()
+
+
+# ----------------------------------------------------------------------------
+# SQLite
+# ----------------------------------------------------------------------------
+
+def test_sqlite_uses_wal_and_orders_by_insertion(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    # Same timestamp: insertion order decides
+    same_time = [dict(message(0), content=f"tie {i}") for i in range(3)]
+    store.append_messages("PT000001", same_time)
+    assert store.read_history("PT000001") == same_time
+    assert store.read_recent("PT000001", 2) == same_time[1:]
+    store.close()
+
+
+def test_migrate_between_formats(tmp_path):
+    source = create_conversation_store("json", str(tmp_path / "json"))
+    source.write_history("PT000001", [message(0), message(1)])
+    source.write_history("PT000002", [message(2)])
+    target = create_conversation_store("sqlite", str(tmp_path / "sqlite"))
+
+    assert migrate_conversations(source, target) == {"PT000001": 2, "PT000002": 1}
+    assert target.read_history("PT000001") == [message(0), message(1)]
+    source.close()
+    target.close()
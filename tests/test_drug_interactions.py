@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from drug_interactions import DrugInteractionIndex, normalize_drug_name
+
+
+@pytest.fixture(scope="module")
+def index():
+    return DrugInteractionIndex.load()
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Warfarin", "warfarin"),
+    ("  Warfarin   5 mg tablet ", "warfarin"),
+    ("Coumadin 2.5mg", "coumadin"),
+    ("Potassium  Chloride 20 mEq", "potassium chloride"),
+    ("theo-24", "theo-24"),
+])
+def test_normalize_drug_name(name, expected):
+    assert normalize_drug_name(name) == expected
+
+
+def test_synonyms_map_to_the_canonical_drug(index):
+    assert index.canonical("Coumadin 5mg") == "warfarin"
+    assert index.canonical("Acetylsalicylic Acid") == "aspirin"
+    assert index.canonical("Zolpidem") == "zolpidem"
+    assert "jantoven" in index.names()
+
+
+def test_screen_matches_through_synonyms(index):
+    hits = index.screen(["Coumadin 5mg", "Advil"])
+
+    assert len(hits) == 1
+    assert hits[0]["drugs"] == ["Warfarin", "Ibuprofen"]
+    assert hits[0]["medications"] == ["Coumadin 5mg", "Advil"]
+
+
+def test_screen_reports_each_pair_once(index):
+    # Brand and generic name of the same drug are one drug, not a pair
+    hits = index.screen(["warfarin", "aspirin", "Coumadin", "ASA 81 mg"])
+
+    assert [hit["drugs"] for hit in hits] == [["Warfarin", "Aspirin"]]
+    assert hits[0]["medications"] == ["warfarin", "aspirin"]
+
+
+def test_screen_orders_by_severity(index):
+    hits = index.screen(["levothyroxine", "omeprazole", "lisinopril", "potassium", "sildenafil", "nitrostat"])
+
+    assert [hit["severity"] for hit in hits] == ["High", "Moderate", "Low"]
+    assert index.screen(["metformin", "lisinopril"]) == []
+
+
+def test_check_against_current_medications(index):
+    hits = index.check_against("Motrin", ["Jantoven", "warfarin", "lisinopril", "omeprazole"])
+
+    assert [hit["medications"] for hit in hits] == [["Motrin", "Jantoven"], ["Motrin", "lisinopril"]]
+
+
+def test_load_from_a_custom_table(tmp_path):
+    path = tmp_path / "interactions.json"
+    path.write_text(json.dumps({
+        "synonyms": {"drug a": ["brand a"]},
+        "interactions": [{"drugs": ["Drug A", "drug b 10mg"], "severity": "Low", "description": "test"}]
+    }))
+    index = DrugInteractionIndex.load(str(path))
+
+    assert len(index) == 1
+    assert index.screen(["drug b", "Brand A"])[0]["drugs"] == ["Drug A", "Drug B"]
+    assert index.pairs_among(["drug b", "drug a"])[0][:2] == (1, 0)
@@ -0,0 +1,108 @@
+import sqlite3
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMResponseCache, normalize_prompt
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+def test_equivalent_prompts_share_an_entry(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"))
+    assert normalize_prompt("  What is   Warfarin?? ") == "what is warfarin"
+
+    cache.put("gpt-4", 0.3, "What is warfarin?", "An anticoagulant")
+    assert cache.get("gpt-4", 0.3, "what is   WARFARIN") == "An anticoagulant"
+    assert cache.get("gpt-4", 0.7, "what is warfarin") is None
+    assert cache.get("gpt-3.5", 0.3, "what is warfarin") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    cache.close()
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), ttl_seconds=60)
+    cache.put("gpt-4", 0.3, "q", "a")
+    clock.now += 59
+    assert cache.get("gpt-4", 0.3, "q") == "a"
+    clock.now += 2
+    assert cache.get("gpt-4", 0.3, "q") is None
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+    # Expired rows are not loaded back either
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), ttl_seconds=60)
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.put("gpt-4", 0.3, "a", "A")
+    clock.now += 1
+    cache.put("gpt-4", 0.3, "b", "B")
+    cache.get("gpt-4", 0.3, "a")
+    clock.now += 1
+    cache.put("gpt-4", 0.3, "c", "C")
+
+    assert cache.get("gpt-4", 0.3, "b") is None
+    assert cache.get("gpt-4", 0.3, "a") == "A"
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_entries_and_recency_survive_a_restart(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = LLMResponseCache(path, max_entries=3)
+    for prompt in ("old", "middle", "new"):
+        cache.put("gpt-4", 0.3, prompt, prompt.upper())
+        clock.now += 1
+    # "old" is the oldest entry but the most recently used
+    cache.get("gpt-4", 0.3, "old")
+    cache.close()
+
+    reopened = LLMResponseCache(path, max_entries=2)
+    assert reopened.get("gpt-4", 0.3, "old") == "OLD"
+    assert reopened.get("gpt-4", 0.3, "new") == "NEW"
+    assert reopened.get("gpt-4", 0.3, "middle") is None
+    reopened.close()
+
+
+def test_caches_without_last_use_times_are_migrated(tmp_path, clock):
+    path = tmp_path / "cache.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)")
+    conn.execute(
+        "INSERT INTO responses VALUES (?, ?, ?)",
+        (LLMResponseCache.make_key("gpt-4", 0.3, "q"), "a", clock.now)
+    )
+    conn.commit()
+    conn.close()
+
+    cache = LLMResponseCache(str(path))
+    assert cache.get("gpt-4", 0.3, "q") == "a"
+    cache.close()
+
+
+def test_bypasses_and_clear(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"))
+    cache.put("gpt-4", 0.3, "q", "a")
+    cache.record_bypass()
+    cache.clear()
+
+    assert cache.get("gpt-4", 0.3, "q") is None
+    assert cache.stats()["bypassed"] == 1
+    cache.close()
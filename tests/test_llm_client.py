@@ -0,0 +1,131 @@
+import asyncio
+
+import httpx
+import pytest
+
+from llm_client import AsyncGovernedTransport, GovernedTransport, TransportGovernor
+
+
+def governor(**kwargs) -> TransportGovernor:
+    # No backoff between attempts so the tests stay fast
+    return TransportGovernor(backoff=0, max_backoff=0, **kwargs)
+
+
+def scripted(*outcomes):
+    """MockTransport handler returning (or raising) each outcome in turn"""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(request)
+        if isinstance(outcome, Exception):
+            raise outcome
+        # A streamed body, as a network transport returns it
+        return httpx.Response(outcome, stream=httpx.ByteStream(b'{"ok": true}'))
+
+    return handler, calls
+
+
+def test_transient_statuses_are_retried_until_success():
+    handler, calls = scripted(503, 429, 200)
+    gov = governor(max_retries=3)
+    with httpx.Client(transport=GovernedTransport(gov, httpx.MockTransport(handler))) as client:
+        response = client.get("https://llm.test/v1/models")
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert gov.stats() == {
+        "max_in_flight": 8, "in_flight": 0, "requests": 1, "retries": 2, "failures": 0, "rejected": 0
+    }
+
+
+def test_connection_errors_are_retried():
+    handler, calls = scripted(httpx.ConnectError("refused"), 200)
+    gov = governor(max_retries=1)
+    with httpx.Client(transport=GovernedTransport(gov, httpx.MockTransport(handler))) as client:
+        assert client.get("https://llm.test/").status_code == 200
+    assert len(calls) == 2
+    assert gov.retries == 1
+
+
+def test_exhausted_retries_return_the_last_response():
+    handler, calls = scripted(502)
+    gov = governor(max_retries=2)
+    with httpx.Client(transport=GovernedTransport(gov, httpx.MockTransport(handler))) as client:
+        response = client.get("https://llm.test/")
+
+    assert response.status_code == 502
+    assert len(calls) == 3
+    assert gov.failures == 1
+    assert gov.in_flight == 0
+
+
+def test_client_errors_are_not_retried():
+    handler, calls = scripted(400, 200)
+    with httpx.Client(transport=GovernedTransport(governor(), httpx.MockTransport(handler))) as client:
+        assert client.get("https://llm.test/").status_code == 400
+    assert len(calls) == 1
+
+
+def test_in_flight_limit_holds_slots_for_open_streams():
+    handler, _ = scripted(200)
+    gov = governor(max_in_flight=1, queue_timeout=0.05)
+    with httpx.Client(transport=GovernedTransport(gov, httpx.MockTransport(handler))) as client:
+        with client.stream("GET", "https://llm.test/stream") as streaming:
+            assert streaming.status_code == 200
+            assert gov.in_flight == 1
+            with pytest.raises(httpx.PoolTimeout):
+                client.get("https://llm.test/")
+            assert gov.rejected == 1
+
+        # Closing the stream frees the slot
+        assert gov.in_flight == 0
+        assert client.get("https://llm.test/").status_code == 200
+
+
+def test_async_transport_shares_the_governor():
+    handler, calls = scripted(500, 200)
+    gov = governor(max_in_flight=1, queue_timeout=0.05)
+    sync_client = httpx.Client(transport=GovernedTransport(gov, httpx.MockTransport(handler)))
+
+    async def run():
+        transport = AsyncGovernedTransport(gov, httpx.MockTransport(handler))
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.get("https://llm.test/")
+            assert response.status_code == 200
+
+            # A sync stream holding the only slot makes async callers wait, then give up
+            with sync_client.stream("GET", "https://llm.test/stream"):
+                with pytest.raises(httpx.PoolTimeout):
+                    await client.get("https://llm.test/")
+
+    asyncio.run(run())
+    sync_client.close()
+    assert len(calls) == 3
+    assert gov.stats()["retries"] == 1
+    assert gov.stats()["rejected"] == 1
+    assert gov.stats()["in_flight"] == 0
+
+
+def test_cancelled_async_request_frees_its_slot():
+    started = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        started.set()
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    gov = governor(max_in_flight=1)
+
+    async def run():
+        async with httpx.AsyncClient(transport=AsyncGovernedTransport(gov, httpx.MockTransport(handler))) as client:
+            task = asyncio.create_task(client.get("https://llm.test/"))
+            await started.wait()
+            assert gov.in_flight == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(run())
+    assert gov.in_flight == 0
+    assert gov.failures == 0
@@ -0,0 +1,145 @@
+import pytest
+
+from patient_memory_agent import PatientMemoryManager
+
+
+class CountingStore:
+    """Wraps a store's write methods to count disk writes"""
+
+    def __init__(self, store):
+        self.writes = []
+        for name in ("append_messages", "write_history"):
+            original = getattr(store, name)
+            setattr(store, name, self._counted(name, original))
+
+    def _counted(self, name, original):
+        def write(patient_id, messages):
+            self.writes.append((name, patient_id, len(messages)))
+            return original(patient_id, messages)
+        return write
+
+
+@pytest.fixture(params=["json", "jsonl", "sqlite"])
+def storage_format(request):
+    return request.param
+
+
+def test_write_through_by_default(tmp_path, storage_format):
+    memory = PatientMemoryManager(str(tmp_path), storage_format)
+    memory.add_message("PT000001", "human", "hello")
+
+    assert [m["content"] for m in memory.store.read_history("PT000001")] == ["hello"]
+    memory.close()
+
+
+def test_deferred_question_is_written_with_the_answer(tmp_path, storage_format):
+    memory = PatientMemoryManager(str(tmp_path), storage_format)
+    writes = CountingStore(memory.store).writes
+
+    memory.add_message("PT000001", "human", "question", defer=True)
+    assert writes == []
+    assert memory.get_message_count("PT000001") == 1
+    memory.add_message("PT000001", "ai", "answer")
+
+    assert len(writes) == 1
+    assert [m["content"] for m in memory.store.read_history("PT000001")] == ["question", "answer"]
+    memory.close()
+
+
+def test_write_behind_holds_messages_until_flush(tmp_path, storage_format):
+    memory = PatientMemoryManager(str(tmp_path), storage_format, flush_interval=60)
+    memory.add_message("PT000001", "human", "one")
+    memory.add_message("PT000001", "ai", "two")
+
+    # Reads are served from the cache, and unflushed patients are still listed
+    assert memory.store.read_history("PT000001") == []
+    assert [m["content"] for m in memory.load_patient_memory("PT000001")] == ["one", "two"]
+    assert memory.get_all_patients() == ["PT000001"]
+
+    memory.flush()
+    assert [m["content"] for m in memory.store.read_history("PT000001")] == ["one", "two"]
+    memory.close()
+
+
+def test_flush_appends_to_history_written_by_another_process(tmp_path, storage_format):
+    memory = PatientMemoryManager(str(tmp_path), storage_format, flush_interval=60)
+    memory.add_message("PT000001", "human", "cli question")
+    memory.flush()
+
+    # The API server appends a turn after the CLI cached the patient
+    api = PatientMemoryManager(str(tmp_path), storage_format)
+    api.add_message("PT000001", "human", "api question", defer=True)
+    api.add_message("PT000001", "ai", "api answer")
+    api.close()
+
+    memory.add_message("PT000001", "ai", "cli answer")
+    memory.close()
+
+    reopened = PatientMemoryManager(str(tmp_path), storage_format)
+    assert [m["content"] for m in reopened.load_patient_memory("PT000001")] == [
+        "cli question", "api question", "api answer", "cli answer"
+    ]
+    reopened.close()
+
+
+def test_pending_writes_are_coalesced(tmp_path):
+    memory = PatientMemoryManager(str(tmp_path), "jsonl", flush_interval=60)
+    writes = CountingStore(memory.store).writes
+    for i in range(5):
+        memory.add_message("PT000001", "human", f"m{i}")
+    memory.flush()
+
+    assert writes == [("append_messages", "PT000001", 5)]
+    memory.close()
+
+
+def test_eviction_flushes_the_least_recent_patient(tmp_path, storage_format):
+    memory = PatientMemoryManager(str(tmp_path), storage_format, cache_size=1, flush_interval=60)
+    memory.add_message("PT000001", "human", "first")
+    memory.add_message("PT000002", "human", "second")
+
+    assert [m["content"] for m in memory.store.read_history("PT000001")] == ["first"]
+    assert memory.store.read_history("PT000002") == []
+    memory.close()
+
+
+def test_close_flushes_and_stops_the_flusher(tmp_path):
+    memory = PatientMemoryManager(str(tmp_path), "json", flush_interval=60)
+    memory.add_message("PT000001", "human", "bye")
+    memory.close()
+
+    reopened = PatientMemoryManager(str(tmp_path), "json")
+    assert [m["content"] for m in reopened.load_patient_memory("PT000001")] == ["bye"]
+    assert reopened.get_patient_summary("PT000001")["total_messages"] == 1
+    reopened.close()
+
+
+def test_background_flusher_writes_dirty_entries(tmp_path):
+    memory = PatientMemoryManager(str(tmp_path), "jsonl", flush_interval=0.05)
+    memory.add_message("PT000001", "human", "later")
+
+    for _ in range(100):
+        if memory.store.count_messages("PT000001"):
+            break
+        memory._closed.wait(0.02)
+    assert memory.store.count_messages("PT000001") == 1
+    memory.close()
+
+
+def test_recent_messages_beyond_the_cached_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(PatientMemoryManager, "CACHED_TAIL_MESSAGES", 3)
+    memory = PatientMemoryManager(str(tmp_path), "jsonl")
+    for i in range(6):
+        memory.add_message("PT000001", "human", f"m{i}")
+
+    assert [m["content"] for m in memory.load_recent_messages("PT000001", 2)] == ["m4", "m5"]
+    assert [m["content"] for m in memory.load_recent_messages("PT000001", 5)] == ["m1", "m2", "m3", "m4", "m5"]
+    assert memory.get_message_count("PT000001") == 6
+    memory.close()
+
+
+def test_invalid_settings_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        PatientMemoryManager(str(tmp_path), cache_size=0)
+    with pytest.raises(ValueError):
+        PatientMemoryManager(str(tmp_path), flush_interval=0)
@@ -0,0 +1,121 @@
+import pytest
+
+from clinical_tools import ClinicalTools
+from query_router import PatternMatcher, QueryRouter
+
+
+@pytest.fixture
+def clinical():
+    clinical = ClinicalTools()
+    yield clinical
+    clinical.close()
+
+
+# ----------------------------------------------------------------------------
+# Pattern matcher
+# ----------------------------------------------------------------------------
+
+def test_matches_whole_words_only():
+    matcher = PatternMatcher()
+    matcher.add("drug", "drug")
+    matcher.add("drugs", "drugs")
+
+    assert [payload for _, _, payload in matcher.scan("Drugs and drug, not drugstore")] == ["drugs", "drug"]
+
+
+def test_overlapping_patterns_are_all_reported():
+    matcher = PatternMatcher()
+    matcher.add("potassium", "short")
+    matcher.add("potassium chloride", "long")
+
+    assert matcher.scan("took potassium chloride") == [(5, 14, "short"), (5, 23, "long")]
+
+
+def test_pending_patterns_match_the_same_as_linked_ones(monkeypatch):
+    monkeypatch.setattr(PatternMatcher, "MAX_PENDING", 4)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta"]
+    text = "zeta beta alphabet alpha gamma-delta epsilon"
+
+    linked = PatternMatcher()
+    for word in words:
+        linked.add(word, word)
+    expected = linked.scan(text)
+    assert not linked._pending
+
+    pending = PatternMatcher()
+    for word in words[:4]:
+        pending.add(word, word)
+    assert pending._pending
+    pending._link()
+    for word in words[4:]:
+        pending.add(word, word)
+
+    # Two patterns still pending, checked directly alongside the automaton
+    assert len(pending._pending) == 2
+    assert pending.scan(text) == expected
+
+
+def test_duplicate_patterns_are_ignored():
+    matcher = PatternMatcher()
+    matcher.add("Smith", ("patient_name", "PT000001"))
+    matcher._link()
+    matcher.add("smith ", ("patient_name", "PT000001"))
+
+    assert not matcher._pending
+    assert len(matcher.scan("smith")) == 1
+
+
+# ----------------------------------------------------------------------------
+# Query router
+# ----------------------------------------------------------------------------
+
+def test_routes_intents_patient_and_medications(clinical):
+    router = QueryRouter(clinical)
+    route = router.route("Check interactions between Coumadin 5mg and aspirin for John Smith")
+
+    assert route["intents"] == {"interactions"}
+    assert route["patient_id"] == "PT000001"
+    assert route["medications"] == ["warfarin", "aspirin"]
+
+
+def test_patient_ids_take_precedence_over_names(clinical):
+    router = QueryRouter(clinical)
+
+    assert router.route("find Maria Garcia, PT000003")["patient_id"] == "PT000003"
+    assert router.route("show PT999 appointments")["patient_id"] == "PT999"
+
+
+def test_registered_patients_are_routed_without_rebuilding(clinical):
+    router = QueryRouter(clinical)
+    matcher = router.matcher
+    assert router.route("show Ada Lovelace")["patient_id"] is None
+
+    result = clinical.register_new_patient(
+        "Ada", "Lovelace", "1990-12-10", "Female", "555-555-0401", "ada@example.com", "1 Engine Way"
+    )
+
+    assert router.matcher is matcher
+    assert router.route("show Ada Lovelace")["patient_id"] == result["patient_id"]
+    assert router.route(f"find {result['patient_id']}")["patient_id"] == result["patient_id"]
+
+
+def test_ambiguous_names_do_not_pick_a_patient(clinical):
+    router = QueryRouter(clinical)
+    clinical.register_new_patient(
+        "Jane", "Smith", "1991-01-01", "Female", "555-555-0402", "jane@example.com", "2 Main St"
+    )
+
+    assert router.route("show Smith")["patient_id"] is None
+    assert router.route("show John Smith")["patient_id"] == "PT000001"
+
+
+def test_prescribed_medications_become_routable(clinical):
+    router = QueryRouter(clinical)
+    assert router.route("interactions for zolpidem")["medications"] == []
+
+    clinical.add_medical_record(
+        "PT000002", None, "Insomnia", ["poor sleep"],
+        [{"name": "Zolpidem 10mg", "dosage": "10mg"}], "Short course"
+    )
+
+    assert router.route("interactions for zolpidem")["medications"] == ["zolpidem"]
@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+import pytest
+
+from clinical_tools import ClinicalTools
+from scheduling_analytics import SchedulingAnalytics
+
+
+def working_days(doctor, count):
+    days = []
+    day = date.today() + timedelta(days=1)
+    while len(days) < count:
+        if day.strftime("%A") in doctor["available_days"]:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+@pytest.fixture
+def clinical():
+    clinical = ClinicalTools()
+    yield clinical
+    clinical.close()
+
+
+def book(clinical, doctor, day, time, patient_index=0):
+    result = clinical.schedule_appointment(
+        clinical.patients[patient_index]["patient_id"], doctor["doctor_id"], day, time, "Checkup"
+    )
+    assert result["success"], result
+    return result
+
+
+def test_snapshot_includes_existing_appointments(clinical):
+    doctor = clinical.doctors[0]
+    day = working_days(doctor, 1)[0]
+    book(clinical, doctor, day, "09:00")
+
+    analytics = SchedulingAnalytics(clinical)
+    report = analytics.report(day, day)
+    assert len(analytics) == 1
+    assert report["appointments"] == 1
+    assert report["booked_revenue"] == doctor["consultation_fee"]
+
+
+def test_writes_after_subscribing_are_mirrored(clinical):
+    doctor = clinical.doctors[0]
+    first, second = working_days(doctor, 2)
+    analytics = SchedulingAnalytics(clinical)
+
+    book(clinical, doctor, first, "09:00")
+    book(clinical, doctor, first, "10:00", patient_index=1)
+    booked = book(clinical, doctor, second, "11:00")
+
+    report = analytics.report(first, second)
+    assert report["appointments"] == 3
+    assert report["booked"] == 3
+    utilization = next(row for row in report["utilization"] if row["doctor_id"] == doctor["doctor_id"])
+    assert utilization["booked_minutes"] == 90
+    assert utilization["open_minutes"] == 2 * (clinical.CLOSING_HOUR - clinical.OPENING_HOUR) * 60
+    by_day = {row["date"]: row["booked"] for row in report["revenue_by_day"]}
+    assert by_day[first] == 2 and by_day[second] == 1
+
+    clinical.cancel_appointment(booked["appointment_id"], "Patient request")
+    report = analytics.report(first, second)
+    assert report["appointments"] == 3
+    assert report["cancelled"] == 1
+    assert report["cancellation_rate"] == round(1 / 3, 4)
+    assert report["booked_revenue"] == 2 * doctor["consultation_fee"]
+
+
+def test_reports_are_cached_until_the_next_write(clinical):
+    doctor = clinical.doctors[0]
+    day = working_days(doctor, 1)[0]
+    analytics = SchedulingAnalytics(clinical)
+
+    first = analytics.report(day, day)
+    assert analytics.report(day, day) is first
+    assert analytics.stats()["hits"] == 1
+
+    book(clinical, doctor, day, "09:00")
+    assert analytics.stats()["cached_reports"] == 0
+    assert analytics.report(day, day)["appointments"] == 1
+
+
+def test_range_boundaries_are_inclusive_days(clinical):
+    doctor = clinical.doctors[0]
+    first, second = working_days(doctor, 2)
+    analytics = SchedulingAnalytics(clinical)
+    book(clinical, doctor, first, "16:30")
+    book(clinical, doctor, second, "09:00")
+
+    assert analytics.report(first, first)["appointments"] == 1
+    assert analytics.report(second, second)["appointments"] == 1
+    with pytest.raises(ValueError):
+        analytics.report(second, first)
+
+
+def test_ranges_longer_than_the_limit_are_rejected(clinical):
+    analytics = SchedulingAnalytics(clinical, max_range_days=7)
+
+    assert len(analytics.report("2026-03-01", "2026-03-07")["revenue_by_day"]) == 7
+    with pytest.raises(ValueError, match="7 days"):
+        analytics.report("2026-03-01", "2026-03-08")
+    assert len(SchedulingAnalytics(clinical).report("2026-01-01", "2026-12-31")["revenue_by_day"]) == 365
+    with pytest.raises(ValueError):
+        SchedulingAnalytics(clinical).report("2026-01-01", "2027-01-02")